@@ -139,9 +139,12 @@ async function fetchPendingAnalysis(dryRun: boolean = false): Promise<ClusterAna
 async function fetchClusterBills(clusterId: string): Promise<BillInfo[]> {
     const bills = await sql<BillInfo[]>`
         WITH cluster_bill_ids AS (
-            SELECT bill_id 
-            FROM cluster_bills 
-            WHERE cluster_id = ${clusterId}
+            -- The clustering run's token-budgeted exemplars when it stored them
+            SELECT cb.bill_id
+            FROM cluster_bills cb
+            JOIN legislation_clusters c ON c.cluster_id = cb.cluster_id
+            WHERE cb.cluster_id = ${clusterId}
+            AND (c.exemplar_bill_ids IS NULL OR cb.bill_id = ANY(c.exemplar_bill_ids))
         ),
         last_actions AS (
             SELECT 
@@ -21,6 +21,53 @@ const requestSchema = z.object({
   exclude: z.array(exclusionSchema).optional()
 })
 
+// Optional in-process similarity service (indexing_service/similarity_service.py)
+const similarityServiceUrl = process.env.SIMILARITY_SERVICE_URL
+
+interface RankedEntity {
+  entity_type: 'bill' | 'sponsor' | 'blog_post';
+  entity_id: number;
+  entity_uuid: string | null;
+  state_abbr: string;
+  state_name: string;
+  similarity: number;
+}
+
+// Rank candidates in the similarity service, then hydrate them with the shared entity CTE
+async function getServiceRecommendations(body: z.infer<typeof requestSchema>) {
+  const response = await fetch(`${similarityServiceUrl}/recommendations`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  })
+  if (!response.ok) {
+    throw new Error(`Similarity service returned ${response.status}`)
+  }
+  const { results } = await response.json() as { results: RankedEntity[] }
+  if (!results.length) {
+    return []
+  }
+
+  const query = `
+    WITH ranked AS (
+      SELECT r.*, 'embedding' as source
+      FROM jsonb_to_recordset($1::jsonb) AS r(
+        entity_type text,
+        entity_id integer,
+        entity_uuid uuid,
+        state_abbr text,
+        state_name text,
+        similarity float8
+      )
+    ),
+    ${entityDataCTE}
+    SELECT e.*, r.source FROM entity_data e
+    JOIN ranked r ON r.entity_type = e.entity_type AND r.entity_id = e.entity_id
+    ORDER BY e.similarity DESC;
+  `
+  return Array.from(await db.unsafe(query, [JSON.stringify(results)])) as DatabaseRow[]
+}
+
 export async function POST(request: Request) {
   try {
     const body = await request.json()
@@ -33,6 +80,17 @@ export async function POST(request: Request) {
       )
     }
 
+    if (similarityServiceUrl) {
+      try {
+        const recommendations = await getServiceRecommendations(validationResult.data)
+        return NextResponse.json({ 
+          results: mapResults(recommendations)
+        })
+      } catch (error) {
+        console.error('Similarity service error, falling back to SQL:', error)
+      }
+    }
+
     const { embeddings, entity_type, limit, offset, exclude } = validationResult.data
     
     // Convert embeddings to array of vector strings
@@ -4,6 +4,24 @@ import { removeStopwords } from 'stopword'
 import { entityDataCTE, mapResults, DatabaseRow } from './sql/common'
 
 const defaultLimit = 25
+// Same settings as the indexer: in halfvec mode rank on the compact embedding_half column
+const halfvecSearch = process.env.VECTOR_STORAGE_MODE === 'halfvec'
+const halfvecDimensions = Number(process.env.VECTOR_STORAGE_DIMENSIONS) || 384
+
+// Distance and similarity SQL for the query embedding against the configured column
+function embeddingRanking(embedding: number[]) {
+  if (!halfvecSearch) {
+    const distance = `vi.embedding <=> '[${embedding.join(',')}]'::vector`
+    return { column: 'vi.embedding', distance, similarity: `1 - (${distance})` }
+  }
+  // Stored half vectors are truncated and L2-normalized, so the query is too;
+  // <#> is the negative inner product, which equals -cosine for unit vectors
+  const query = embedding.slice(0, halfvecDimensions)
+  const norm = Math.sqrt(query.reduce((sum, x) => sum + x * x, 0)) || 1
+  const distance = `vi.embedding_half <#> '[${query.map(x => x / norm).join(',')}]'::halfvec`
+  return { column: 'vi.embedding_half', distance, similarity: `-(${distance})` }
+}
+
 export async function POST(request: Request) {
   try {
     const { keyword, embedding, page = 1 } = await request.json()
@@ -78,8 +96,8 @@ export async function POST(request: Request) {
 
     // If we have an embedding, get embedding results
     if (embedding) {
-      const vectorString = `[${embedding.join(',')}]`
-      
+      const ranking = embeddingRanking(embedding)
+
       const existingIds = results.map(r => r.entity_id);
 
       const embeddingQuery = `
@@ -91,16 +109,16 @@ export async function POST(request: Request) {
             vi.state_abbr,
             vi.state_name,
             vi.entity_uuid,
-            1 - (vi.embedding <=> '${vectorString}'::vector) as similarity,
+            ${ranking.similarity} as similarity,
             'embedding' as source
           FROM vector_index vi
           LEFT JOIN lsv_bill bill ON vi.entity_type = 'bill' AND vi.entity_id = bill.bill_id
           LEFT JOIN bill_analysis_results bar ON vi.entity_type = 'bill' AND vi.entity_id = bar.bill_id
-          WHERE vi.embedding IS NOT NULL
+          WHERE ${ranking.column} IS NOT NULL
           AND (vi.entity_type != 'bill' OR (vi.entity_type = 'bill' AND bill.bill_type_id = 1 AND bar.bill_id IS NOT NULL))
           AND vi.entity_id NOT IN (${existingIds.length ? existingIds.join(',') : 0})
-          AND (1 - (vi.embedding <=> '${vectorString}'::vector)) > 0.30
-          ORDER BY vi.embedding <=> '${vectorString}'::vector
+          AND (${ranking.similarity}) > 0.30
+          ORDER BY ${ranking.distance}
           OFFSET ${offset}
           LIMIT ${defaultLimit + 1}
         ),
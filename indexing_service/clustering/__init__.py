@@ -5,19 +5,28 @@ Provides functionality for clustering legislative bills by theme using embedding
 """
 
 from .embeddings import EmbeddingGenerator
+from .embedding_store import EmbeddingStore, embed_with_store
 from .clustering import cluster_embeddings, reduce_dimensions
 from .analysis import analyze_clusters, generate_cluster_report
+from .sparse import hybrid_scores, lexical_score
 from .data import fetch_bills, prepare_bill_text, get_week_dates
+from .db import create_pool, connect
 from .main import main
 
 __all__ = [
     'EmbeddingGenerator',
+    'EmbeddingStore',
+    'embed_with_store',
     'cluster_embeddings',
     'reduce_dimensions',
     'analyze_clusters',
     'generate_cluster_report',
+    'hybrid_scores',
+    'lexical_score',
     'fetch_bills',
     'prepare_bill_text',
     'get_week_dates',
+    'create_pool',
+    'connect',
     'main'
 ] 
\ No newline at end of file
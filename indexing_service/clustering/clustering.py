@@ -3,62 +3,194 @@ Core clustering functionality using UMAP and HDBSCAN.
 """
 
 import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
 import numpy as np
+from sklearn.decomposition import PCA
 from sklearn.preprocessing import normalize
+from sklearn.random_projection import GaussianRandomProjection
 from umap import UMAP
 import hdbscan
 
+from .knn_graph import KNN_CACHE_DIR, build_knn_graph
+
 logger = logging.getLogger(__name__)
 
-def reduce_dimensions(embeddings: np.ndarray) -> np.ndarray:
-    """Reduce embedding dimensions using UMAP."""
-    logger.info("\nReducing dimensions from 1024 to 256...")
+RANDOM_STATE = 42
+
+@dataclass(frozen=True)
+class ReducerConfig:
+    n_components: int = 256
+    n_neighbors: int = 50
+    min_dist: float = 0.05
+    pre_reduction: Optional[str] = None  # 'pca' or 'random-projection' before UMAP
+    pre_components: int = 128
+    seeded: bool = True  # umap-learn runs single-threaded whenever random_state is set
+
+REDUCER_MODES = {
+    # Reproducible output, as the weekly run has always produced
+    'umap': ReducerConfig(),
+    # Same embedding space, but parallel and not bit-for-bit reproducible
+    'umap-parallel': ReducerConfig(seeded=False),
+    # Cheaper neighbor search on a linear pre-reduction
+    'pca-umap': ReducerConfig(pre_reduction='pca', seeded=False),
+    'rp-umap': ReducerConfig(pre_reduction='random-projection', seeded=False),
+    # Low-dimensional space used only for density clustering
+    'cluster-space': ReducerConfig(n_components=10, min_dist=0.0, pre_reduction='pca', seeded=False),
+}
+DEFAULT_REDUCER = 'umap'
+
+HDBSCAN_PARAMS = {
+    'min_cluster_size': 12,
+    'min_samples': 4,
+    'cluster_selection_epsilon': 0.2,
+    'cluster_selection_method': 'eom',
+}
+# Neighbors kept in the reduced-space graph: core distances need min_samples,
+# the extra edges keep the sparse spanning tree close to the exact one
+HDBSCAN_KNN_NEIGHBORS = 30
+
+@dataclass
+class FittedReducer:
+    """Pre-reduction and UMAP fitted in one run, able to place new embeddings in the same space."""
+    mode: str
+    projector: Optional[object]  # PCA or random projection fitted ahead of UMAP
+    umap: UMAP
+    transformable: bool = True  # False when UMAP was fitted on a cached graph without its search index
+
+    def prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        normalized = normalize(embeddings)
+        if self.projector is not None:
+            normalized = normalize(self.projector.transform(normalized))
+        return normalized
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        if not self.transformable:
+            raise ValueError("Reducer was fitted on a cached kNN graph and cannot transform new points")
+        return self.umap.transform(self.prepare(embeddings))
+
+def pre_reduce(normalized: np.ndarray, config: ReducerConfig):
+    """Fit the linear pre-reduction ahead of UMAP; returns (projector, re-normalized output)."""
+    components = min(config.pre_components, normalized.shape[0], normalized.shape[1])
+    if config.pre_reduction == 'pca':
+        projector = PCA(n_components=components, random_state=RANDOM_STATE)
+    elif config.pre_reduction == 'random-projection':
+        projector = GaussianRandomProjection(n_components=components, random_state=RANDOM_STATE)
+    else:
+        raise ValueError(f"Unknown pre-reduction: {config.pre_reduction}")
+    return projector, normalize(projector.fit_transform(normalized))
+
+def fit_reducer(embeddings: np.ndarray, mode: str = DEFAULT_REDUCER, shared_knn: bool = False,
+                knn_cache_dir: Optional[Path] = KNN_CACHE_DIR, config: Optional[ReducerConfig] = None):
+    """Fit the configured reducer (see REDUCER_MODES).
+    
+    With shared_knn, UMAP uses the cached NN-descent graph of its input instead of building its own.
+    A config, e.g. from a parameter sweep, overrides the mode's settings.
+    
+    Returns:
+        Tuple of (reduced embeddings, FittedReducer)
+    """
+    if config is None:
+        if mode not in REDUCER_MODES:
+            raise ValueError(f"Unknown reducer mode: {mode}")
+        config = REDUCER_MODES[mode]
+    logger.info(f"\nReducing dimensions from {embeddings.shape[1]} to {config.n_components} ({mode})...")
     
     # Normalize embeddings
     normalized = normalize(embeddings)
+    projector = None
+    if config.pre_reduction:
+        projector, normalized = pre_reduce(normalized, config)
+        logger.info(f"Pre-reduced with {config.pre_reduction} to {normalized.shape[1]} dimensions")
+    
+    precomputed_knn = (None, None, None)
+    transformable = True
+    if shared_knn:
+        graph = build_knn_graph(normalized, config.n_neighbors, 'cosine', knn_cache_dir)
+        precomputed_knn = (graph.indices, graph.distances, graph.index)
+        transformable = graph.index is not None
     
     # Configure UMAP for optimal CPU performance
     reducer = UMAP(
-        n_components=256,
-        n_neighbors=50,
-        min_dist=0.05,
+        n_components=config.n_components,
+        n_neighbors=config.n_neighbors,
+        min_dist=config.min_dist,
         metric='cosine',
-        random_state=42,
-        n_jobs=-1  # Use all available CPU cores
+        random_state=RANDOM_STATE if config.seeded else None,
+        n_jobs=-1,  # Only honored when unseeded
+        precomputed_knn=precomputed_knn
     )
     
     # Reduce dimensions
     reduced = reducer.fit_transform(normalized)
     logger.info(f"Reduced shape: {reduced.shape}")
+    return reduced, FittedReducer(mode, projector, reducer, transformable)
+
+def reduce_dimensions(embeddings: np.ndarray, mode: str = DEFAULT_REDUCER, shared_knn: bool = False,
+                      knn_cache_dir: Optional[Path] = KNN_CACHE_DIR) -> np.ndarray:
+    """Reduce embedding dimensions with the configured reducer (see REDUCER_MODES)."""
+    reduced, _ = fit_reducer(embeddings, mode, shared_knn, knn_cache_dir)
     return reduced
 
-def cluster_embeddings(reduced_embeddings: np.ndarray):
-    """Perform clustering on reduced embeddings."""
+def hdbscan_params(overrides: Optional[dict] = None) -> dict:
+    """HDBSCAN_PARAMS with any non-None overrides applied."""
+    return {**HDBSCAN_PARAMS, **{k: v for k, v in (overrides or {}).items() if v is not None}}
+
+def fit_clusterer(reduced_embeddings: np.ndarray, shared_knn: bool = False,
+                  knn_cache_dir: Optional[Path] = KNN_CACHE_DIR, params: Optional[dict] = None):
+    """Perform clustering on reduced embeddings.
+    
+    With shared_knn, core distances and the spanning tree come from a cached
+    approximate kNN graph of the reduced space instead of exact neighbor search.
+    params override HDBSCAN_PARAMS.
+    
+    Returns:
+        Tuple of (labels, probabilities, clusterer); the clusterer is None when it
+        has no prediction data (precomputed distances)
+    """
     logger.info("\nClustering reduced embeddings...")
+    params = hdbscan_params(params)
+    
+    if shared_knn:
+        graph = build_knn_graph(
+            reduced_embeddings, max(HDBSCAN_KNN_NEIGHBORS, params['min_samples'] + 1), 'euclidean', knn_cache_dir
+        )
+        clusterer = hdbscan.HDBSCAN(metric='precomputed', **params)
+        try:
+            labels = clusterer.fit_predict(graph.to_sparse())
+            return log_cluster_stats(labels), getattr(clusterer, 'probabilities_', None), None
+        except ValueError as e:
+            # Raised when the sparse graph is disconnected
+            logger.warning(f"Sparse kNN clustering failed ({str(e)}); using exact neighbors")
     
     clusterer = hdbscan.HDBSCAN(
-        min_cluster_size=12,
-        min_samples=4,
-        cluster_selection_epsilon=0.2,
         metric='euclidean',
-        cluster_selection_method='eom',
         prediction_data=True,
-        core_dist_n_jobs=-1  # Use all available CPU cores
+        core_dist_n_jobs=-1,  # Use all available CPU cores
+        **params
     )
     
     labels = clusterer.fit_predict(reduced_embeddings)
     probabilities = getattr(clusterer, 'probabilities_', None)
-    
-    # Log clustering stats
-    unique_labels = set(labels)
-    n_clusters = len(unique_labels) - (1 if -1 in labels else 0)
-    n_noise = list(labels).count(-1)
-    cluster_sizes = [list(labels).count(i) for i in range(max(labels) + 1)]
+    return log_cluster_stats(labels), probabilities, clusterer
+
+def cluster_embeddings(reduced_embeddings: np.ndarray, shared_knn: bool = False,
+                       knn_cache_dir: Optional[Path] = KNN_CACHE_DIR):
+    """Perform clustering on reduced embeddings; returns (labels, probabilities)."""
+    labels, probabilities, _ = fit_clusterer(reduced_embeddings, shared_knn, knn_cache_dir)
+    return labels, probabilities
+
+def log_cluster_stats(labels: np.ndarray) -> np.ndarray:
+    """Log cluster count, noise and size range; returns labels unchanged."""
+    cluster_sizes = np.bincount(labels[labels >= 0])
+    n_clusters = len(cluster_sizes)
+    n_noise = int((labels == -1).sum())
     
     logger.info(f"\nClustering Statistics:")
     logger.info(f"Number of clusters: {n_clusters}")
     logger.info(f"Noise points: {n_noise} ({n_noise/len(labels):.1%})")
-    if cluster_sizes:
-        logger.info(f"Cluster sizes: min={min(cluster_sizes)}, max={max(cluster_sizes)}, avg={sum(cluster_sizes)/len(cluster_sizes):.1f}")
+    if n_clusters:
+        logger.info(f"Cluster sizes: min={cluster_sizes.min()}, max={cluster_sizes.max()}, avg={cluster_sizes.mean():.1f}")
     
-    return labels, probabilities 
\ No newline at end of file
+    return labels
@@ -0,0 +1,104 @@
+"""
+Shared asyncpg connections for the clustering package.
+
+One pool per run serves every fetch, lineage query and store. Connections are
+created from the shared database config with the same SSL context, get the
+binary pgvector codec when they open, and stay open between weeks, so range
+runs do not repeat TLS handshakes. asyncpg prepares every parameterized
+statement on first use and keeps it in a per-connection cache; the pool
+settings below keep those prepared statements alive for the whole run instead
+of re-parsing the week queries per stage and per week.
+"""
+
+import logging
+import struct
+from typing import Any, AsyncIterator, Dict, Iterable, Sequence
+from urllib.parse import urlparse
+
+import asyncpg
+import numpy as np
+
+from ..config import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_CONNECT_ARGS
+
+logger = logging.getLogger(__name__)
+
+PGVECTOR_SCHEMA = 'public'
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 3  # Week loader, cursor producer and the locked store connection
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+MAX_CACHED_STATEMENT_LIFETIME = 0  # Never expire prepared statements during a run
+MAX_INACTIVE_CONNECTION_LIFETIME = 0  # Keep idle connections across long clustering stages
+
+def get_connection_kwargs() -> Dict[str, Any]:
+    """asyncpg connection parameters derived from the shared database config."""
+    url = urlparse(SQLALCHEMY_DATABASE_URL.replace('postgresql+asyncpg://', 'postgres://'))
+    return {
+        'user': url.username,
+        'password': url.password,
+        'database': url.path[1:],
+        'host': url.hostname,
+        'port': url.port or 5432,
+        'ssl': SQLALCHEMY_CONNECT_ARGS.get('ssl'),
+        'statement_cache_size': STATEMENT_CACHE_SIZE,
+        'max_cached_statement_lifetime': MAX_CACHED_STATEMENT_LIFETIME
+    }
+
+def encode_vector(vector) -> bytes:
+    """pgvector binary format: dimension, unused flags, big-endian float32 values."""
+    values = np.asarray(vector, dtype='>f4')
+    return struct.pack('>HH', len(values), 0) + values.tobytes()
+
+def decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = struct.unpack_from('>HH', data)
+    return np.frombuffer(data, dtype='>f4', count=dim, offset=4).astype(np.float32)
+
+async def register_vector_codec(conn: asyncpg.Connection):
+    """Let asyncpg send and receive pgvector values as NumPy arrays in binary format."""
+    await conn.set_type_codec(
+        'vector', schema=PGVECTOR_SCHEMA, encoder=encode_vector, decoder=decode_vector, format='binary'
+    )
+
+async def init_connection(conn: asyncpg.Connection):
+    """Run once on every new connection, pooled or not."""
+    await register_vector_codec(conn)
+
+async def create_pool(min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE) -> asyncpg.Pool:
+    """The run's connection pool; close it with pool.close()."""
+    pool = await asyncpg.create_pool(
+        min_size=min_size,
+        max_size=max_size,
+        max_inactive_connection_lifetime=MAX_INACTIVE_CONNECTION_LIFETIME,
+        init=init_connection,
+        **get_connection_kwargs()
+    )
+    logger.debug(f"Opened database pool ({min_size}-{max_size} connections)")
+    return pool
+
+async def connect() -> asyncpg.Connection:
+    """A single connection set up like the pooled ones, for one-off scripts."""
+    conn = await asyncpg.connect(**get_connection_kwargs())
+    try:
+        await init_connection(conn)
+    except Exception:
+        await conn.close()
+        raise
+    return conn
+
+async def copy_records(conn: asyncpg.Connection, table: str, records: Iterable[Sequence],
+                       columns: Sequence[str]) -> int:
+    """Binary COPY of records (any iterable, consumed lazily) into table; returns rows copied."""
+    status = await conn.copy_records_to_table(table, records=records, columns=list(columns))
+    return int(status.split()[-1])
+
+async def cursor_batches(conn: asyncpg.Connection, query: str, *args,
+                         batch_size: int) -> AsyncIterator[list]:
+    """Rows of a query in batches from a server-side cursor; the statement comes from the connection's cache."""
+    # Cursors only live inside a transaction
+    async with conn.transaction():
+        cursor = await conn.cursor(query, *args)
+        while True:
+            rows = await cursor.fetch(batch_size)
+            if not rows:
+                break
+            yield rows
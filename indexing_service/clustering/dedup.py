@@ -0,0 +1,123 @@
+"""
+Near-duplicate bill collapse with MinHash LSH.
+
+Model legislation and companion House/Senate bills produce many near-identical
+prepared texts. Each text is shingled into lowercased word 3-grams and given a
+128-permutation MinHash signature; LSH banding (16 bands of 8 rows) finds
+candidate representatives, and a text joins the first one whose estimated
+Jaccard similarity reaches the threshold. Only representatives are embedded,
+reduced and clustered; every member then takes its representative's embedding
+and cluster membership, and carries the representative's bill id as its
+duplicate group.
+
+The index is incremental, so streamed chunks are deduplicated against every
+earlier chunk of the week.
+"""
+
+import logging
+import re
+import zlib
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEDUP_THRESHOLD = 0.9  # Estimated Jaccard similarity of shingles to join a group
+DEDUP_SHINGLE_SIZE = 3  # Words per shingle
+DEDUP_BANDS = 16
+DEDUP_ROWS = 8  # Rows per band; bands × rows permutations
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+WORD_PATTERN = re.compile(r'\w+')
+
+@dataclass
+class DuplicateGroups:
+    representatives: np.ndarray  # Row of each group's first member
+    group_of: np.ndarray  # Group index of every row
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.representatives)
+
+    def sizes(self) -> np.ndarray:
+        return np.bincount(self.group_of, minlength=self.n_groups)
+
+class NearDuplicateIndex:
+    """Incremental MinHash LSH index that assigns each added text to a duplicate group."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = DEDUP_BANDS, rows: int = DEDUP_ROWS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.RandomState(1)
+        num_perm = bands * rows
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.buckets: List[dict] = [{} for _ in range(bands)]
+        self.signatures: List[np.ndarray] = []  # Signature of each group's representative
+        self.representatives: List[int] = []
+        self.group_of: List[int] = []
+
+    def signature(self, text: str) -> np.ndarray:
+        words = WORD_PATTERN.findall(text.lower())
+        k = min(DEDUP_SHINGLE_SIZE, max(len(words), 1))
+        shingles = {' '.join(words[i:i + k]) for i in range(max(len(words) - k + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        # Wrapping uint64 arithmetic, as in the usual MinHash implementations
+        with np.errstate(over='ignore'):
+            permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def add(self, texts: List[str]) -> np.ndarray:
+        """Group each text; returns the group index of every text, new groups numbered in order."""
+        groups = np.empty(len(texts), dtype=np.int64)
+        for i, text in enumerate(texts):
+            signature = self.signature(text)
+            keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+            group = self.match(signature, keys)
+            if group is None:
+                group = len(self.signatures)
+                self.signatures.append(signature)
+                self.representatives.append(len(self.group_of))
+                for bucket, key in zip(self.buckets, keys):
+                    bucket.setdefault(key, []).append(group)
+            self.group_of.append(group)
+            groups[i] = group
+        return groups
+
+    def match(self, signature: np.ndarray, keys: List[bytes]):
+        """First representative sharing a band whose estimated similarity reaches the threshold."""
+        checked = set()
+        for bucket, key in zip(self.buckets, keys):
+            for group in bucket.get(key, ()):
+                if group in checked:
+                    continue
+                checked.add(group)
+                if np.mean(self.signatures[group] == signature) >= self.threshold:
+                    return group
+        return None
+
+    def groups(self) -> DuplicateGroups:
+        return DuplicateGroups(
+            np.array(self.representatives, dtype=np.int64), np.array(self.group_of, dtype=np.int64)
+        )
+
+def label_duplicates(metadata: list, groups: DuplicateGroups) -> int:
+    """Set each bill's duplicate_group to its representative's bill id (None for singletons).
+
+    Returns:
+        Number of bills collapsed into another bill's group
+    """
+    sizes = groups.sizes()
+    for row, group in enumerate(groups.group_of):
+        representative = metadata[groups.representatives[group]]['bill_id']
+        metadata[row]['duplicate_group'] = representative if sizes[group] > 1 else None
+    collapsed = len(groups.group_of) - groups.n_groups
+    logger.info(f"Near-duplicate collapse: {len(groups.group_of)} bills in {groups.n_groups} groups "
+                f"({collapsed} duplicates, {int((sizes > 1).sum())} groups with more than one bill)")
+    return collapsed
@@ -0,0 +1,147 @@
+"""
+Persistent on-disk embedding store for the clustering pipeline.
+
+Embeddings are keyed by (bill_id, model, prepared-text hash) and kept in an
+append-only float32 file that is read through a memory map, with a small
+tab-separated key index next to it. A bill that is active in many weeks is
+only embedded again when its prepared text or the model changes.
+
+Layout:
+    <root>/<model key>/vectors.f32   raw float32 rows, appended
+    <root>/<model key>/keys.tsv      bill_id, text hash, row number per line
+    <root>/<model key>/meta.json     model name and dimension
+
+The store assumes a single writer per model directory.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Add default paths
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DEFAULT_STORE_DIR = PROJECT_ROOT / "embedding_store"
+
+def text_hash(text: str) -> str:
+    """Stable hash of prepared text used as part of the cache key."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class EmbeddingStore:
+    def __init__(self, model_name: str, dimension: int, root: Path = DEFAULT_STORE_DIR):
+        self.model_name = str(model_name)
+        self.dimension = dimension
+        model_key = hashlib.sha1(self.model_name.encode('utf-8')).hexdigest()[:16]
+        self.path = Path(root) / model_key
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.vectors_file = self.path / "vectors.f32"
+        self.keys_file = self.path / "keys.tsv"
+        meta_file = self.path / "meta.json"
+
+        if meta_file.exists():
+            meta = json.loads(meta_file.read_text())
+            if meta['dimension'] != dimension:
+                raise ValueError(
+                    f"Embedding store {self.path} has dimension {meta['dimension']}, expected {dimension}"
+                )
+        else:
+            meta_file.write_text(json.dumps({'model': self.model_name, 'dimension': dimension}))
+
+        self.index: Dict[Tuple[int, str], int] = {}
+        self.rows = 0
+        self._load_index()
+        self._vectors: Optional[np.memmap] = None
+
+    def _load_index(self):
+        """Read the key index, ignoring rows whose vectors were not fully written."""
+        row_bytes = self.dimension * 4
+        size = self.vectors_file.stat().st_size if self.vectors_file.exists() else 0
+        stored_rows = size // row_bytes
+        if size % row_bytes:
+            # An interrupted append left a partial row; drop it so later rows land where keys.tsv says
+            logger.warning(f"Embedding store {self.path}: truncating {size % row_bytes} bytes of a partial row")
+            with open(self.vectors_file, 'r+b') as f:
+                f.truncate(stored_rows * row_bytes)
+        if self.keys_file.exists():
+            with open(self.keys_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) != 3:
+                        continue
+                    row = int(parts[2])
+                    if row < stored_rows:
+                        self.index[(int(parts[0]), parts[1])] = row
+        self.rows = stored_rows
+        logger.info(f"Embedding store {self.path}: {len(self.index)} cached embeddings")
+
+    def _mapped(self) -> np.ndarray:
+        """Memory map of all stored rows, remapped after appends."""
+        if self._vectors is None or len(self._vectors) != self.rows:
+            if self.rows == 0:
+                return np.empty((0, self.dimension), dtype=np.float32)
+            self._vectors = np.memmap(
+                self.vectors_file, dtype=np.float32, mode='r', shape=(self.rows, self.dimension)
+            )
+        return self._vectors
+
+    def lookup(self, bill_ids: List[int], hashes: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (embeddings with zeros for misses, indices of the misses)."""
+        embeddings = np.zeros((len(bill_ids), self.dimension), dtype=np.float32)
+        positions = [self.index.get((int(bill_id), h)) for bill_id, h in zip(bill_ids, hashes)]
+        hits = np.array([i for i, p in enumerate(positions) if p is not None], dtype=np.int64)
+        misses = np.array([i for i, p in enumerate(positions) if p is None], dtype=np.int64)
+        if len(hits):
+            rows = np.array([positions[i] for i in hits], dtype=np.int64)
+            embeddings[hits] = self._mapped()[rows]
+        return embeddings, misses
+
+    def append(self, bill_ids: List[int], hashes: List[str], embeddings: np.ndarray):
+        """Append new embeddings; vectors are flushed before their keys are recorded."""
+        if len(bill_ids) == 0:
+            return
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with open(self.vectors_file, 'ab') as f:
+            # Appends start right after the last complete row, whatever a failed write left behind
+            f.truncate(self.rows * self.dimension * 4)
+            f.write(embeddings.tobytes())
+        with open(self.keys_file, 'a', encoding='utf-8') as f:
+            for offset, (bill_id, h) in enumerate(zip(bill_ids, hashes)):
+                row = self.rows + offset
+                f.write(f"{int(bill_id)}\t{h}\t{row}\n")
+                self.index[(int(bill_id), h)] = row
+        self.rows += len(bill_ids)
+
+def embed_with_store(generator, store: EmbeddingStore, texts: List[str], metadata: List[dict]) -> np.ndarray:
+    """Embed only texts missing from the store, then return embeddings for all texts."""
+    bill_ids = [m['bill_id'] for m in metadata]
+    hashes = [text_hash(t) for t in texts]
+    embeddings, misses = store.lookup(bill_ids, hashes)
+    logger.info(f"Embedding store hits: {len(texts) - len(misses)}/{len(texts)}")
+
+    if len(misses):
+        new_embeddings = generator.generate_embeddings([texts[i] for i in misses])
+        embeddings[misses] = new_embeddings
+        store.append([bill_ids[i] for i in misses], [hashes[i] for i in misses], new_embeddings)
+
+    return embeddings
+
+def load_vectors(path: Path, sample: int = 0) -> np.ndarray:
+    """Load embeddings from a .npy file or a store model directory, optionally a fixed random sample."""
+    path = Path(path)
+    if path.is_dir():
+        dimension = json.loads((path / "meta.json").read_text())['dimension']
+        # Complete rows only, in case an append was cut off
+        rows = (path / "vectors.f32").stat().st_size // (dimension * 4)
+        vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode='r', shape=(rows, dimension))
+    else:
+        vectors = np.load(path, mmap_mode='r')
+    if sample and sample < len(vectors):
+        rows = np.sort(np.random.default_rng(0).choice(len(vectors), sample, replace=False))
+        vectors = vectors[rows]
+    return np.ascontiguousarray(vectors, dtype=np.float32)
@@ -8,7 +8,8 @@ import torch
 from transformers import AutoTokenizer, AutoModel
 import numpy as np
 
-from ..config import EMBEDDING_MAX_LENGTH
+from ..config import EMBEDDING_MAX_LENGTH, SPARSE_TOP_K
+from .sparse import load_sparse_head, compute_sparse_weights
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +37,8 @@ def validate_model_path(model_path: str) -> Path:
     return path
 
 class EmbeddingGenerator:
-    def __init__(self, model_path: str = "BAAI/bge-m3", use_local: bool = False):
+    def __init__(self, model_path: str = "BAAI/bge-m3", use_local: bool = False,
+                 sparse: bool = False, sparse_top_k: int = SPARSE_TOP_K):
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         logger.info(f"Using device: {self.device}")
         
@@ -61,12 +63,50 @@ class EmbeddingGenerator:
             self.model.eval()
             logger.info("Model loaded successfully")
             
+            # Optional lexical head, applied to the same hidden states as the dense pooling
+            self.sparse_head = None
+            self.sparse_top_k = sparse_top_k
+            if sparse:
+                self.sparse_head = load_sparse_head(
+                    self.model_path,
+                    self.model.config.hidden_size,
+                    self.device,
+                    use_local=use_local
+                )
+            
         except Exception as e:
             logger.error(f"Failed to load model: {str(e)}")
             if use_local:
                 logger.error(f"Make sure the model is downloaded to: {MODELS_DIR}")
             raise
 
+    def _encode_batch(self, batch: list[str]):
+        """Run one forward pass and return normalized dense embeddings plus the raw model inputs/outputs."""
+        # Note: BGE-M3 doesn't need instruction prefix
+        
+        # Tokenize and move to device
+        inputs = self.tokenizer(
+            batch,
+            padding=True,
+            truncation=True,
+            max_length=EMBEDDING_MAX_LENGTH,
+            return_tensors="pt"
+        ).to(self.device)
+        
+        # Get model outputs
+        outputs = self.model(**inputs)
+        
+        # Use mean pooling
+        attention_mask = inputs['attention_mask']
+        token_embeddings = outputs.last_hidden_state
+        input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+        batch_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+        
+        # Normalize embeddings
+        batch_embeddings = torch.nn.functional.normalize(batch_embeddings, p=2, dim=1)
+        
+        return batch_embeddings, inputs, token_embeddings
+
     def generate_embeddings(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
         """Generate embeddings for a list of texts using BGE-M3."""
         embeddings = []
@@ -74,32 +114,44 @@ class EmbeddingGenerator:
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i + batch_size]
             with torch.no_grad():
-                # Note: BGE-M3 doesn't need instruction prefix
-                
-                # Tokenize and move to device
-                inputs = self.tokenizer(
-                    batch,
-                    padding=True,
-                    truncation=True,
-                    max_length=EMBEDDING_MAX_LENGTH,
-                    return_tensors="pt"
-                ).to(self.device)
-                
-                # Get model outputs
-                outputs = self.model(**inputs)
-                
-                # Use mean pooling
-                attention_mask = inputs['attention_mask']
-                token_embeddings = outputs.last_hidden_state
-                input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-                batch_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-                
-                # Normalize embeddings
-                batch_embeddings = torch.nn.functional.normalize(batch_embeddings, p=2, dim=1)
+                batch_embeddings, _, _ = self._encode_batch(batch)
+                embeddings.extend(batch_embeddings.cpu().numpy())
                 
+            if i % 1000 == 0 and i > 0:
+                logger.info(f"Processed {i}/{len(texts)} texts")
+        
+        return np.array(embeddings)
+
+    def generate_embeddings_with_sparse(self, texts: list[str], batch_size: int = 32):
+        """Generate dense embeddings and top-k sparse lexical weights from one forward pass.
+        
+        Returns:
+            Tuple of (embeddings array, list of (term_ids, weights) per text)
+        """
+        if self.sparse_head is None:
+            raise ValueError("Sparse weights requested but generator was created with sparse=False")
+        
+        special_token_ids = list(self.tokenizer.all_special_ids)
+        vocab_size = len(self.tokenizer)
+        embeddings = []
+        sparse = []
+        
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            with torch.no_grad():
+                batch_embeddings, inputs, token_embeddings = self._encode_batch(batch)
                 embeddings.extend(batch_embeddings.cpu().numpy())
+                sparse.extend(compute_sparse_weights(
+                    self.sparse_head,
+                    token_embeddings,
+                    inputs['input_ids'],
+                    inputs['attention_mask'],
+                    special_token_ids,
+                    vocab_size,
+                    self.sparse_top_k
+                ))
                 
             if i % 1000 == 0 and i > 0:
                 logger.info(f"Processed {i}/{len(texts)} texts")
         
-        return np.array(embeddings) 
\ No newline at end of file
+        return np.array(embeddings), sparse
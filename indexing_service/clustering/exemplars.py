@@ -0,0 +1,115 @@
+"""
+Token-budgeted exemplar bills per cluster for the LLM analysis prompt.
+
+Each cluster gets a small, diverse subset of its bills, in order:
+  1. the medoid, among the bills nearest the centroid
+  2. further bills nearest the centroid
+  3. one bill per state picked by maximal marginal relevance, so states not
+     yet represented are covered without repeating near-identical bills
+Bills are added while their token counts (embedding model tokenizer, plus a
+fixed per-bill allowance for the fields the prompt adds) fit the budget.
+Candidate pools come from partial sorts (np.argpartition) of the member
+distances already computed in ClusterStats.
+"""
+
+import logging
+from typing import Dict, List
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from .stats import ClusterStats
+
+logger = logging.getLogger(__name__)
+
+EXEMPLAR_TOKEN_BUDGET = 6000  # Tokens of bill text per cluster prompt
+EXEMPLAR_BILL_OVERHEAD = 60  # Tokens for the status, sponsor and action lines added per bill
+EXEMPLAR_CANDIDATES = 64  # Bills nearest the centroid considered for the medoid
+EXEMPLAR_NEAREST = 3  # Nearest-to-centroid bills after the medoid
+EXEMPLAR_MMR_LAMBDA = 0.7  # Relevance weight against redundancy in MMR
+
+def count_tokens(tokenizer, texts: List[str], batch_size: int = 1000) -> List[int]:
+    """Token count of each text under the model tokenizer, without special tokens."""
+    counts = []
+    for i in range(0, len(texts), batch_size):
+        encoded = tokenizer(texts[i:i + batch_size], add_special_tokens=False, truncation=False)
+        counts.extend(len(ids) for ids in encoded['input_ids'])
+    return counts
+
+def mmr_order(candidates: np.ndarray, relevance: np.ndarray, selected: np.ndarray,
+              lam: float = EXEMPLAR_MMR_LAMBDA) -> List[int]:
+    """Order candidate rows by maximal marginal relevance against an initial selection.
+
+    Args:
+        candidates: (c, d) normalized embeddings
+        relevance: (c,) similarity of each candidate to the cluster centroid
+        selected: (s, d) normalized embeddings already chosen
+    """
+    redundancy = (candidates @ selected.T).max(axis=1) if len(selected) else np.zeros(len(candidates))
+    remaining = np.ones(len(candidates), dtype=bool)
+    order = []
+    for _ in range(len(candidates)):
+        scores = np.where(remaining, lam * relevance - (1 - lam) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        order.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    return order
+
+def cluster_exemplars(label: int, stats: ClusterStats, embeddings: np.ndarray, metadata: list,
+                      budget: int = EXEMPLAR_TOKEN_BUDGET) -> List[Dict]:
+    """Pick one cluster's exemplars within the token budget."""
+    members = stats.members(label)
+    distances = stats.member_distances(label)
+    vectors = normalize(embeddings[members])
+    centroid = stats.centroids[label] / max(np.linalg.norm(stats.centroids[label]), 1e-12)
+
+    # Medoid among the bills nearest the centroid, by mean cosine distance to every member
+    k = min(EXEMPLAR_CANDIDATES, len(members))
+    nearest = np.argpartition(distances, k - 1)[:k]
+    nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+    mean_similarity = (vectors[nearest] @ vectors.T).mean(axis=1)
+    medoid = nearest[int(np.argmax(mean_similarity))]
+
+    picks = [(medoid, 'medoid')]
+    picks += [(i, 'centroid') for i in nearest if i != medoid][:EXEMPLAR_NEAREST]
+
+    # One candidate per state, its bill nearest the centroid, ordered by MMR
+    codes = stats.state_codes[members]
+    by_state = np.lexsort((distances, codes))
+    first = by_state[np.concatenate(([True], codes[by_state][1:] != codes[by_state][:-1]))]
+    chosen = {i for i, _ in picks}
+    covered = {codes[i] for i, _ in picks}
+    pool = np.array([i for i in first if i not in chosen and codes[i] not in covered], dtype=np.int64)
+    if len(pool):
+        selected = vectors[[i for i, _ in picks]]
+        picks += [(pool[j], 'mmr') for j in mmr_order(vectors[pool], vectors[pool] @ centroid, selected)]
+
+    exemplars, used, groups = [], 0, set()
+    for i, reason in picks:
+        bill = metadata[members[i]]
+        group = bill.get('duplicate_group')
+        if group is not None and group in groups:
+            continue
+        cost = bill.get('token_count', 0) + EXEMPLAR_BILL_OVERHEAD
+        if used + cost > budget and exemplars:
+            continue
+        exemplars.append({'bill_id': bill['bill_id'], 'reason': reason, 'tokens': cost})
+        used += cost
+        if group is not None:
+            groups.add(group)
+    return exemplars
+
+def select_exemplars(clusters: list, stats: ClusterStats, embeddings: np.ndarray, metadata: list,
+                     budget: int = EXEMPLAR_TOKEN_BUDGET) -> None:
+    """Add 'exemplars' and 'exemplar_tokens' to every cluster (clusters in label order)."""
+    total_members = total_exemplars = 0
+    for label, cluster_info in enumerate(clusters):
+        exemplars = cluster_exemplars(label, stats, embeddings, metadata, budget)
+        cluster_info['exemplars'] = exemplars
+        cluster_info['exemplar_tokens'] = sum(e['tokens'] for e in exemplars)
+        total_members += cluster_info['size']
+        total_exemplars += len(exemplars)
+    if clusters:
+        logger.info(f"Selected {total_exemplars} exemplars for {len(clusters)} clusters "
+                    f"({total_exemplars / max(total_members, 1):.1%} of member bills)")
@@ -0,0 +1,106 @@
+"""
+Class-based TF-IDF keyword labels for clusters.
+
+One sparse term matrix (unigrams and bigrams) is built over the week's
+prepared bill texts. Summing its rows per cluster with one sparse product
+gives each cluster's term frequencies, which are weighted as in c-TF-IDF:
+
+    w(t, c) = tf(t, c) / |c| * log(1 + A / f(t))
+
+where |c| is the cluster's total term count, f(t) the term's frequency over
+all clustered bills and A the average term count per cluster. The top terms
+become the cluster name and keywords, so clusters are readable before the
+LLM analysis runs.
+"""
+
+import logging
+from typing import List
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_COUNT = 10
+NAME_KEYWORDS = 3
+MAX_NAME_LENGTH = 255
+
+# Words in nearly every bill title that say nothing about its subject
+LEGISLATIVE_STOP_WORDS = frozenset({
+    'act', 'acts', 'amend', 'amended', 'amending', 'amends', 'amendment', 'bill', 'bills', 'chapter',
+    'code', 'concerning', 'effective', 'date', 'general', 'law', 'laws', 'provide', 'provides',
+    'providing', 'provision', 'provisions', 'regarding', 'relating', 'relative', 'relates', 'revise',
+    'revises', 'section', 'sections', 'statute', 'statutes', 'state', 'title', 'ann', 'stat', 'rev',
+    'subsection', 'paragraph', 'annotated', 'herein', 'thereof',
+})
+
+def keyword_vectorizer() -> CountVectorizer:
+    return CountVectorizer(
+        ngram_range=(1, 2),
+        stop_words=list(ENGLISH_STOP_WORDS | LEGISLATIVE_STOP_WORDS),
+        token_pattern=r'(?u)\b[a-zA-Z][a-zA-Z]+\b',
+        min_df=2,
+        dtype=np.float32
+    )
+
+def class_tfidf(term_matrix: csr_matrix, labels: np.ndarray) -> csr_matrix:
+    """(k, V) c-TF-IDF weights of every cluster for a (n, V) term matrix."""
+    members = np.flatnonzero(labels >= 0)
+    n_clusters = int(labels.max()) + 1
+    incidence = csr_matrix(
+        (np.ones(len(members), dtype=np.float32), (labels[members], members)),
+        shape=(n_clusters, term_matrix.shape[0])
+    )
+    tf = (incidence @ term_matrix).tocsr()
+    class_sizes = np.asarray(tf.sum(axis=1)).ravel()
+    term_totals = np.asarray(tf.sum(axis=0)).ravel()
+    idf = np.log1p(class_sizes.mean() / np.maximum(term_totals, 1))
+    # Row scaling by 1/|c| and column scaling by idf, without densifying
+    return (diags(1 / np.maximum(class_sizes, 1)) @ tf @ diags(idf)).tocsr()
+
+def top_terms(weights: csr_matrix, vocabulary: np.ndarray, count: int = KEYWORD_COUNT) -> List[List[tuple]]:
+    """Highest-weighted (term, weight) pairs of each cluster, dropping unigrams inside a chosen bigram."""
+    results = []
+    for row in range(weights.shape[0]):
+        start, end = weights.indptr[row], weights.indptr[row + 1]
+        indices, data = weights.indices[start:end], weights.data[start:end]
+        # Partial sort: extra candidates leave room for the unigrams dropped below
+        k = min(count * 2, len(data))
+        if k == 0:
+            results.append([])
+            continue
+        top = np.argpartition(-data, k - 1)[:k]
+        top = top[np.argsort(-data[top], kind='stable')]
+        terms = []
+        for i in top:
+            term = vocabulary[indices[i]]
+            if any(term in chosen.split() or chosen in term.split() for chosen, _ in terms):
+                continue
+            terms.append((term, float(data[i])))
+            if len(terms) == count:
+                break
+        results.append(terms)
+    return results
+
+def label_clusters(clusters: list, labels: np.ndarray, texts: List[str]) -> None:
+    """Add 'name', 'keywords' and 'keyword_scores' to every cluster (clusters in label order)."""
+    if not clusters:
+        return
+    vectorizer = keyword_vectorizer()
+    try:
+        term_matrix = vectorizer.fit_transform(texts)
+    except ValueError:
+        # Empty vocabulary, e.g. a tiny week of one-word titles
+        logger.warning("No keyword vocabulary for this week; keeping placeholder cluster names")
+        return
+    vocabulary = vectorizer.get_feature_names_out()
+    terms = top_terms(class_tfidf(term_matrix, labels), vocabulary)
+
+    for cluster_info, cluster_terms in zip(clusters, terms):
+        keywords = [term for term, _ in cluster_terms]
+        cluster_info['keywords'] = keywords
+        cluster_info['keyword_scores'] = [weight for _, weight in cluster_terms]
+        if keywords:
+            cluster_info['name'] = ', '.join(keywords[:NAME_KEYWORDS])[:MAX_NAME_LENGTH]
+    logger.info(f"Labeled {len(clusters)} clusters from {len(vocabulary)} terms")
@@ -0,0 +1,85 @@
+"""
+Shared approximate k-nearest-neighbor graph for UMAP and HDBSCAN.
+
+The graph is built once with NN-descent (pynndescent, which umap-learn uses
+internally) and cached on disk, keyed by a hash of the input data and the
+metric. UMAP takes it as precomputed_knn; HDBSCAN takes its sparse form as a
+precomputed distance matrix when the graph was built on the same data and
+metric it clusters on. A cached graph with more neighbors than requested is
+truncated rather than rebuilt, so parameter sweeps and re-runs reuse it.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from pynndescent import NNDescent
+from scipy.sparse import csr_matrix
+
+logger = logging.getLogger(__name__)
+
+# Add default paths
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+KNN_CACHE_DIR = PROJECT_ROOT / "knn_cache"
+
+@dataclass
+class KnnGraph:
+    indices: np.ndarray  # (n, k) neighbor rows, each point's own row first
+    distances: np.ndarray  # (n, k) distances matching indices
+    metric: str
+    index: Optional[NNDescent] = None  # Search index, only on fresh builds (needed for UMAP transform)
+
+    @property
+    def n_neighbors(self) -> int:
+        return self.indices.shape[1]
+
+    def truncate(self, n_neighbors: int) -> 'KnnGraph':
+        """The same graph restricted to the nearest n_neighbors per point."""
+        if n_neighbors > self.n_neighbors:
+            raise ValueError(f"Graph has {self.n_neighbors} neighbors, {n_neighbors} requested")
+        return KnnGraph(self.indices[:, :n_neighbors], self.distances[:, :n_neighbors], self.metric, self.index)
+
+    def to_sparse(self) -> csr_matrix:
+        """Symmetric sparse distance matrix without self-edges, for HDBSCAN metric='precomputed'."""
+        n = len(self.indices)
+        rows = np.repeat(np.arange(n), self.n_neighbors)
+        cols = self.indices.ravel()
+        data = self.distances.ravel().astype(np.float64)
+        keep = (rows != cols) & (cols >= 0)
+        graph = csr_matrix((data[keep], (rows[keep], cols[keep])), shape=(n, n))
+        # An edge found from either end is kept; distances are equal both ways
+        return graph.maximum(graph.T).tocsr()
+
+def data_key(data: np.ndarray, tag: str) -> str:
+    """Cache key for a result derived from this exact data, e.g. a graph under a metric."""
+    data = np.ascontiguousarray(data)
+    digest = hashlib.sha1()
+    digest.update(f"{data.shape}:{data.dtype}:{tag}".encode('utf-8'))
+    digest.update(data.tobytes())
+    return digest.hexdigest()
+
+def build_knn_graph(data: np.ndarray, n_neighbors: int, metric: str,
+                    cache_dir: Optional[Path] = KNN_CACHE_DIR) -> KnnGraph:
+    """Approximate kNN graph with NN-descent, read from or written to the cache."""
+    n_neighbors = min(n_neighbors, len(data))
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = Path(cache_dir) / f"{data_key(data, metric)}.npz"
+        if cache_file.exists():
+            cached = np.load(cache_file)
+            if cached['indices'].shape[1] >= n_neighbors:
+                logger.info(f"Using cached {metric} kNN graph ({cached['indices'].shape[1]} neighbors)")
+                return KnnGraph(cached['indices'], cached['distances'], metric).truncate(n_neighbors)
+
+    logger.info(f"Building {metric} kNN graph with {n_neighbors} neighbors for {len(data)} points...")
+    index = NNDescent(data, n_neighbors=n_neighbors, metric=metric, n_jobs=-1, low_memory=True)
+    indices, distances = index.neighbor_graph
+    graph = KnnGraph(indices, distances, metric, index)
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_file, indices=indices, distances=distances)
+    return graph
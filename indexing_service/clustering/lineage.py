@@ -0,0 +1,131 @@
+"""
+Cross-week cluster lineage.
+
+New clusters are matched to the clusters of the previous few weeks with one
+cosine similarity matrix over the centroids and one sparse product for the
+Jaccard overlap of bill membership. Continuity is the Jaccard overlap of a
+pair whose centroids are similar enough, and zero otherwise. Pairs above a
+link threshold become parent/child links; a cluster whose best parent is
+above the reuse threshold takes over that parent's finished analysis instead
+of queuing a new LLM analysis.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List
+
+import asyncpg
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .data import get_week_dates
+
+logger = logging.getLogger(__name__)
+
+LINEAGE_LOOKBACK_WEEKS = 4
+LINEAGE_MIN_SIMILARITY = 0.85  # Centroid cosine similarity below which pairs never continue
+LINEAGE_LINK_THRESHOLD = 0.2  # Continuity needed to record a parent/child link
+LINEAGE_REUSE_THRESHOLD = 0.6  # Continuity needed to reuse the parent's analysis
+
+PREVIOUS_CLUSTERS_QUERY = """
+    SELECT
+        c.cluster_id::text AS cluster_id,
+        c.centroid_vector AS centroid,  -- Decoded to NumPy by the binary codec (db.py)
+        m.bill_ids,
+        a.analysis_id::text AS analysis_id
+    FROM legislation_clusters c
+    JOIN LATERAL (
+        SELECT array_agg(cb.bill_id) AS bill_ids
+        FROM cluster_bills cb
+        WHERE cb.cluster_id = c.cluster_id
+    ) m ON true
+    LEFT JOIN LATERAL (
+        SELECT ca.analysis_id
+        FROM cluster_analysis ca
+        WHERE ca.cluster_id = c.cluster_id
+        AND ca.status IN ('completed', 'no_theme')
+        ORDER BY ca.completed_at DESC NULLS LAST
+        LIMIT 1
+    ) a ON true
+    WHERE c.centroid_vector IS NOT NULL
+    AND cluster_week_start(c.cluster_year) + (c.cluster_week - 1) * 7 >= $1::date
+    AND cluster_week_start(c.cluster_year) + (c.cluster_week - 1) * 7 < $2::date
+"""
+
+async def fetch_previous_clusters(conn: asyncpg.Connection, week: int, year: int,
+                                  lookback_weeks: int = LINEAGE_LOOKBACK_WEEKS) -> List[Dict[str, Any]]:
+    """Clusters with centroids from the lookback_weeks weeks before (week, year)."""
+    week_start = get_week_dates(week, year)[0].date()
+    rows = await conn.fetch(
+        PREVIOUS_CLUSTERS_QUERY, week_start - timedelta(weeks=lookback_weeks), week_start
+    )
+    return [dict(row) for row in rows if row['bill_ids']]
+
+def membership_matrix(groups: List[List[int]], columns: Dict[int, int]) -> csr_matrix:
+    """Sparse cluster × bill incidence matrix."""
+    rows = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+    cols = np.array([columns[b] for g in groups for b in g], dtype=np.int64)
+    return csr_matrix((np.ones(len(cols), dtype=np.float32), (rows, cols)), shape=(len(groups), len(columns)))
+
+def jaccard_matrix(new_groups: List[List[int]], old_groups: List[List[int]]) -> np.ndarray:
+    """(new, old) Jaccard overlap of bill id groups, from one sparse product."""
+    columns = {bill_id: i for i, bill_id in enumerate(
+        np.unique(np.concatenate([np.concatenate(new_groups), np.concatenate(old_groups)]).astype(np.int64))
+    )}
+    intersection = (membership_matrix(new_groups, columns) @ membership_matrix(old_groups, columns).T).toarray()
+    new_sizes = np.array([len(g) for g in new_groups])[:, None]
+    old_sizes = np.array([len(g) for g in old_groups])[None, :]
+    return intersection / np.maximum(new_sizes + old_sizes - intersection, 1)
+
+def match_lineage(clusters: list, previous: List[Dict[str, Any]],
+                  min_similarity: float = LINEAGE_MIN_SIMILARITY,
+                  link_threshold: float = LINEAGE_LINK_THRESHOLD,
+                  reuse_threshold: float = LINEAGE_REUSE_THRESHOLD) -> Dict[str, Dict[str, Any]]:
+    """Match new clusters to previous ones.
+
+    Returns:
+        Dict of new cluster_id -> {'links': [(parent_id, similarity, jaccard, continuity)],
+        'reuse_analysis_id': analysis id to copy or None}, for clusters with at least one link
+    """
+    if not clusters or not previous:
+        return {}
+
+    new_centroids = np.stack([c['centroid'] for c in clusters]).astype(np.float32)
+    old_centroids = np.stack([np.asarray(p['centroid'], dtype=np.float32) for p in previous])
+    new_centroids /= np.maximum(np.linalg.norm(new_centroids, axis=1, keepdims=True), 1e-12)
+    old_centroids /= np.maximum(np.linalg.norm(old_centroids, axis=1, keepdims=True), 1e-12)
+    similarity = new_centroids @ old_centroids.T
+
+    new_groups = [[b['bill_id'] for b in c['bills']] for c in clusters]
+    old_groups = [list(p['bill_ids']) for p in previous]
+    jaccard = jaccard_matrix(new_groups, old_groups)
+
+    continuity = np.where(similarity >= min_similarity, jaccard, 0.0)
+
+    lineage = {}
+    for i, cluster in enumerate(clusters):
+        parents = np.flatnonzero(continuity[i] >= link_threshold)
+        if len(parents) == 0:
+            continue
+        parents = parents[np.argsort(-continuity[i, parents])]
+        best = parents[0]
+        reuse = previous[best]['analysis_id'] if continuity[i, best] >= reuse_threshold else None
+        lineage[cluster['cluster_id']] = {
+            'links': [
+                (previous[j]['cluster_id'], float(similarity[i, j]), float(jaccard[i, j]), float(continuity[i, j]))
+                for j in parents
+            ],
+            'reuse_analysis_id': reuse
+        }
+
+    reused = sum(1 for entry in lineage.values() if entry['reuse_analysis_id'])
+    logger.info(f"Lineage: {len(lineage)}/{len(clusters)} clusters continue earlier clusters; "
+                f"{reused} reuse a previous analysis")
+    return lineage
+
+async def find_lineage(conn: asyncpg.Connection, clusters: list, week: int, year: int,
+                       lookback_weeks: int = LINEAGE_LOOKBACK_WEEKS) -> Dict[str, Dict[str, Any]]:
+    """Fetch the previous weeks' clusters and match the new ones against them."""
+    previous = await fetch_previous_clusters(conn, week, year, lookback_weeks)
+    logger.info(f"Matching {len(clusters)} clusters against {len(previous)} from the previous {lookback_weeks} weeks")
+    return match_lineage(clusters, previous)
@@ -5,16 +5,33 @@ Main entry point for the clustering service.
 import logging
 import asyncio
 import argparse
+from datetime import date
 from pathlib import Path
 import asyncpg
-from typing import Optional
-import os
+import numpy as np
+from typing import List, Optional, Tuple
 
 from .embeddings import EmbeddingGenerator
-from .clustering import cluster_embeddings, reduce_dimensions
+from .embedding_store import EmbeddingStore, embed_with_store, DEFAULT_STORE_DIR
+from .clustering import fit_clusterer, fit_reducer, REDUCER_MODES, DEFAULT_REDUCER
+from .knn_graph import KNN_CACHE_DIR
+from .partitioned import fit_partitioned, PARTITION_TARGET_SIZE
 from .analysis import analyze_clusters, generate_cluster_report
-from .data import fetch_bills
-from .storage import store_clusters, generate_cluster_dml
+from .stats import compute_cluster_stats
+from .keywords import label_clusters
+from .exemplars import select_exemplars, count_tokens, EXEMPLAR_TOKEN_BUDGET
+from .dedup import NearDuplicateIndex, DuplicateGroups, DEDUP_THRESHOLD, label_duplicates
+from .data import (
+    fetch_bills, stream_bills, analyze_bill_data, get_week_dates, DEFAULT_STREAM_CHUNK_SIZE
+)
+from .db import create_pool
+from .lineage import find_lineage, LINEAGE_LOOKBACK_WEEKS
+from .storage import store_clusters, store_lexical_weights, store_assignments, week_lock
+from .run_artifacts import write_run_artifacts, new_run_dir, ARTIFACTS_DIR, EMBEDDING_DTYPES, DEFAULT_EMBEDDING_DTYPE
+from .run_models import (
+    MODELS_DIR as RUN_MODELS_DIR, DEFAULT_REFIT_NOISE, DEFAULT_REFIT_DRIFT,
+    run_dir, save_run_models, clear_run_models, load_run_models, record_seen, assign_bills
+)
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -24,96 +41,483 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 MODELS_DIR = PROJECT_ROOT / "models"
 DEFAULT_MODEL_DIR = MODELS_DIR / "bge-m3"
 
-async def get_db_connection(db_url: str) -> Optional[asyncpg.Connection]:
-    """Create database connection."""
+def parse_year_week(value: str) -> Tuple[int, int]:
+    """Parse a YEAR-WEEK argument such as 2025-3 into (year, week)."""
     try:
-        conn = await asyncpg.connect(db_url)
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {str(e)}")
-        return None
+        year, week = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YEAR-WEEK (e.g. 2025-3), got {value!r}")
+    if not 1 <= week <= 53:
+        raise argparse.ArgumentTypeError(f"Week must be between 1 and 53, got {week}")
+    return year, week
+
+def weeks_in_year(year: int) -> int:
+    """Number of weeks starting on a Monday in the year, matching get_week_dates (52 or 53)."""
+    first_monday = get_week_dates(1, year)[0].date()
+    return (date(year, 12, 31) - first_monday).days // 7 + 1
+
+def week_range(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """All (week, year) pairs from start to end inclusive, both given as (year, week)."""
+    weeks = []
+    year, week = start
+    while (year, week) <= end:
+        weeks.append((week, year))
+        week += 1
+        if week > weeks_in_year(year):
+            year, week = year + 1, 1
+    return weeks
+
+def embed_texts(args, embedding_generator: EmbeddingGenerator, store: Optional[EmbeddingStore],
+                texts: list, metadata: list):
+    """Generate embeddings (and optional sparse weights) for a batch of texts."""
+    if args.sparse:
+        # Sparse weights need the hidden states, so every text goes through the model
+        return embedding_generator.generate_embeddings_with_sparse(texts)
+    if store is None:
+        return embedding_generator.generate_embeddings(texts), None
+    return embed_with_store(embedding_generator, store, texts, metadata), None
+
+def cluster_week(embeddings: np.ndarray, metadata: list, texts: list, reducer: str = DEFAULT_REDUCER,
+                 knn_cache_dir: Optional[Path] = None, params: Optional[dict] = None,
+                 partition_size: Optional[int] = None, partition_workers: Optional[int] = None,
+                 groups: Optional[DuplicateGroups] = None,
+                 exemplar_budget: int = EXEMPLAR_TOKEN_BUDGET):
+    """CPU-bound stages for one week: reduce, cluster, analyze, report.
+    
+    A knn_cache_dir enables the shared NN-descent graphs for UMAP and HDBSCAN;
+    params override the default HDBSCAN settings. Weeks larger than
+    partition_size are clustered in k-means partitions (see partitioned.py).
+    With duplicate groups, only representatives are reduced and clustered and
+    every other bill takes its representative's label. Every cluster gets
+    exemplar bills within exemplar_budget tokens for its LLM analysis and
+    c-TF-IDF keywords from the prepared texts as its name.
+    
+    Returns:
+        Tuple of (labels, clusters, fitted reducer or None, fitted clusterer or None,
+        reduced embeddings, probabilities); partitioned runs return no models
+    """
+    shared_knn = knn_cache_dir is not None
+    fit_embeddings = embeddings if groups is None else embeddings[groups.representatives]
+
+    if partition_size and len(fit_embeddings) > partition_size:
+        # 2-3. Reduce and cluster per partition, then merge
+        reduced_embeddings, labels, probabilities = fit_partitioned(
+            fit_embeddings, reducer, knn_cache_dir, params, partition_size, partition_workers
+        )
+        fitted_reducer, clusterer = None, None
+    else:
+        partition_size = None
+
+        # 2. Reduce dimensions
+        reduced_embeddings, fitted_reducer = fit_reducer(fit_embeddings, reducer, shared_knn, knn_cache_dir)
+
+        # 3. Cluster
+        labels, probabilities, clusterer = fit_clusterer(reduced_embeddings, shared_knn, knn_cache_dir, params)
+
+    if groups is not None:
+        # Expand memberships back to every member of each duplicate group
+        reduced_embeddings = reduced_embeddings[groups.group_of]
+        labels = labels[groups.group_of]
+        if probabilities is not None:
+            probabilities = probabilities[groups.group_of]
+
+    # 4. Analyze results and get clusters, from one pass of cluster statistics
+    stats = compute_cluster_stats(labels, embeddings, reduced_embeddings, metadata)
+    clusters = analyze_clusters(embeddings, reduced_embeddings, labels, probabilities, metadata, stats)
+    select_exemplars(clusters, stats, embeddings, metadata, exemplar_budget)
+    label_clusters(clusters, labels, texts)
+
+    # 5. Generate clustering report
+    generate_cluster_report(clusters, metadata, embeddings, labels, reducer, params, stats, partition_size)
+
+    return labels, clusters, fitted_reducer, clusterer, reduced_embeddings, probabilities
+
+def expand_groups(groups: Optional[DuplicateGroups], embeddings: np.ndarray, sparse_weights: Optional[list]):
+    """Give every bill its duplicate group representative's embedding and sparse weights."""
+    if groups is None:
+        return embeddings, sparse_weights
+    if len(embeddings) != groups.n_groups:
+        raise ValueError(f"Expected one embedding per duplicate group ({groups.n_groups}), got {len(embeddings)}")
+    if sparse_weights is not None:
+        sparse_weights = [sparse_weights[group] for group in groups.group_of]
+    return embeddings[groups.group_of], sparse_weights
+
+async def add_token_counts(embedding_generator: EmbeddingGenerator, texts: list, metadata: list):
+    """Record each bill's token count under the model tokenizer, for exemplar budgets."""
+    counts = await asyncio.to_thread(count_tokens, embedding_generator.tokenizer, texts)
+    for meta, count in zip(metadata, counts):
+        meta['token_count'] = count
+
+async def load_week(args, week: int, year: int, pool: asyncpg.Pool,
+                    embedding_generator: EmbeddingGenerator, store: Optional[EmbeddingStore]):
+    """Fetch and embed one week's bills.
+
+    Unless args.no_dedup, near-duplicate texts are grouped first and only one
+    representative per group is embedded; every bill then gets its
+    representative's embedding.
+
+    Returns:
+        Tuple of (texts, metadata, embeddings, sparse weights or None, duplicate groups or None);
+        texts is None when there is nothing to cluster
+    """
+    index = None if args.no_dedup else NearDuplicateIndex(args.dedup_threshold)
+
+    if args.no_stream:
+        async with pool.acquire() as conn:
+            texts, metadata = await fetch_bills(
+                week,
+                year,
+                args.test_fetch,
+                model_path=args.model_path,
+                use_local=args.use_local,
+                conn=conn
+            )
+        if not texts:
+            return None, None, None, None, None
+        await add_token_counts(embedding_generator, texts, metadata)
+        embed_rows = range(len(texts))
+        if index is not None:
+            index.add(texts)
+            embed_rows = index.representatives
+        logger.info("\nGenerating embeddings...")
+        embeddings, sparse_weights = await asyncio.to_thread(
+            embed_texts, args, embedding_generator, store,
+            [texts[i] for i in embed_rows], [metadata[i] for i in embed_rows]
+        )
+        groups = None
+        if index is not None:
+            groups = index.groups()
+            label_duplicates(metadata, groups)
+        embeddings, sparse_weights = expand_groups(groups, embeddings, sparse_weights)
+        return texts, metadata, embeddings, sparse_weights, groups
+
+    # Streaming: a producer reads cursor chunks while the embedder works through earlier ones
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+
+    async def produce():
+        try:
+            async with pool.acquire() as conn:
+                async for chunk in stream_bills(week, year, conn, args.stream_chunk_size):
+                    await queue.put(chunk)
+        except BaseException:
+            # After a consumer failure nobody reads the queue again, so never wait on it here;
+            # queued chunks are dropped since the run fails either way
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+            raise
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    texts, metadata, embedding_chunks, sparse_weights = [], [], [], []
+    try:
+        logger.info("\nGenerating embeddings...")
+        while (chunk := await queue.get()) is not None:
+            chunk_texts, chunk_metadata = chunk
+            await add_token_counts(embedding_generator, chunk_texts, chunk_metadata)
+            embed_rows = range(len(chunk_texts))
+            if index is not None:
+                # Only texts that start a new group are embedded, in group order; later
+                # members of a group first seen in this chunk are not
+                known = len(index.representatives)
+                index.add(chunk_texts)
+                embed_rows = [row - len(texts) for row in index.representatives[known:]]
+            if len(embed_rows):
+                chunk_embeddings, chunk_sparse = await asyncio.to_thread(
+                    embed_texts, args, embedding_generator, store,
+                    [chunk_texts[i] for i in embed_rows], [chunk_metadata[i] for i in embed_rows]
+                )
+                embedding_chunks.append(chunk_embeddings)
+                if chunk_sparse is not None:
+                    sparse_weights.extend(chunk_sparse)
+            texts.extend(chunk_texts)
+            metadata.extend(chunk_metadata)
+            logger.info(f"Embedded {len(texts)} bills")
+        await producer  # surface fetch errors
+    finally:
+        producer.cancel()
+        # Let the producer return its connection before the pool is closed
+        await asyncio.gather(producer, return_exceptions=True)
+
+    if not texts:
+        return None, None, None, None, None
+    groups = None
+    if index is not None:
+        groups = index.groups()
+        label_duplicates(metadata, groups)
+    analyze_bill_data(metadata, texts)
+    embeddings, sparse_weights = expand_groups(
+        groups, np.vstack(embedding_chunks), sparse_weights if args.sparse else None
+    )
+    return texts, metadata, embeddings, sparse_weights, groups
+
+async def process_week(args, week: int, year: int, texts: list, metadata: list, embeddings: np.ndarray,
+                       sparse_weights: Optional[list], embedding_generator: EmbeddingGenerator,
+                       conn: asyncpg.Connection, groups: Optional[DuplicateGroups] = None):
+    """Cluster one week's embedded bills and store the results on the week's locked connection."""
+    # Run the heavy stages off the event loop so the next week's load can proceed
+    knn_cache_dir = Path(args.knn_cache) if args.shared_knn else None
+    params = {
+        'min_cluster_size': args.min_cluster_size,
+        'min_samples': args.min_samples,
+        'cluster_selection_epsilon': args.cluster_selection_epsilon
+    }
+    labels, clusters, fitted_reducer, clusterer, reduced_embeddings, probabilities = await asyncio.to_thread(
+        cluster_week, embeddings, metadata, texts, args.reducer, knn_cache_dir, params,
+        args.partition_size if args.partitioned else None, args.partition_workers, groups,
+        args.exemplar_budget
+    )
+
+    # 6. Store results, replacing any earlier run of the week
+    logger.info(f"Storing clusters for week {week}, year {year}")
+    lineage = None
+    if not args.no_lineage:
+        lineage = await find_lineage(conn, clusters, week, year, args.lineage_lookback)
+    await store_clusters(
+        conn=conn,
+        clusters=clusters,
+        metadata=metadata,
+        embeddings=embeddings,
+        labels=labels,
+        dry_run=args.dry_run,
+        week=week,
+        year=year,
+        lineage=lineage
+    )
+    if sparse_weights is not None:
+        await store_lexical_weights(
+            conn=conn,
+            metadata=metadata,
+            sparse=sparse_weights,
+            model_name=str(embedding_generator.model_path),
+            batch_size=args.batch_size,
+            dry_run=args.dry_run
+        )
+    if not args.no_artifacts:
+        # Written after storage so cluster ids match the stored (possibly reused) rows
+        run_info = {
+            'week': week, 'year': year, 'reducer': args.reducer, 'hdbscan_params': params,
+            'partition_size': args.partition_size if args.partitioned else None,
+            'dedup_threshold': None if args.no_dedup else args.dedup_threshold,
+            'model': str(embedding_generator.model_path), 'dry_run': args.dry_run
+        }
+        await asyncio.to_thread(
+            write_run_artifacts, new_run_dir(week, year, Path(args.artifacts_dir)), texts, metadata,
+            embeddings, reduced_embeddings, labels, probabilities, clusters, run_info, args.artifact_dtype
+        )
+    if args.dry_run:
+        logger.info("Dry run completed - all changes rolled back")
+    else:
+        logger.info("Successfully stored clustering results")
+        models_path = run_dir(week, year, Path(args.model_dir))
+        saved = False
+        if not args.no_save_models and fitted_reducer is not None:
+            saved = await asyncio.to_thread(
+                save_run_models, models_path, fitted_reducer, clusterer, clusters, metadata
+            )
+        if not saved:
+            # Models of an earlier run point at clusters this run may have removed
+            await asyncio.to_thread(clear_run_models, models_path)
+
+async def assign_week(args, week: int, year: int, metadata: list, embeddings: np.ndarray,
+                      conn: asyncpg.Connection) -> bool:
+    """Place bills that are new to a week into its saved clusters.
+    
+    Returns:
+        False when the week needs a full run: no saved models, or the noise rate
+        or drift of the new bills passes its threshold
+    """
+    models = await asyncio.to_thread(load_run_models, run_dir(week, year, Path(args.model_dir)))
+    if models is None:
+        logger.info(f"No saved models for week {week}, year {year}")
+        return False
+
+    new_rows = np.flatnonzero(~np.isin(
+        np.array([m['bill_id'] for m in metadata], dtype=np.int64), models.seen_bill_ids
+    ))
+    if len(new_rows) == 0:
+        logger.info(f"No new bills for week {week}, year {year}")
+        return True
+
+    drift = models.drift(len(new_rows))
+    if drift > args.refit_drift:
+        logger.info(f"Drift {drift:.1%} exceeds {args.refit_drift:.1%}; refitting")
+        return False
+
+    labels, strengths, distances = await asyncio.to_thread(assign_bills, models, embeddings[new_rows])
+    noise_rate = float(np.mean(labels == -1))
+    logger.info(f"Placed {len(new_rows)} new bills; noise rate {noise_rate:.1%}")
+    if noise_rate > args.refit_noise:
+        logger.info(f"Noise rate exceeds {args.refit_noise:.1%}; refitting")
+        return False
+
+    members = np.flatnonzero(labels >= 0)
+    if len(members):
+        await store_assignments(
+            conn=conn,
+            cluster_ids=[models.cluster_ids[labels[i]] for i in members],
+            bill_ids=[metadata[new_rows[i]]['bill_id'] for i in members],
+            distances=[float(distances[i]) for i in members],
+            confidences=[float(strengths[i]) for i in members],
+            batch_size=args.batch_size,
+            dry_run=args.dry_run
+        )
+    if not args.dry_run:
+        # Noise bills are recorded too so they count toward drift and are not retried
+        record_seen(models, [metadata[i]['bill_id'] for i in new_rows])
+    return True
 
 async def main():
     parser = argparse.ArgumentParser(description='Bill clustering service')
-    parser.add_argument('-week', type=int, help='Week number (1-53)', required=True)
-    parser.add_argument('-year', type=int, help='Year', required=True)
+    parser.add_argument('-week', type=int, help='Week number (1-53)')
+    parser.add_argument('-year', type=int, help='Year')
+    parser.add_argument('--from', dest='range_from', type=parse_year_week, metavar='YEAR-WEEK',
+                       help='First week of a range, e.g. 2025-1 (use with --to)')
+    parser.add_argument('--to', dest='range_to', type=parse_year_week, metavar='YEAR-WEEK',
+                       help='Last week of a range, inclusive, e.g. 2025-20')
     parser.add_argument('--test-fetch', action='store_true', help='Only test fetching bills')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
-    parser.add_argument('--model-path', type=str, default=str(DEFAULT_MODEL_DIR), 
+    parser.add_argument('--model-path', type=str, default=str(DEFAULT_MODEL_DIR),
                        help='Path to the model directory (absolute path or relative to project root)')
     parser.add_argument('--use-local', action='store_true', help='Use local model files only')
     parser.add_argument('--dry-run', action='store_true', help='Generate SQL but do not execute')
     parser.add_argument('--batch-size', type=int, default=1000, help='Batch size for database operations')
-    
+    parser.add_argument('--embedding-store', type=str, default=str(DEFAULT_STORE_DIR),
+                       help='Directory of the persistent embedding store')
+    parser.add_argument('--no-embedding-store', action='store_true',
+                       help='Embed every bill instead of reusing stored embeddings')
+    parser.add_argument('--no-stream', action='store_true',
+                       help='Fetch each week in one query instead of streaming it into the embedder')
+    parser.add_argument('--stream-chunk-size', type=int, default=DEFAULT_STREAM_CHUNK_SIZE,
+                       help='Rows per server-side cursor fetch when streaming')
+    parser.add_argument('--sparse', action='store_true',
+                       help='Also compute and store BGE-M3 sparse lexical weights from the same forward pass')
+    parser.add_argument('--no-dedup', action='store_true',
+                       help='Embed and cluster every bill instead of one representative per near-duplicate group')
+    parser.add_argument('--dedup-threshold', type=float, default=DEDUP_THRESHOLD,
+                       help='Estimated shingle Jaccard similarity at which bills are near-duplicates')
+    parser.add_argument('--exemplar-budget', type=int, default=EXEMPLAR_TOKEN_BUDGET,
+                       help='Token budget of the exemplar bills stored per cluster for LLM analysis')
+    parser.add_argument('--reducer', choices=list(REDUCER_MODES), default=DEFAULT_REDUCER,
+                       help='Dimensionality-reduction mode ahead of HDBSCAN')
+    parser.add_argument('--min-cluster-size', type=int, help='HDBSCAN min_cluster_size (default 12)')
+    parser.add_argument('--min-samples', type=int, help='HDBSCAN min_samples (default 4)')
+    parser.add_argument('--cluster-selection-epsilon', type=float,
+                       help='HDBSCAN cluster_selection_epsilon (default 0.2)')
+    parser.add_argument('--shared-knn', action='store_true',
+                       help='Build approximate kNN graphs once with NN-descent and reuse them for UMAP and HDBSCAN')
+    parser.add_argument('--knn-cache', type=str, default=str(KNN_CACHE_DIR),
+                       help='Directory of cached kNN graphs used with --shared-knn')
+    parser.add_argument('--partitioned', action='store_true',
+                       help='Cluster large weeks in k-means partitions in parallel processes, then merge')
+    parser.add_argument('--partition-size', type=int, default=PARTITION_TARGET_SIZE,
+                       help='Bills per partition with --partitioned; smaller weeks use a single pass')
+    parser.add_argument('--partition-workers', type=int,
+                       help='Worker processes for --partitioned (default: one per CPU)')
+    parser.add_argument('--model-dir', type=str, default=str(RUN_MODELS_DIR),
+                       help='Directory of saved reducer/clusterer models per week')
+    parser.add_argument('--no-save-models', action='store_true',
+                       help='Do not save fitted models after a full run')
+    parser.add_argument('--no-lineage', action='store_true',
+                       help='Do not match clusters to earlier weeks or reuse their analyses')
+    parser.add_argument('--lineage-lookback', type=int, default=LINEAGE_LOOKBACK_WEEKS,
+                       help='Weeks of earlier clusters to match new clusters against')
+    parser.add_argument('--artifacts-dir', type=str, default=str(ARTIFACTS_DIR),
+                       help='Directory of Arrow/Parquet artifacts written per clustering run')
+    parser.add_argument('--artifact-dtype', choices=list(EMBEDDING_DTYPES), default=DEFAULT_EMBEDDING_DTYPE,
+                       help='Precision of the embedding matrix in run artifacts')
+    parser.add_argument('--no-artifacts', action='store_true',
+                       help='Do not write run artifacts after a full run')
+    parser.add_argument('--assign', action='store_true',
+                       help='Place bills new to the week into its saved clusters instead of a full run')
+    parser.add_argument('--refit-noise', type=float, default=DEFAULT_REFIT_NOISE,
+                       help='With --assign, run a full refit when this share of new bills is noise')
+    parser.add_argument('--refit-drift', type=float, default=DEFAULT_REFIT_DRIFT,
+                       help='With --assign, run a full refit when bills added since the fit exceed this share')
+
     args = parser.parse_args()
-    
+
+    if args.range_from or args.range_to:
+        if not (args.range_from and args.range_to):
+            parser.error('--from and --to must be used together')
+        if args.week is not None or args.year is not None:
+            parser.error('-week/-year cannot be combined with --from/--to')
+        weeks = week_range(args.range_from, args.range_to)
+        if not weeks:
+            parser.error('--from must not be after --to')
+    elif args.week is not None and args.year is not None:
+        weeks = [(args.week, args.year)]
+    else:
+        parser.error('either -week and -year, or --from and --to, are required')
+
     logging.basicConfig(
         level=logging.DEBUG if args.debug else logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
-    
+
+    pool = None
+    next_load = None
     try:
-        # 1. Fetch bills and generate embeddings
-        texts, metadata = await fetch_bills(
-            args.week, 
-            args.year, 
-            args.test_fetch,
-            model_path=args.model_path,
-            use_local=args.use_local
-        )
-        
-        if texts is None or len(texts) == 0:
+        # One pool for every fetch and store in the run
+        pool = await create_pool()
+
+        if args.test_fetch:
+            for week, year in weeks:
+                async with pool.acquire() as conn:
+                    await fetch_bills(week, year, True, conn=conn)
             return
-            
-        # Generate embeddings
-        logger.info("\nGenerating embeddings...")
-        embedding_generator = EmbeddingGenerator(model_path=args.model_path, use_local=args.use_local)
-        embeddings = embedding_generator.generate_embeddings(texts)
-            
-        # 2. Reduce dimensions
-        reduced_embeddings = reduce_dimensions(embeddings)
-        
-        # 3. Cluster
-        labels, probabilities = cluster_embeddings(reduced_embeddings)
-        
-        # 4. Analyze results and get clusters
-        clusters = analyze_clusters(embeddings, reduced_embeddings, labels, probabilities, metadata)
-        
-        # 5. Generate clustering report
-        generate_cluster_report(clusters, metadata, embeddings, labels)
-
-        # 6. Store results
-        # Get database connection from environment
-        db_url = os.getenv('LEGISCAN_DB_URL')
-        if not db_url:
-            raise ValueError("LEGISCAN_DB_URL environment variable is required")
-            
-        conn = await get_db_connection(db_url)
-        if conn is None:
-            raise RuntimeError("Failed to connect to database")
-            
-        logger.info(f"Storing clusters for week {args.week}, year {args.year}")
-        await store_clusters(
-            conn=conn,
-            clusters=clusters,
-            metadata=metadata,
-            embeddings=embeddings,
-            labels=labels,
-            batch_size=args.batch_size,
-            dry_run=args.dry_run,
-            week=args.week,
-            year=args.year
+
+        # Load the model once for the whole range
+        embedding_generator = EmbeddingGenerator(
+            model_path=args.model_path, use_local=args.use_local, sparse=args.sparse
+        )
+        store = None
+        if not args.no_embedding_store:
+            store = EmbeddingStore(
+                model_name=embedding_generator.model_path,
+                dimension=embedding_generator.model.config.hidden_size,
+                root=Path(args.embedding_store)
+            )
+
+        # 1. Fetch and embed bills, loading the next week while the current one is clustered
+        next_load = asyncio.create_task(
+            load_week(args, *weeks[0], pool, embedding_generator, store)
         )
-        if args.dry_run:
-            logger.info("Dry run completed - all changes rolled back")
-        else:
-            logger.info("Successfully stored clustering results")
+        for i, (week, year) in enumerate(weeks):
+            texts, metadata, embeddings, sparse_weights, groups = await next_load
+            next_load = None
+            if i + 1 < len(weeks):
+                next_load = asyncio.create_task(
+                    load_week(args, *weeks[i + 1], pool, embedding_generator, store)
+                )
+
+            if texts is None or len(texts) == 0:
+                logger.info(f"No bills to cluster for week {week}, year {year}")
+                continue
+
+            # One run per week at a time, across every node
+            async with week_lock(pool, week, year) as conn:
+                if conn is None:
+                    logger.warning(f"Week {week}, year {year} is being clustered by another run; skipping")
+                    continue
+
+                if args.assign and await assign_week(args, week, year, metadata, embeddings, conn):
+                    continue
+
+                await process_week(
+                    args, week, year, texts, metadata, embeddings, sparse_weights, embedding_generator, conn, groups
+                )
     except ValueError as ve:
         logger.error(f"Invalid input: {str(ve)}")
         exit(1)
     except Exception as e:
         logger.error(f"Error: {str(e)}", exc_info=True)
         exit(1)
+    finally:
+        if next_load is not None:
+            next_load.cancel()
+        if pool is not None:
+            await pool.close()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
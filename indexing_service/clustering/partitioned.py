@@ -0,0 +1,211 @@
+"""
+Two-stage partitioned clustering for weeks too large for one UMAP fit.
+
+Stage one splits the week with mini-batch k-means on the normalized
+embeddings into partitions of roughly PARTITION_TARGET_SIZE bills. Bills
+nearly as close to a second partition centroid as to their own are placed in
+both, so topics straddling a boundary are seen whole on at least one side.
+Stage two runs the configured reducer and HDBSCAN on every partition in a
+pool of worker processes, which read their rows from one shared-memory copy
+of the embeddings. Peak memory and time per worker depend on the partition
+size rather than the week size.
+
+The merge step joins clusters from different partitions that share enough
+boundary bills or whose full-space centroids are close, then gives each
+boundary bill its most confident membership.
+
+Reduced coordinates come from each partition's own reducer, so they (and the
+stored reduced_vector of each cluster) are comparable only within a partition.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+
+from .clustering import RANDOM_STATE, DEFAULT_REDUCER, fit_reducer, fit_clusterer, log_cluster_stats
+
+logger = logging.getLogger(__name__)
+
+PARTITION_TARGET_SIZE = 8000  # Bills per partition
+PARTITION_MIN_SIZE = 1000  # Smaller partitions are folded into their neighbors
+PARTITION_OVERLAP_MARGIN = 0.02  # Cosine gap to a second centroid under which a bill joins both partitions
+PARTITION_MERGE_SIMILARITY = 0.95  # Centroid cosine similarity at which clusters across partitions merge
+PARTITION_MERGE_OVERLAP = 0.5  # Share of the smaller cluster's bills held in common at which clusters merge
+
+# Embeddings attached in each worker process
+_shared: Dict[str, Any] = {}
+
+def coarse_partition(embeddings: np.ndarray, target_size: int = PARTITION_TARGET_SIZE,
+                     min_size: int = PARTITION_MIN_SIZE,
+                     overlap_margin: float = PARTITION_OVERLAP_MARGIN) -> List[np.ndarray]:
+    """Split rows into overlapping partitions with mini-batch k-means.
+
+    Returns:
+        Row indices of each partition, ascending
+    """
+    n_partitions = max(1, math.ceil(len(embeddings) / target_size))
+    if n_partitions == 1:
+        return [np.arange(len(embeddings))]
+
+    normalized = normalize(embeddings)
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_partitions, batch_size=4096, n_init=3, random_state=RANDOM_STATE
+    ).fit(normalized)
+    similarity = normalized @ normalize(kmeans.cluster_centers_).T
+
+    # Fold partitions too small to reduce on their own into their neighbors
+    sizes = np.bincount(similarity.argmax(axis=1), minlength=n_partitions)
+    small = sizes < min_size
+    if small.all():
+        return [np.arange(len(embeddings))]
+    similarity[:, small] = -np.inf
+
+    ranked = np.argsort(-similarity, axis=1)[:, :2]
+    nearest, second = ranked[:, 0], ranked[:, 1]
+    rows = np.arange(len(embeddings))
+    boundary = (similarity[rows, nearest] - similarity[rows, second]) <= overlap_margin
+    boundary &= np.isfinite(similarity[rows, second])
+
+    partitions = [
+        np.union1d(np.flatnonzero(nearest == p), np.flatnonzero(boundary & (second == p)))
+        for p in np.flatnonzero(~small)
+    ]
+    logger.info(f"Partitioned {len(embeddings)} bills into {len(partitions)} partitions "
+                f"(sizes {min(map(len, partitions))}-{max(map(len, partitions))}, "
+                f"{int(boundary.sum())} boundary bills in two)")
+    return partitions
+
+def _attach(name: str, shape: tuple, dtype):
+    """Worker initializer: map the shared embeddings without copying."""
+    shm = SharedMemory(name=name)
+    _shared['embeddings'] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+def cluster_partition(task) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reduce and cluster one partition; returns (reduced, labels, probabilities)."""
+    rows, reducer, knn_cache_dir, params = task
+    embeddings = _shared['embeddings'][1][rows]
+    shared_knn = knn_cache_dir is not None
+    reduced, _ = fit_reducer(embeddings, reducer, shared_knn, knn_cache_dir)
+    labels, probabilities, _ = fit_clusterer(reduced, shared_knn, knn_cache_dir, params)
+    if probabilities is None:
+        probabilities = (labels >= 0).astype(np.float64)
+    return reduced.astype(np.float32), labels, probabilities
+
+def merge_partitions(embeddings: np.ndarray, partitions: List[np.ndarray], results: list,
+                     merge_similarity: float = PARTITION_MERGE_SIMILARITY,
+                     merge_overlap: float = PARTITION_MERGE_OVERLAP) -> Tuple[np.ndarray, np.ndarray]:
+    """Reconcile per-partition clusters into one labelling.
+
+    Returns:
+        Tuple of (labels, probabilities) over all rows, labels 0..k-1 with -1 for noise
+    """
+    # Global id for every partition-local cluster
+    offsets = np.cumsum([0] + [int(labels.max()) + 1 if len(labels) else 0 for _, labels, _ in results])
+    n_local = int(offsets[-1])
+    if n_local == 0:
+        return np.full(len(embeddings), -1), np.zeros(len(embeddings))
+
+    member_rows = np.concatenate([rows[labels >= 0] for rows, (_, labels, _) in zip(partitions, results)])
+    member_ids = np.concatenate([
+        labels[labels >= 0] + offset for offset, (_, labels, _) in zip(offsets, results)
+    ])
+    member_probs = np.concatenate([probs[labels >= 0] for _, labels, probs in results])
+    sizes = np.bincount(member_ids, minlength=n_local)
+
+    # Union-find over local clusters
+    parent = np.arange(n_local)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    # Clusters holding the same boundary bills
+    by_row = np.argsort(member_rows, kind='stable')
+    sorted_rows, sorted_ids = member_rows[by_row], member_ids[by_row]
+    repeated = np.flatnonzero(sorted_rows[1:] == sorted_rows[:-1])
+    if len(repeated):
+        pairs, shared = np.unique(
+            np.stack([sorted_ids[repeated], sorted_ids[repeated + 1]], axis=1), axis=0, return_counts=True
+        )
+        for (a, b), count in zip(pairs, shared):
+            if count >= merge_overlap * min(sizes[a], sizes[b]):
+                union(a, b)
+
+    # Clusters with near-identical centroids
+    incidence = csr_matrix(
+        (np.ones(len(member_ids)), (member_ids, np.arange(len(member_ids)))), shape=(n_local, len(member_ids))
+    )
+    centroids = normalize(incidence @ normalize(embeddings[member_rows]))
+    partition_of = np.repeat(np.arange(len(results)), np.diff(offsets))
+    similar = np.argwhere(np.triu(centroids @ centroids.T, k=1) >= merge_similarity)
+    for a, b in similar:
+        if partition_of[a] != partition_of[b]:
+            union(a, b)
+
+    roots = np.array([find(i) for i in range(n_local)])
+    _, merged = np.unique(roots, return_inverse=True)
+    logger.info(f"Merged {n_local} partition clusters into {merged.max() + 1}")
+
+    # Most confident membership for each bill
+    labels = np.full(len(embeddings), -1)
+    probabilities = np.zeros(len(embeddings))
+    order = np.argsort(-member_probs, kind='stable')
+    _, first = np.unique(member_rows[order], return_index=True)
+    best = order[first]
+    labels[member_rows[best]] = merged[member_ids[best]]
+    probabilities[member_rows[best]] = member_probs[best]
+
+    # Renumber so labels are contiguous
+    _, labels_compact = np.unique(labels[labels >= 0], return_inverse=True)
+    labels[labels >= 0] = labels_compact
+    return labels, probabilities
+
+def fit_partitioned(embeddings: np.ndarray, reducer: str = DEFAULT_REDUCER,
+                    knn_cache_dir: Optional[Path] = None, params: Optional[dict] = None,
+                    target_size: int = PARTITION_TARGET_SIZE, workers: Optional[int] = None):
+    """Partition, then reduce and cluster every partition in parallel, then merge.
+
+    Returns:
+        Tuple of (reduced embeddings, labels, probabilities); reduced rows come from
+        each bill's first partition
+    """
+    partitions = coarse_partition(embeddings, target_size)
+    workers = max(1, min(workers or os.cpu_count(), len(partitions)))
+
+    array = np.ascontiguousarray(embeddings, dtype=np.float32)
+    shm = SharedMemory(create=True, size=array.nbytes)
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        tasks = [(rows, reducer, knn_cache_dir, params) for rows in partitions]
+        logger.info(f"Clustering {len(partitions)} partitions on {workers} workers...")
+        # Spawned, not forked: this runs in a worker thread of a process holding the embedding model
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_attach, initargs=(shm.name, array.shape, array.dtype)) as pool:
+            results = list(pool.map(cluster_partition, tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    labels, probabilities = merge_partitions(embeddings, partitions, results)
+
+    reduced = np.zeros((len(embeddings), results[0][0].shape[1]), dtype=np.float32)
+    for rows, (partition_reduced, _, _) in reversed(list(zip(partitions, results))):
+        reduced[rows] = partition_reduced
+    return reduced, log_cluster_stats(labels), probabilities
@@ -0,0 +1,69 @@
+"""
+Benchmark for the dimensionality-reduction modes.
+
+Reduces and clusters the same embeddings with each mode in REDUCER_MODES and
+reports runtime and cluster agreement (adjusted Rand index) against the
+seeded 'umap' mode the weekly run uses by default.
+
+Embeddings come from a .npy file or from an embedding store model directory
+(the folder holding vectors.f32 and meta.json):
+
+    python -m indexing_service.clustering.reducer_benchmark --embeddings embedding_store/<model key> --sample 20000
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+from .embedding_store import load_vectors
+from .clustering import REDUCER_MODES, DEFAULT_REDUCER, cluster_embeddings, reduce_dimensions
+from .knn_graph import KNN_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+def run_mode(embeddings: np.ndarray, mode: str, shared_knn: bool = False):
+    """Reduce and cluster once, returning (labels, seconds)."""
+    start = time.perf_counter()
+    reduced = reduce_dimensions(embeddings, mode, shared_knn, KNN_CACHE_DIR)
+    labels, _ = cluster_embeddings(reduced, shared_knn, KNN_CACHE_DIR)
+    return labels, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dimensionality-reduction modes')
+    parser.add_argument('--embeddings', type=str, required=True,
+                        help='.npy file or embedding store model directory')
+    parser.add_argument('--sample', type=int, default=20000, help='Rows to sample (0 for all)')
+    parser.add_argument('--modes', nargs='+', choices=list(REDUCER_MODES), default=list(REDUCER_MODES))
+    parser.add_argument('--shared-knn', action='store_true',
+                        help='Use the cached NN-descent graphs for every mode except the baseline')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    embeddings = load_vectors(Path(args.embeddings), args.sample)
+    logger.info(f"Benchmarking {len(embeddings)} embeddings of dimension {embeddings.shape[1]}")
+
+    baseline, baseline_seconds = run_mode(embeddings, DEFAULT_REDUCER)
+    results = [(DEFAULT_REDUCER, baseline_seconds, 1.0, baseline)]
+    for mode in args.modes:
+        if mode == DEFAULT_REDUCER and not args.shared_knn:
+            continue
+        labels, seconds = run_mode(embeddings, mode, args.shared_knn)
+        name = f"{mode}+knn" if args.shared_knn else mode
+        results.append((name, seconds, adjusted_rand_score(baseline, labels), labels))
+
+    logger.info(f"\n{'mode':<15} {'seconds':>9} {'speedup':>8} {'ARI':>6} {'clusters':>9} {'noise':>7}")
+    for mode, seconds, ari, labels in results:
+        n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
+        noise = float(np.mean(labels == -1))
+        logger.info(
+            f"{mode:<15} {seconds:>9.1f} {baseline_seconds / seconds:>7.1f}x {ari:>6.3f} "
+            f"{n_clusters:>9} {noise:>7.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
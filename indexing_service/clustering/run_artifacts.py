@@ -0,0 +1,205 @@
+"""
+Columnar artifacts of a clustering run.
+
+Every full run writes a directory of Arrow and Parquet files next to the
+database rows, so a week can be inspected, reported on or stored again
+without re-embedding or re-running UMAP:
+
+    <root>/<year>-W<week>/<run timestamp>/bills.arrow       one row per bill: metadata, prepared
+                                                             text, label, cluster id, probability,
+                                                             distance to centroid, duplicate group
+    <root>/<year>-W<week>/<run timestamp>/embeddings.arrow  fixed-size list column, float16 or float32
+    <root>/<year>-W<week>/<run timestamp>/reduced.arrow     fixed-size list column, float32
+    <root>/<year>-W<week>/<run timestamp>/clusters.parquet  one row per cluster: name, keywords,
+                                                             sizes, dates, exemplars, centroid
+    <root>/<year>-W<week>/<run timestamp>/meta.json         week, reducer, parameters, dtypes
+
+The .arrow files are uncompressed Arrow IPC written as one record batch, so
+load_run memory-maps them and the embedding and reduced matrices are NumPy
+views of the mapped buffers rather than copies.
+
+    python -m indexing_service.clustering.run_artifacts run_artifacts/2025-W07 --report
+"""
+
+import argparse
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Add default paths
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+ARTIFACTS_DIR = PROJECT_ROOT / "run_artifacts"
+
+EMBEDDING_DTYPES = {'float16': np.float16, 'float32': np.float32}
+DEFAULT_EMBEDDING_DTYPE = 'float16'
+
+BILL_COLUMNS = ('bill_id', 'bill_number', 'state', 'state_abbr', 'created', 'history_date', 'history_action',
+                'token_count', 'duplicate_group')
+
+@dataclass
+class RunArtifacts:
+    path: Path
+    meta: Dict[str, Any]
+    bills: pa.Table
+    clusters: pa.Table
+    embeddings: np.ndarray  # (n, d) view of the mapped file
+    reduced: np.ndarray  # (n, r) view of the mapped file
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.bills.column('label').to_numpy()
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        return self.bills.column('probability').to_numpy()
+
+    @property
+    def texts(self) -> List[str]:
+        return self.bills.column('text').to_pylist()
+
+    def metadata(self) -> List[dict]:
+        """Bill metadata in the shape fetch_bills produces, for re-running analysis or storage."""
+        return self.bills.select(list(BILL_COLUMNS)).to_pylist()
+
+def week_dir(week: int, year: int, root: Path = ARTIFACTS_DIR) -> Path:
+    return Path(root) / f"{year}-W{week:02d}"
+
+def new_run_dir(week: int, year: int, root: Path = ARTIFACTS_DIR) -> Path:
+    """Directory for a run starting now; timestamps sort in run order."""
+    return week_dir(week, year, root) / datetime.now().strftime('%Y%m%dT%H%M%S')
+
+def matrix_table(matrix: np.ndarray, name: str) -> pa.Table:
+    """One fixed-size list column holding the rows of a 2-D array."""
+    values = pa.array(np.ascontiguousarray(matrix).ravel())
+    return pa.table({name: pa.FixedSizeListArray.from_arrays(values, matrix.shape[1])})
+
+def write_ipc(table: pa.Table, path: Path):
+    """Uncompressed Arrow IPC file in one record batch, so readers can memory-map it."""
+    with pa.OSFile(str(path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+
+def read_matrix(path: Path, name: str) -> np.ndarray:
+    """Zero-copy NumPy view of a fixed-size list column in a memory-mapped IPC file."""
+    table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    column = table.column(name).combine_chunks()  # Already one chunk, so no copy
+    return column.values.to_numpy(zero_copy_only=True).reshape(len(column), column.type.list_size)
+
+def write_run_artifacts(path: Path, texts: List[str], metadata: list, embeddings: np.ndarray,
+                        reduced: np.ndarray, labels: np.ndarray, probabilities: Optional[np.ndarray],
+                        clusters: list, run_info: Dict[str, Any],
+                        embedding_dtype: str = DEFAULT_EMBEDDING_DTYPE) -> Path:
+    """Write one run's artifacts to path (clusters as returned by analyze_clusters); returns path."""
+    path.mkdir(parents=True, exist_ok=True)
+
+    distances = np.full(len(labels), np.nan, dtype=np.float32)
+    for cluster_info in clusters:
+        distances[cluster_info['member_indices']] = cluster_info['member_distances']
+
+    cluster_ids = np.array([c['cluster_id'] for c in clusters] + [None], dtype=object)
+    bills = {column: [m.get(column) for m in metadata] for column in BILL_COLUMNS}
+    bills.update({
+        'text': texts,
+        'label': labels.astype(np.int32),
+        'cluster_id': cluster_ids[labels].tolist(),  # Noise (-1) takes the trailing None
+        'probability': (probabilities if probabilities is not None else np.full(len(labels), np.nan)).astype(np.float32),
+        'distance': distances,
+    })
+    write_ipc(pa.table(bills), path / "bills.arrow")
+    write_ipc(matrix_table(embeddings.astype(EMBEDDING_DTYPES[embedding_dtype], copy=False), 'embedding'),
+              path / "embeddings.arrow")
+    write_ipc(matrix_table(reduced.astype(np.float32, copy=False), 'reduced'), path / "reduced.arrow")
+
+    pq.write_table(pa.table({
+        'cluster_id': [c['cluster_id'] for c in clusters],
+        'label': list(range(len(clusters))),
+        'name': [c.get('name') for c in clusters],
+        'keywords': [c.get('keywords', []) for c in clusters],
+        'size': [c['size'] for c in clusters],
+        'states': [c['states'] for c in clusters],
+        'max_state_share': [c['max_state_percentage'] for c in clusters],
+        'min_date': [c['min_date'] for c in clusters],
+        'max_date': [c['max_date'] for c in clusters],
+        'avg_distance': [c['avg_distance'] for c in clusters],
+        'max_distance': [c['max_distance'] for c in clusters],
+        'exemplar_bill_ids': [[e['bill_id'] for e in c.get('exemplars', [])] for c in clusters],
+        'centroid': pa.FixedSizeListArray.from_arrays(
+            pa.array(np.concatenate([c['centroid'] for c in clusters]).astype(np.float32)
+                     if clusters else np.zeros(0, dtype=np.float32)),
+            embeddings.shape[1]
+        ),
+    }), path / "clusters.parquet")
+
+    (path / "meta.json").write_text(json.dumps({
+        **run_info,
+        'written_at': datetime.utcnow().isoformat(),
+        'bills': len(metadata),
+        'clusters': len(clusters),
+        'embedding_dtype': embedding_dtype,
+        'embedding_dim': int(embeddings.shape[1]),
+        'reduced_dim': int(reduced.shape[1]),
+    }, default=str, indent=2))
+    logger.info(f"Saved run artifacts to {path}")
+    return path
+
+def resolve_run(path: Path) -> Path:
+    """A run directory, or the latest run inside a week directory."""
+    path = Path(path)
+    if (path / "meta.json").exists():
+        return path
+    runs = sorted(p for p in path.iterdir() if (p / "meta.json").exists()) if path.is_dir() else []
+    if not runs:
+        raise ValueError(f"No clustering run artifacts in {path}")
+    return runs[-1]
+
+def load_run(path: Path) -> RunArtifacts:
+    """Open a run's artifacts; the bill table and matrices stay memory-mapped."""
+    path = resolve_run(path)
+    return RunArtifacts(
+        path=path,
+        meta=json.loads((path / "meta.json").read_text()),
+        bills=pa.ipc.open_file(pa.memory_map(str(path / "bills.arrow"), 'r')).read_all(),
+        clusters=pq.read_table(path / "clusters.parquet"),
+        embeddings=read_matrix(path / "embeddings.arrow", 'embedding'),
+        reduced=read_matrix(path / "reduced.arrow", 'reduced'),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect the artifacts of a clustering run')
+    parser.add_argument('path', type=str, help='Run directory, or a week directory for its latest run')
+    parser.add_argument('--report', action='store_true',
+                        help='Regenerate the cluster report from the artifacts')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    run = load_run(Path(args.path))
+    labels = run.labels
+    logger.info(f"Run {run.path}")
+    for key, value in run.meta.items():
+        logger.info(f"  {key}: {value}")
+    logger.info(f"  noise: {np.mean(labels == -1):.1%}")
+
+    if args.report:
+        from .analysis import analyze_clusters, generate_cluster_report
+        from .stats import compute_cluster_stats
+
+        metadata = run.metadata()
+        # Statistics need float32 rows; the mapped float16 matrix is converted once here
+        embeddings = np.asarray(run.embeddings, dtype=np.float32)
+        stats = compute_cluster_stats(labels, embeddings, run.reduced, metadata)
+        clusters = analyze_clusters(embeddings, run.reduced, labels, run.probabilities, metadata, stats)
+        generate_cluster_report(clusters, metadata, embeddings, labels, run.meta.get('reducer'),
+                                run.meta.get('hdbscan_params'), stats, run.meta.get('partition_size'))
+
+if __name__ == "__main__":
+    main()
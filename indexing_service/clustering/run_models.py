@@ -0,0 +1,131 @@
+"""
+Persisted reducer and clusterer per clustering run, for incremental assignment.
+
+A full run saves its fitted reducer (pre-reduction + UMAP) and HDBSCAN model
+with prediction data under <root>/<year>-W<week>/, along with the stored
+cluster id and full-space centroid for every label. Bills that become active
+in that week later are placed with the reducer's transform and
+hdbscan.approximate_predict instead of re-running UMAP and HDBSCAN.
+
+Layout:
+    <root>/<year>-W<week>/reducer.joblib
+    <root>/<year>-W<week>/clusterer.joblib
+    <root>/<year>-W<week>/centroids.npy       full-space centroid per label
+    <root>/<year>-W<week>/seen_bill_ids.npy   bills fitted or already assigned
+    <root>/<year>-W<week>/meta.json
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import hdbscan
+import joblib
+import numpy as np
+
+from .clustering import FittedReducer
+
+logger = logging.getLogger(__name__)
+
+# Add default paths
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+MODELS_DIR = PROJECT_ROOT / "cluster_models"
+
+# Refit when more than this share of new bills is noise
+DEFAULT_REFIT_NOISE = 0.5
+# Refit when bills added after the fit exceed this share of the fitted bills
+DEFAULT_REFIT_DRIFT = 0.25
+
+@dataclass
+class RunModels:
+    path: Path
+    reducer: FittedReducer
+    clusterer: hdbscan.HDBSCAN
+    cluster_ids: List[str]  # Stored cluster id per HDBSCAN label
+    centroids: np.ndarray
+    fit_count: int
+    seen_bill_ids: np.ndarray
+
+    def drift(self, new_count: int) -> float:
+        """Share of bills placed after the fit, including new_count more."""
+        added = len(self.seen_bill_ids) - self.fit_count + new_count
+        return added / max(self.fit_count, 1)
+
+def run_dir(week: int, year: int, root: Path = MODELS_DIR) -> Path:
+    return Path(root) / f"{year}-W{week:02d}"
+
+RUN_MODEL_FILES = ('meta.json', 'reducer.joblib', 'clusterer.joblib', 'centroids.npy', 'seen_bill_ids.npy')
+
+def clear_run_models(path: Path):
+    """Remove a week's saved models, e.g. after a full run that replaced its clusters without saving new ones."""
+    removed = False
+    for name in RUN_MODEL_FILES:
+        file = path / name
+        if file.exists():
+            file.unlink()
+            removed = True
+    if removed:
+        logger.info(f"Removed outdated clustering models from {path}")
+
+def save_run_models(path: Path, reducer: FittedReducer, clusterer: Optional[hdbscan.HDBSCAN],
+                    clusters: list, metadata: list) -> bool:
+    """Persist a full run's models; returns False when they cannot be used for assignment."""
+    clear_run_models(path)
+    if clusterer is None or not reducer.transformable:
+        logger.warning("Models fitted on cached kNN graphs cannot place new bills; not saving them")
+        return False
+
+    path.mkdir(parents=True, exist_ok=True)
+    joblib.dump(reducer, path / "reducer.joblib")
+    joblib.dump(clusterer, path / "clusterer.joblib")
+    # analyze_clusters emits clusters in label order
+    if clusters:
+        np.save(path / "centroids.npy", np.stack([c['centroid'] for c in clusters]).astype(np.float32))
+    np.save(path / "seen_bill_ids.npy", np.array([m['bill_id'] for m in metadata], dtype=np.int64))
+    (path / "meta.json").write_text(json.dumps({
+        'reducer': reducer.mode,
+        'fitted_at': datetime.utcnow().isoformat(),
+        'fit_count': len(metadata),
+        'cluster_ids': [c['cluster_id'] for c in clusters]
+    }))
+    logger.info(f"Saved clustering models to {path}")
+    return True
+
+def load_run_models(path: Path) -> Optional[RunModels]:
+    """Load a run's models, or None if the run has none saved."""
+    meta_file = path / "meta.json"
+    if not meta_file.exists():
+        return None
+    meta = json.loads(meta_file.read_text())
+    centroids_file = path / "centroids.npy"
+    return RunModels(
+        path=path,
+        reducer=joblib.load(path / "reducer.joblib"),
+        clusterer=joblib.load(path / "clusterer.joblib"),
+        cluster_ids=meta['cluster_ids'],
+        centroids=np.load(centroids_file) if centroids_file.exists() else np.empty((0, 0), dtype=np.float32),
+        fit_count=meta['fit_count'],
+        seen_bill_ids=np.load(path / "seen_bill_ids.npy")
+    )
+
+def record_seen(models: RunModels, bill_ids: List[int]):
+    """Mark bills as placed so later assignment passes skip them."""
+    models.seen_bill_ids = np.union1d(models.seen_bill_ids, np.asarray(bill_ids, dtype=np.int64))
+    np.save(models.path / "seen_bill_ids.npy", models.seen_bill_ids)
+
+def assign_bills(models: RunModels, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Place embeddings into the fitted clusters.
+
+    Returns:
+        Tuple of (labels with -1 for noise, membership strengths, full-space distances to the centroid)
+    """
+    reduced = models.reducer.transform(embeddings)
+    labels, strengths = hdbscan.approximate_predict(models.clusterer, reduced)
+    distances = np.full(len(labels), np.nan, dtype=np.float32)
+    members = labels >= 0
+    if members.any():
+        distances[members] = np.linalg.norm(embeddings[members] - models.centroids[labels[members]], axis=1)
+    return labels, strengths, distances
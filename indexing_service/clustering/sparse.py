@@ -0,0 +1,102 @@
+"""
+Learned sparse (lexical) weights for BGE-M3 and hybrid dense+sparse scoring.
+
+BGE-M3 ships a small linear head (sparse_linear.pt) that maps each token's
+last hidden state to a non-negative weight. The weight of a term in a text is
+the max over its occurrences, so the sparse vector comes from the same forward
+pass as the dense embedding.
+"""
+
+import logging
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+SPARSE_HEAD_FILE = "sparse_linear.pt"
+
+# Weights used by BGE-M3 for dense+sparse fusion
+DEFAULT_DENSE_WEIGHT = 1.0
+DEFAULT_SPARSE_WEIGHT = 0.3
+
+# (term_ids, weights) pair for one text, sorted by descending weight
+SparseVector = Tuple[np.ndarray, np.ndarray]
+
+def load_sparse_head(model_path, hidden_size: int, device: str, use_local: bool = False) -> torch.nn.Linear:
+    """Load the BGE-M3 sparse linear head from a local model dir or the hub."""
+    if isinstance(model_path, Path):
+        head_path = model_path / SPARSE_HEAD_FILE
+        if not head_path.exists():
+            raise ValueError(f"Sparse head not found, missing {SPARSE_HEAD_FILE}: {model_path}")
+    else:
+        from huggingface_hub import hf_hub_download
+        head_path = hf_hub_download(model_path, SPARSE_HEAD_FILE, local_files_only=use_local)
+
+    head = torch.nn.Linear(hidden_size, 1)
+    head.load_state_dict(torch.load(head_path, map_location=device))
+    head.to(device)
+    head.eval()
+    logger.info(f"Loaded sparse head from: {head_path}")
+    return head
+
+def compute_sparse_weights(
+    head: torch.nn.Linear,
+    token_embeddings: torch.Tensor,
+    input_ids: torch.Tensor,
+    attention_mask: torch.Tensor,
+    special_token_ids: List[int],
+    vocab_size: int,
+    top_k: int
+) -> List[SparseVector]:
+    """Turn one batch of hidden states into top-k (term_ids, weights) per text."""
+    token_weights = torch.relu(head(token_embeddings)).squeeze(-1)
+
+    # Padding and special tokens carry no lexical signal
+    keep = attention_mask.bool()
+    for token_id in special_token_ids:
+        keep &= input_ids != token_id
+    token_weights = token_weights * keep
+
+    # Max-pool repeated tokens into a dense [batch, vocab] matrix, then keep top-k
+    term_weights = torch.zeros(
+        (input_ids.shape[0], vocab_size), dtype=token_weights.dtype, device=token_weights.device
+    )
+    term_weights.scatter_reduce_(1, input_ids, token_weights, reduce='amax')
+    k = min(top_k, vocab_size)
+    weights, term_ids = torch.topk(term_weights, k, dim=1)
+
+    weights = weights.float().cpu().numpy()
+    term_ids = term_ids.cpu().numpy().astype(np.int32)
+
+    sparse = []
+    for row_ids, row_weights in zip(term_ids, weights):
+        nonzero = row_weights > 0
+        sparse.append((row_ids[nonzero], row_weights[nonzero].astype(np.float32)))
+    return sparse
+
+def lexical_score(query: SparseVector, doc: SparseVector) -> float:
+    """Sum of weight products over the terms shared by query and document."""
+    query_ids, query_weights = query
+    doc_ids, doc_weights = doc
+    _, query_idx, doc_idx = np.intersect1d(query_ids, doc_ids, assume_unique=True, return_indices=True)
+    return float(np.dot(query_weights[query_idx], doc_weights[doc_idx]))
+
+def hybrid_scores(
+    query_dense: np.ndarray,
+    query_sparse: SparseVector,
+    doc_dense: np.ndarray,
+    doc_sparse: List[SparseVector],
+    dense_weight: float = DEFAULT_DENSE_WEIGHT,
+    sparse_weight: float = DEFAULT_SPARSE_WEIGHT
+) -> np.ndarray:
+    """Score documents against a query with a weighted dense+sparse sum.
+
+    Dense vectors are expected to be L2-normalized, as returned by
+    EmbeddingGenerator, so the dense term is cosine similarity.
+    """
+    dense = doc_dense @ query_dense
+    sparse = np.array([lexical_score(query_sparse, doc) for doc in doc_sparse], dtype=np.float32)
+    return (dense_weight * dense + sparse_weight * sparse) / (dense_weight + sparse_weight)
@@ -0,0 +1,157 @@
+"""
+Single-pass cluster statistics shared by analysis and reporting.
+
+Bills are sorted by label once; every per-cluster quantity (sizes, centroids,
+distances, state distributions, date ranges, notable flags) is then computed
+with segmented NumPy operations over contiguous label runs and columnar
+metadata, so the cost grows with the number of bills rather than with
+bills × clusters.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import cupy as cp
+    CUDA_AVAILABLE = True
+except ImportError:
+    CUDA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+if not CUDA_AVAILABLE:
+    logger.warning("CUDA (cupy) not available. Using CPU for distance calculations.")
+
+# Report thresholds for notable clusters
+NOTABLE_MIN_SIZE = 100
+NOTABLE_STATE_SHARE = 0.8
+NOTABLE_MIN_STATES = 20
+
+@dataclass
+class ClusterStats:
+    n_bills: int
+    order: np.ndarray  # Member bill indices grouped by label, ascending within each label
+    offsets: np.ndarray  # (k + 1,) start of each label's run in order
+    sizes: np.ndarray  # (k,)
+    centroids: np.ndarray  # (k, d) full-space centroids
+    reduced_centroids: np.ndarray  # (k, r)
+    distances: np.ndarray  # (len(order),) distance of each member to its centroid, aligned with order
+    avg_distance: np.ndarray
+    max_distance: np.ndarray
+    states: List[str]  # State names indexed by state code
+    state_codes: np.ndarray  # (n_bills,) state code of every bill
+    state_counts: np.ndarray  # (k, n_states)
+    n_states: np.ndarray
+    max_state_share: np.ndarray
+    min_dates: list
+    max_dates: list
+    notable: np.ndarray
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def n_noise(self) -> int:
+        return self.n_bills - int(self.sizes.sum())
+
+    def members(self, label: int) -> np.ndarray:
+        return self.order[self.offsets[label]:self.offsets[label + 1]]
+
+    def member_distances(self, label: int) -> np.ndarray:
+        return self.distances[self.offsets[label]:self.offsets[label + 1]]
+
+    def state_distribution(self, label: int) -> Dict[str, float]:
+        """Share of the cluster's bills per state, largest first."""
+        counts = self.state_counts[label]
+        present = np.flatnonzero(counts)
+        present = present[np.argsort(-counts[present], kind='stable')]
+        return {self.states[s]: counts[s] / self.sizes[label] for s in present}
+
+    def state_presence(self) -> Dict[str, int]:
+        """Number of clusters each state appears in."""
+        presence = (self.state_counts > 0).sum(axis=0)
+        return {state: int(presence[code]) for code, state in enumerate(self.states)}
+
+def compute_cluster_stats(labels: np.ndarray, embeddings: np.ndarray, reduced_embeddings: np.ndarray,
+                          metadata: list) -> ClusterStats:
+    """Compute every per-cluster statistic in one sorted pass over the bills.
+    
+    Labels are expected as HDBSCAN emits them: -1 for noise and 0..k-1 with every cluster non-empty.
+    """
+    labels = np.asarray(labels)
+    n_clusters = int(labels.max()) + 1 if len(labels) and labels.max() >= 0 else 0
+    members = np.flatnonzero(labels >= 0)
+    order = members[np.argsort(labels[members], kind='stable')]
+    sorted_labels = labels[order]
+    sizes = np.bincount(sorted_labels, minlength=n_clusters)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    starts = offsets[:-1]
+
+    # Centroids from segment sums over the label-sorted rows
+    d = embeddings.shape[1]
+    centroids = np.zeros((n_clusters, d), dtype=np.float64)
+    reduced_centroids = np.zeros((n_clusters, reduced_embeddings.shape[1]), dtype=np.float64)
+    if len(order):
+        centroids = np.add.reduceat(embeddings[order].astype(np.float64), starts, axis=0) / sizes[:, None]
+        reduced_centroids = np.add.reduceat(
+            reduced_embeddings[order].astype(np.float64), starts, axis=0
+        ) / sizes[:, None]
+
+    # Distances of every member to its own centroid
+    if CUDA_AVAILABLE and len(order):
+        diff = cp.asarray(embeddings[order]) - cp.asarray(centroids[sorted_labels])
+        distances = cp.asnumpy(cp.linalg.norm(diff, axis=1))
+    else:
+        distances = np.linalg.norm(embeddings[order] - centroids[sorted_labels], axis=1)
+    if len(order):
+        avg_distance = np.add.reduceat(distances, starts) / sizes
+        max_distance = np.maximum.reduceat(distances, starts)
+    else:
+        avg_distance = max_distance = np.zeros(0)
+
+    # State distributions from one bincount over (label, state code) pairs
+    states, state_codes = np.unique(np.array([m['state'] for m in metadata], dtype=object), return_inverse=True)
+    n_state_codes = len(states)
+    state_counts = np.bincount(
+        sorted_labels * n_state_codes + state_codes[order], minlength=n_clusters * n_state_codes
+    ).reshape(n_clusters, n_state_codes)
+    n_states = (state_counts > 0).sum(axis=1)
+    max_state_share = state_counts.max(axis=1) / np.maximum(sizes, 1) if n_state_codes else np.zeros(n_clusters)
+
+    # Date ranges via each bill's rank in one sort of the created dates
+    created = np.empty(len(metadata), dtype=object)
+    created[:] = [m['created'] for m in metadata]
+    by_date = np.argsort(created, kind='stable')
+    date_rank = np.empty(len(created), dtype=np.int64)
+    date_rank[by_date] = np.arange(len(created))
+    if len(order):
+        min_dates = list(created[by_date[np.minimum.reduceat(date_rank[order], starts)]])
+        max_dates = list(created[by_date[np.maximum.reduceat(date_rank[order], starts)]])
+    else:
+        min_dates, max_dates = [], []
+
+    notable = (sizes >= NOTABLE_MIN_SIZE) | (max_state_share >= NOTABLE_STATE_SHARE) | (n_states >= NOTABLE_MIN_STATES)
+
+    return ClusterStats(
+        n_bills=len(labels),
+        order=order,
+        offsets=offsets,
+        sizes=sizes,
+        centroids=centroids,
+        reduced_centroids=reduced_centroids,
+        distances=distances,
+        avg_distance=avg_distance,
+        max_distance=max_distance,
+        states=[str(s) for s in states],
+        state_codes=state_codes,
+        state_counts=state_counts,
+        n_states=n_states,
+        max_state_share=max_state_share,
+        min_dates=min_dates,
+        max_dates=max_dates,
+        notable=notable
+    )
@@ -1,173 +1,370 @@
 """
 Cluster storage operations with dry-run capability.
+
+Clusters, their pending analyses, lineage links and bill memberships are
+written with binary COPY (db.copy_records), with records built from
+columnar arrays; connections come from db.create_pool, which registers the
+pgvector codec. Re-running a week replaces its stored result by writing
+only the difference, under a per-week advisory lock.
 """
 
+import itertools
+from contextlib import asynccontextmanager
 import uuid
 import logging
-from datetime import datetime
-from typing import Dict, List, Tuple, Any
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Any
 import numpy as np
 import asyncpg
 
+from .db import copy_records
+from .lineage import jaccard_matrix
+
 logger = logging.getLogger(__name__)
 
-def generate_cluster_dml(clusters: list, metadata: list, embeddings: np.ndarray, labels: np.ndarray, 
-                   dry_run: bool = False, batch_size: int = 1000, week: int = None, year: int = None):
-    """Generate batched DML statements for storing clusters and their relationships."""
-    logger.info(f"Generating cluster DML statements for week {week}, year {year}...")
-    
-    # Initialize batches
-    cluster_batches = []
-    bill_batches = []
-    analysis_batches = []
-    current_cluster_batch = []
-    current_bill_batch = []
-    current_analysis_batch = []
-    
-    # Process each cluster
-    for cluster_info in clusters:
-        cluster_id = cluster_info['cluster_id']
-        
-        # Add cluster info to batch
-        current_cluster_batch.append({
-            'cluster_id': cluster_id,
-            'cluster_name': f'Cluster {cluster_id[:8]}',  # Use first 8 chars of UUID
-            'bill_count': cluster_info['size'],
-            'state_count': cluster_info['states'],
-            'min_date': cluster_info['min_date'],
-            'max_date': cluster_info['max_date'],
-            'cluster_description': '',  # Can be populated later with analysis
-            'cluster_week': week,  # Add week tracking
-            'cluster_year': year,  # Add year tracking
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
-        })
-        
-        logger.debug(f"Added cluster {cluster_id} with week={week}, year={year}")
-        
-        # Add pending analysis record
-        current_analysis_batch.append({
-            'analysis_id': uuid.uuid4(),
-            'cluster_id': cluster_id,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
-        })
-        
-        # Process bills in this cluster
-        for bill in cluster_info['bills']:
-            current_bill_batch.append({
-                'cluster_id': cluster_id,
-                'bill_id': bill['bill_id'],
-                'distance_to_centroid': bill['distance'],
-                'membership_confidence': bill['confidence'],
-                'added_at': datetime.utcnow()
-            })
-            
-            # Check if bill batch is full
-            if len(current_bill_batch) >= batch_size:
-                bill_batches.append(current_bill_batch)
-                current_bill_batch = []
-        
-        # Check if cluster batch is full
-        if len(current_cluster_batch) >= batch_size:
-            cluster_batches.append(current_cluster_batch)
-            current_cluster_batch = []
-            analysis_batches.append(current_analysis_batch)
-            current_analysis_batch = []
-    
-    # Add any remaining items to batches
-    if current_cluster_batch:
-        cluster_batches.append(current_cluster_batch)
-        analysis_batches.append(current_analysis_batch)
-    if current_bill_batch:
-        bill_batches.append(current_bill_batch)
+CLUSTER_COLUMNS = (
+    'cluster_id', 'cluster_name', 'min_date', 'max_date', 'bill_count', 'state_count',
+    'cluster_description', 'cluster_week', 'cluster_year', 'centroid_vector', 'reduced_vector',
+    'keywords', 'exemplar_bill_ids', 'exemplar_token_count', 'created_at', 'updated_at'
+)
+ANALYSIS_COLUMNS = ('analysis_id', 'cluster_id', 'status', 'created_at', 'updated_at')
+LINEAGE_COLUMNS = ('parent_cluster_id', 'child_cluster_id', 'centroid_similarity', 'jaccard', 'continuity')
+MEMBERSHIP_COLUMNS = (
+    'cluster_id', 'bill_id', 'distance_to_centroid', 'membership_confidence', 'duplicate_group_id'
+)
+
+# Session advisory lock serializing clustering runs per week; key (class, year * 100 + week)
+CLUSTER_RUN_LOCK_CLASS = 0x434C5553  # 'CLUS'
+RERUN_MATCH_JACCARD = 0.5  # Membership overlap at which a stored cluster keeps its id
+RERUN_REANALYZE_JACCARD = 0.8  # Below this overlap a kept cluster gets a new pending analysis
+MEMBERSHIP_TOLERANCE = 1e-6  # Distance/confidence change below which a stored row is left alone
+VECTOR_TOLERANCE = 1e-5  # Centroid component change below which a stored cluster row is left alone
+
+WEEK_CLUSTERS_QUERY = """
+    SELECT
+        c.cluster_id::text AS cluster_id,
+        c.cluster_name, c.keywords, c.exemplar_bill_ids, c.exemplar_token_count,
+        c.centroid_vector, c.reduced_vector,
+        coalesce(array_agg(cb.bill_id ORDER BY cb.bill_id) FILTER (WHERE cb.bill_id IS NOT NULL), '{}') AS bill_ids,
+        array_agg(cb.distance_to_centroid ORDER BY cb.bill_id) FILTER (WHERE cb.bill_id IS NOT NULL) AS distances,
+        array_agg(cb.membership_confidence ORDER BY cb.bill_id) FILTER (WHERE cb.bill_id IS NOT NULL) AS confidences,
+        array_agg(cb.duplicate_group_id ORDER BY cb.bill_id) FILTER (WHERE cb.bill_id IS NOT NULL) AS duplicate_groups,
+        EXISTS (
+            SELECT 1 FROM cluster_analysis ca
+            WHERE ca.cluster_id = c.cluster_id AND ca.status IN ('pending', 'processing')
+        ) AS analysis_open,
+        EXISTS (SELECT 1 FROM blog_generation_responses g WHERE g.cluster_id = c.cluster_id)
+            OR EXISTS (SELECT 1 FROM blog_posts p WHERE p.cluster_id = c.cluster_id) AS published
+    FROM legislation_clusters c
+    LEFT JOIN cluster_bills cb ON cb.cluster_id = c.cluster_id
+    WHERE c.cluster_week = $1 AND c.cluster_year = $2
+    GROUP BY c.cluster_id
+"""
+
+CLUSTER_UPDATES_TABLE_STMT = """
+CREATE TEMPORARY TABLE cluster_updates ON COMMIT DROP AS
+SELECT {columns} FROM legislation_clusters WITH NO DATA
+""".format(columns=', '.join(CLUSTER_COLUMNS))
+
+CLUSTER_UPDATE_STMT = """
+UPDATE legislation_clusters c SET
+    cluster_name = u.cluster_name,
+    min_date = u.min_date,
+    max_date = u.max_date,
+    bill_count = u.bill_count,
+    state_count = u.state_count,
+    centroid_vector = u.centroid_vector,
+    reduced_vector = u.reduced_vector,
+    keywords = u.keywords,
+    exemplar_bill_ids = u.exemplar_bill_ids,
+    exemplar_token_count = u.exemplar_token_count,
+    updated_at = u.updated_at
+FROM cluster_updates u
+WHERE c.cluster_id = u.cluster_id
+"""
+
+MEMBERSHIP_DELETE_STMT = """
+DELETE FROM cluster_bills cb
+USING unnest($1::uuid[], $2::integer[]) AS t(cluster_id, bill_id)
+WHERE cb.cluster_id = t.cluster_id AND cb.bill_id = t.bill_id
+"""
+
+MEMBERSHIP_UPDATE_STMT = """
+UPDATE cluster_bills cb SET
+    distance_to_centroid = t.distance,
+    membership_confidence = t.confidence,
+    duplicate_group_id = t.duplicate_group
+FROM unnest($1::uuid[], $2::integer[], $3::float[], $4::float[], $5::integer[])
+    AS t(cluster_id, bill_id, distance, confidence, duplicate_group)
+WHERE cb.cluster_id = t.cluster_id AND cb.bill_id = t.bill_id
+"""
+
+# Analyses of removed clusters; reused_from links to them are cleared by the foreign key
+STALE_ANALYSES_DELETE_STMT = """
+DELETE FROM cluster_analysis WHERE cluster_id = ANY($1::uuid[])
+"""
+
+# Links of kept clusters; those stored by an earlier run of the week are left alone
+KEPT_LINEAGE_STMT = """
+INSERT INTO cluster_lineage (parent_cluster_id, child_cluster_id, centroid_similarity, jaccard, continuity)
+SELECT * FROM unnest($1::uuid[], $2::uuid[], $3::real[], $4::real[], $5::real[])
+ON CONFLICT (parent_cluster_id, child_cluster_id) DO NOTHING
+"""
+
+# Copy the finished analysis of a parent cluster (see lineage.py)
+REUSE_ANALYSIS_STMT = """
+INSERT INTO cluster_analysis (
+    analysis_id, cluster_id, status, input_token_count, output_token_count,
+    analysis_parameters, executive_summary, policy_impacts, risk_assessment,
+    future_outlook, raw_llm_response, demographic_impacts,
+    started_at, completed_at, reused_from, created_at, updated_at
+) SELECT
+    t.analysis_id, t.cluster_id, p.status, p.input_token_count, p.output_token_count,
+    p.analysis_parameters, p.executive_summary, p.policy_impacts, p.risk_assessment,
+    p.future_outlook, p.raw_llm_response, p.demographic_impacts,
+    p.started_at, p.completed_at, p.analysis_id, $4::timestamptz, $4::timestamptz
+FROM unnest($1::uuid[], $2::uuid[], $3::uuid[])
+    AS t(analysis_id, cluster_id, parent_analysis_id)
+JOIN cluster_analysis p ON p.analysis_id = t.parent_analysis_id
+"""
+
+def cluster_records(clusters: list, metadata: list, week: int = None, year: int = None,
+                    lineage: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Build COPY records for a clustering run.
     
-    # Generate DML statements
-    dml_statements = []
+    Clusters found in lineage get parent links, and those with a reuse_analysis_id
+    copy that analysis instead of queuing a pending one.
     
-    # Cluster insert statements
-    for batch in cluster_batches:
-        cluster_ids = [c['cluster_id'] for c in batch]
-        cluster_names = [c['cluster_name'] for c in batch]
-        min_dates = [c['min_date'] for c in batch]
-        max_dates = [c['max_date'] for c in batch]
-        bill_counts = [c['bill_count'] for c in batch]
-        state_counts = [c['state_count'] for c in batch]
-        descriptions = [c['cluster_description'] for c in batch]
-        cluster_weeks = [c['cluster_week'] for c in batch]
-        cluster_years = [c['cluster_year'] for c in batch]
-        created_ats = [c['created_at'] for c in batch]
-        updated_ats = [c['updated_at'] for c in batch]
-        
-        stmt = """
-        INSERT INTO legislation_clusters (
-            cluster_id, cluster_name, min_date, max_date, 
-            bill_count, state_count, cluster_description,
-            cluster_week, cluster_year,
-            created_at, updated_at
-        ) SELECT * FROM unnest(
-            $1::uuid[], $2::varchar[], $3::date[], $4::date[],
-            $5::integer[], $6::integer[], $7::text[],
-            $8::integer[], $9::integer[],
-            $10::timestamptz[], $11::timestamptz[]
+    Returns:
+        Dict with 'clusters', 'analyses', 'lineage' and 'memberships' record iterables
+        (memberships lazily, from per-cluster member arrays) and the 'reused' analysis columns
+    """
+    lineage = lineage or {}
+    now = datetime.now(timezone.utc)
+    cluster_ids = [uuid.UUID(c['cluster_id']) for c in clusters]
+
+    cluster_rows = [
+        (
+            cluster_id,
+            # Keyword label, or the first 8 chars of the UUID when there is none
+            c.get('name') or f"Cluster {c['cluster_id'][:8]}",
+            c['min_date'], c['max_date'], c['size'], c['states'],
+            '',  # Can be populated later with analysis
+            week, year,
+            c['centroid'],
+            c['reduced_centroid'].tolist(),
+            c.get('keywords') or None,
+            [e['bill_id'] for e in c.get('exemplars', [])] or None,
+            c.get('exemplar_tokens'),
+            now, now
         )
-        """
-        dml_statements.append((stmt, (
-            cluster_ids, cluster_names, min_dates, max_dates,
-            bill_counts, state_counts, descriptions,
-            cluster_weeks, cluster_years,
-            created_ats, updated_ats
-        )))
-        
-        if dry_run:
-            logger.info(f"Would insert {len(batch)} clusters")
-    
-    # Analysis insert statements
-    for batch in analysis_batches:
-        analysis_ids = [a['analysis_id'] for a in batch]
-        cluster_ids = [a['cluster_id'] for a in batch]
-        created_ats = [a['created_at'] for a in batch]
-        updated_ats = [a['updated_at'] for a in batch]
-        
-        stmt = """
-        INSERT INTO cluster_analysis (
-            analysis_id, cluster_id, status, created_at, updated_at
-        ) SELECT * FROM unnest(
-            $1::uuid[], $2::uuid[], $3::analysis_status[], $4::timestamptz[], $5::timestamptz[]
+        for cluster_id, c in zip(cluster_ids, clusters)
+    ]
+
+    analyses, reused = [], ([], [], [])
+    for cluster_id, c in zip(cluster_ids, clusters):
+        reuse_id = lineage.get(c['cluster_id'], {}).get('reuse_analysis_id')
+        if reuse_id:
+            reused[0].append(uuid.uuid4())
+            reused[1].append(cluster_id)
+            reused[2].append(uuid.UUID(reuse_id))
+        else:
+            analyses.append((uuid.uuid4(), cluster_id, 'pending', now, now))
+
+    # Links only for the clusters being written; lineage may cover more of the run
+    links = [
+        (uuid.UUID(parent_id), cluster_id, similarity, jaccard, continuity)
+        for cluster_id, c in zip(cluster_ids, clusters)
+        for parent_id, similarity, jaccard, continuity in lineage.get(c['cluster_id'], {}).get('links', [])
+    ]
+
+    # Membership columns from the member arrays analyze_clusters keeps per cluster
+    bill_ids = np.array([m['bill_id'] for m in metadata], dtype=np.int64)
+    duplicate_groups = np.empty(len(metadata), dtype=object)
+    duplicate_groups[:] = [m.get('duplicate_group') for m in metadata]
+
+    def memberships():
+        for cluster_id, c in zip(cluster_ids, clusters):
+            rows = c['member_indices']
+            confidences = c['member_confidences']
+            yield from zip(
+                itertools.repeat(cluster_id, len(rows)),
+                bill_ids[rows].tolist(),
+                c['member_distances'].tolist(),
+                confidences.tolist() if confidences is not None else itertools.repeat(None),
+                duplicate_groups[rows].tolist()
+            )
+
+    return {
+        'clusters': cluster_rows,
+        'analyses': analyses,
+        'reused': reused,
+        'reused_at': now,
+        'lineage': links,
+        'memberships': memberships()
+    }
+
+async def copy_clusters(conn: asyncpg.Connection, clusters: list, metadata: list, week: int = None,
+                        year: int = None, lineage: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, int]:
+    """COPY new clusters with their lineage links, analyses and memberships; returns row counts."""
+    records = cluster_records(clusters, metadata, week, year, lineage)
+    counts = {'lineage': 0, 'analyses': 0, 'reused': len(records['reused'][0])}
+    counts['clusters'] = await copy_records(conn, 'legislation_clusters', records['clusters'], CLUSTER_COLUMNS)
+    if records['lineage']:
+        counts['lineage'] = await copy_records(conn, 'cluster_lineage', records['lineage'], LINEAGE_COLUMNS)
+    if records['analyses']:
+        counts['analyses'] = await copy_records(conn, 'cluster_analysis', records['analyses'], ANALYSIS_COLUMNS)
+    if records['reused'][0]:
+        await conn.execute(REUSE_ANALYSIS_STMT, *records['reused'], records['reused_at'])
+    counts['memberships'] = await copy_records(conn, 'cluster_bills', records['memberships'], MEMBERSHIP_COLUMNS)
+    return counts
+
+def cluster_members(cluster_info: dict, bill_ids: np.ndarray, duplicate_groups: np.ndarray) -> Dict[int, tuple]:
+    """bill_id -> (distance, confidence, duplicate group) for one new cluster."""
+    rows = cluster_info['member_indices']
+    confidences = cluster_info['member_confidences']
+    return dict(zip(
+        bill_ids[rows].tolist(),
+        zip(
+            cluster_info['member_distances'].tolist(),
+            confidences.tolist() if confidences is not None else itertools.repeat(None),
+            duplicate_groups[rows].tolist()
         )
-        """
-        dml_statements.append((stmt, (
-            analysis_ids, cluster_ids, 
-            ['pending'] * len(batch),  # Default status for all records
-            created_ats, updated_ats
-        )))
-        
-        if dry_run:
-            logger.info(f"Would insert {len(batch)} pending analysis records")
+    ))
+
+def row_changed(old: tuple, new: tuple) -> bool:
+    """Whether a stored (distance, confidence, duplicate group) row differs from a new one."""
+    for a, b in zip(old[:2], new[:2]):
+        if (a is None) != (b is None) or (a is not None and abs(a - b) > MEMBERSHIP_TOLERANCE):
+            return True
+    return old[2] != new[2]
+
+def cluster_row_changed(stored: Dict[str, Any], row: Dict[str, Any]) -> bool:
+    """Whether a stored cluster's labels, exemplars or centroids differ from its new row.
     
-    # Bill membership insert statements
-    for batch in bill_batches:
-        cluster_ids = [b['cluster_id'] for b in batch]
-        bill_ids = [b['bill_id'] for b in batch]
-        distances = [b['distance_to_centroid'] for b in batch]
-        confidences = [b['membership_confidence'] for b in batch]
-        added_ats = [b['added_at'] for b in batch]
-        
-        stmt = """
-        INSERT INTO cluster_bills (
-            cluster_id, bill_id, distance_to_centroid, membership_confidence, added_at
-        ) SELECT * FROM unnest(
-            $1::uuid[], $2::integer[], $3::float[], $4::float[], $5::timestamptz[]
-        )
-        """
-        dml_statements.append((stmt, (
-            cluster_ids, bill_ids, distances, confidences, added_ats
-        )))
-        
-        if dry_run:
-            logger.info(f"Would insert {len(batch)} bill memberships")
+    Counts, states and dates follow from membership, which diff_week compares separately.
+    """
+    if stored['cluster_name'] != row['cluster_name'] or stored['exemplar_token_count'] != row['exemplar_token_count']:
+        return True
+    for column in ('keywords', 'exemplar_bill_ids'):
+        if list(stored[column] or []) != list(row[column] or []):
+            return True
+    for column in ('centroid_vector', 'reduced_vector'):
+        old, new = stored[column], row[column]
+        if old is None or new is None:
+            if (old is None) != (new is None):
+                return True
+        elif len(old) != len(new) or not np.allclose(old, new, rtol=0, atol=VECTOR_TOLERANCE):
+            return True
+    return False
+
+def diff_week(clusters: list, metadata: list, existing: List[Dict[str, Any]],
+              match_jaccard: float = RERUN_MATCH_JACCARD,
+              reanalyze_jaccard: float = RERUN_REANALYZE_JACCARD) -> Dict[str, Any]:
+    """Plan the writes that turn a week's stored clusters into the new result.
     
-    return dml_statements
+    Each stored cluster is matched one-to-one, best overlap first, to the new
+    cluster whose bill membership overlaps it by at least match_jaccard. Matched
+    clusters keep their stored id (written back into clusters) and analyses;
+    only their changed rows are written, and a new pending analysis is queued
+    when the overlap is below reanalyze_jaccard and none is already open.
+    
+    Returns:
+        Dict of 'inserted' (positions of new clusters), 'updated' (positions of matched
+        clusters whose row or members changed, see cluster_row_changed), 'unchanged'
+        count, 'stale' (stored rows without a match), 'reanalyze' (kept cluster ids),
+        and membership 'deletes', 'inserts' and 'changes' for the matched clusters
+    """
+    plan = {
+        'inserted': list(range(len(clusters))), 'updated': [], 'unchanged': 0, 'stale': list(existing),
+        'reanalyze': [], 'deletes': [], 'inserts': [], 'changes': []
+    }
+    if not clusters or not existing:
+        return plan
+
+    bill_ids = np.array([m['bill_id'] for m in metadata], dtype=np.int64)
+    duplicate_groups = np.empty(len(metadata), dtype=object)
+    duplicate_groups[:] = [m.get('duplicate_group') for m in metadata]
+    jaccard = jaccard_matrix(
+        [bill_ids[c['member_indices']].tolist() for c in clusters], [list(e['bill_ids']) for e in existing]
+    )
+
+    matched_new, matched_old = set(), set()
+    pairs = np.argwhere(jaccard >= match_jaccard)
+    for i, j in pairs[np.argsort(-jaccard[pairs[:, 0], pairs[:, 1]], kind='stable')]:
+        if i in matched_new or j in matched_old:
+            continue
+        matched_new.add(i)
+        matched_old.add(j)
+
+        stored = existing[j]
+        cluster_id = uuid.UUID(stored['cluster_id'])
+        clusters[i]['cluster_id'] = stored['cluster_id']
+        new_members = cluster_members(clusters[i], bill_ids, duplicate_groups)
+        old_members = dict(zip(
+            stored['bill_ids'],
+            zip(stored['distances'] or [], stored['confidences'] or [], stored['duplicate_groups'] or [])
+        ))
+
+        deletes = [b for b in old_members if b not in new_members]
+        inserts = [(cluster_id, b, *row) for b, row in new_members.items() if b not in old_members]
+        changes = [
+            (cluster_id, b, *row) for b, row in new_members.items()
+            if b in old_members and row_changed(old_members[b], row)
+        ]
+        plan['deletes'].extend((cluster_id, b) for b in deletes)
+        plan['inserts'].extend(inserts)
+        plan['changes'].extend(changes)
+        row = dict(zip(CLUSTER_COLUMNS, cluster_records([clusters[i]], [])['clusters'][0]))
+        if deletes or inserts or changes or cluster_row_changed(stored, row):
+            plan['updated'].append(int(i))
+        else:
+            plan['unchanged'] += 1
+        if jaccard[i, j] < reanalyze_jaccard and not stored['analysis_open']:
+            plan['reanalyze'].append(cluster_id)
+
+    plan['inserted'] = [i for i in range(len(clusters)) if i not in matched_new]
+    plan['stale'] = [e for j, e in enumerate(existing) if j not in matched_old]
+    return plan
+
+async def apply_week_diff(conn: asyncpg.Connection, plan: Dict[str, Any], clusters: list,
+                          week: int, year: int) -> Dict[str, int]:
+    """Write the matched-cluster part of a diff_week plan and remove stale clusters."""
+    now = datetime.now(timezone.utc)
+    counts = {'updated': len(plan['updated']), 'stale': 0, 'kept_stale': 0}
+
+    if plan['updated']:
+        # Cluster rows go through a temporary table so vectors use the binary COPY path
+        updated = [clusters[i] for i in plan['updated']]
+        await conn.execute(CLUSTER_UPDATES_TABLE_STMT)
+        await copy_records(conn, 'cluster_updates', cluster_records(updated, [], week, year)['clusters'],
+                           CLUSTER_COLUMNS)
+        await conn.execute(CLUSTER_UPDATE_STMT)
+    if plan['deletes']:
+        cluster_ids, bill_ids = zip(*plan['deletes'])
+        await conn.execute(MEMBERSHIP_DELETE_STMT, list(cluster_ids), list(bill_ids))
+    if plan['changes']:
+        await conn.execute(MEMBERSHIP_UPDATE_STMT, *[list(column) for column in zip(*plan['changes'])])
+    if plan['inserts']:
+        await copy_records(conn, 'cluster_bills', plan['inserts'], MEMBERSHIP_COLUMNS)
+    if plan['reanalyze']:
+        await copy_records(
+            conn, 'cluster_analysis',
+            [(uuid.uuid4(), cluster_id, 'pending', now, now) for cluster_id in plan['reanalyze']],
+            ANALYSIS_COLUMNS
+        )
+
+    # Clusters that blog content points at are left in place rather than deleted
+    removable = [uuid.UUID(e['cluster_id']) for e in plan['stale'] if not e['published']]
+    counts['kept_stale'] = len(plan['stale']) - len(removable)
+    if removable:
+        await conn.execute(STALE_ANALYSES_DELETE_STMT, removable)
+        await conn.execute("DELETE FROM cluster_bills WHERE cluster_id = ANY($1::uuid[])", removable)
+        await conn.execute("DELETE FROM legislation_clusters WHERE cluster_id = ANY($1::uuid[])", removable)
+        counts['stale'] = len(removable)
+    if counts['kept_stale']:
+        logger.warning(f"Kept {counts['kept_stale']} clusters no longer in the result because blog content references them")
+    return counts
 
 async def store_clusters(
     conn: asyncpg.Connection,
@@ -175,52 +372,64 @@ async def store_clusters(
     metadata: list,  # Changed from Dict to list to match analyze_clusters output
     embeddings: np.ndarray,
     labels: np.ndarray,
-    batch_size: int = 1000,
     dry_run: bool = False,
     week: int = None,
-    year: int = None
+    year: int = None,
+    lineage: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> None:
     """
-    Store clustering results in the database using batched operations.
+    Replace a week's stored clusters with a new result, writing only the difference.
+    
+    Stored clusters that match a new cluster keep their ids and analyses (see
+    diff_week); new clusters are added with binary COPY and stored clusters
+    without a match are removed. Callers should hold the week's run lock.
     
     Args:
-        conn: asyncpg connection
-        clusters: List of cluster information
+        conn: Connection from db.create_pool or db.connect (pgvector codec registered)
+        clusters: List of cluster information; matched clusters get their stored cluster_id
         metadata: List of bill metadata
         embeddings: Original embeddings array
         labels: Cluster labels array
-        batch_size: Number of records per batch
         dry_run: If True, execute SQL but rollback transaction
         week: Week number for tracking
         year: Year for tracking
+        lineage: Matches to earlier clusters from find_lineage
     """
     logger.info(f"Starting store_clusters with week={week}, year={year}")
     try:
         async with conn.transaction():
-            # Generate DML statements
-            dml_statements = generate_cluster_dml(
-                clusters=clusters,
-                metadata=metadata,
-                embeddings=embeddings,
-                labels=labels,
-                dry_run=dry_run,  # Pass through dry_run flag
-                batch_size=batch_size,
-                week=week,  # Pass week parameter
-                year=year   # Pass year parameter
+            existing = [dict(row) for row in await conn.fetch(WEEK_CLUSTERS_QUERY, week, year)]
+            run_ids = [c['cluster_id'] for c in clusters]
+            plan = diff_week(clusters, metadata, existing)
+            # Kept clusters now carry their stored ids; key lineage by the ids actually written
+            matches = lineage or {}
+            lineage = {c['cluster_id']: matches[run_id] for run_id, c in zip(run_ids, clusters) if run_id in matches}
+            counts = await apply_week_diff(conn, plan, clusters, week, year)
+            inserted = await copy_clusters(
+                conn, [clusters[i] for i in plan['inserted']], metadata, week, year, lineage
             )
+            kept_links = cluster_records(
+                [clusters[i] for i in sorted(set(range(len(clusters))) - set(plan['inserted']))],
+                [], week, year, lineage
+            )['lineage']
+            if kept_links:
+                await conn.execute(KEPT_LINEAGE_STMT, *[list(column) for column in zip(*kept_links)])
             
-            # Execute each statement in the transaction
-            for sql, params in dml_statements:
-                # params is already a tuple of values, no need to convert
-                await conn.execute(sql, *params)
-            
+            summary = (f"{plan['unchanged']} clusters unchanged, {counts['updated']} updated "
+                       f"({len(plan['inserts'])} memberships added, {len(plan['deletes'])} removed, "
+                       f"{len(plan['changes'])} changed, {len(plan['reanalyze'])} re-queued analyses), "
+                       f"{inserted['clusters']} added ({inserted['memberships']} memberships, "
+                       f"{inserted['analyses']} pending and {inserted['reused']} reused analyses, "
+                       f"{inserted['lineage']} lineage links), {counts['stale']} removed")
+            if kept_links:
+                summary += f"; {len(kept_links)} lineage links of kept clusters added where missing"
             if dry_run:
                 # Log what would have been stored
-                logger.info(f"DRY RUN - Would store {len(clusters)} clusters")
+                logger.info(f"DRY RUN - Would store week {week}, {year}: {summary}")
                 logger.info("Rolling back transaction...")
                 raise asyncpg.TransactionRollbackError("Dry run - rolling back")
             
-            logger.info(f"Successfully stored {len(clusters)} clusters")
+            logger.info(f"Stored week {week}, {year}: {summary}")
         
     except asyncpg.TransactionRollbackError as e:
         if not dry_run:
@@ -228,4 +437,149 @@ async def store_clusters(
             raise
     except Exception as e:
         logger.error(f"Error storing clusters: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
+
+@asynccontextmanager
+async def week_lock(pool: asyncpg.Pool, week: int, year: int):
+    """Hold the week's clustering run lock on a pooled connection.
+    
+    Yields the connection, or None when another run holds the lock.
+    """
+    async with pool.acquire() as conn:
+        locked = await conn.fetchval(
+            "SELECT pg_try_advisory_lock($1, $2)", CLUSTER_RUN_LOCK_CLASS, year * 100 + week
+        )
+        if not locked:
+            yield None
+            return
+        try:
+            yield conn
+        finally:
+            await conn.execute(
+                "SELECT pg_advisory_unlock($1, $2)", CLUSTER_RUN_LOCK_CLASS, year * 100 + week
+            )
+
+async def store_lexical_weights(
+    conn: asyncpg.Connection,
+    metadata: list,
+    sparse: list,
+    model_name: str,
+    batch_size: int = 1000,
+    dry_run: bool = False
+) -> None:
+    """
+    Upsert top-k sparse lexical weights for each bill.
+    
+    Args:
+        conn: asyncpg connection
+        metadata: List of bill metadata, aligned with sparse
+        sparse: List of (term_ids, weights) arrays per bill
+        model_name: Model the term ids belong to
+        batch_size: Number of records per batch
+        dry_run: If True, execute SQL but rollback transaction
+    """
+    stmt = """
+    INSERT INTO bill_lexical_weights (
+        bill_id, model_name, term_ids, term_weights, updated_at
+    ) SELECT t.bill_id, $2, t.term_ids::integer[], t.term_weights::real[], CURRENT_TIMESTAMP
+    FROM unnest($1::integer[], $3::text[], $4::text[]) AS t(bill_id, term_ids, term_weights)
+    ON CONFLICT (bill_id) DO UPDATE SET
+        model_name = EXCLUDED.model_name,
+        term_ids = EXCLUDED.term_ids,
+        term_weights = EXCLUDED.term_weights,
+        updated_at = CURRENT_TIMESTAMP
+    """
+    
+    try:
+        async with conn.transaction():
+            for i in range(0, len(metadata), batch_size):
+                batch_meta = metadata[i:i + batch_size]
+                batch_sparse = sparse[i:i + batch_size]
+                # Ragged arrays go over the wire as array literals, one per bill
+                bill_ids = [m['bill_id'] for m in batch_meta]
+                term_ids = ['{' + ','.join(str(int(t)) for t in ids) + '}' for ids, _ in batch_sparse]
+                term_weights = ['{' + ','.join(f"{float(w):.6g}" for w in weights) + '}' for _, weights in batch_sparse]
+                await conn.execute(stmt, bill_ids, model_name, term_ids, term_weights)
+            
+            if dry_run:
+                logger.info(f"DRY RUN - Would store lexical weights for {len(metadata)} bills")
+                raise asyncpg.TransactionRollbackError("Dry run - rolling back")
+            
+            logger.info(f"Successfully stored lexical weights for {len(metadata)} bills")
+    
+    except asyncpg.TransactionRollbackError as e:
+        if not dry_run:
+            logger.error(f"Transaction rolled back: {str(e)}")
+            raise
+    except Exception as e:
+        logger.error(f"Error storing lexical weights: {str(e)}")
+        raise
+
+async def store_assignments(
+    conn: asyncpg.Connection,
+    cluster_ids: List[str],
+    bill_ids: List[int],
+    distances: List[float],
+    confidences: List[float],
+    batch_size: int = 1000,
+    dry_run: bool = False
+) -> None:
+    """
+    Add incrementally assigned bills to existing clusters and refresh their counts.
+    
+    Args:
+        conn: asyncpg connection
+        cluster_ids: Cluster id per assigned bill
+        bill_ids: Assigned bill ids
+        distances: Distance to the cluster centroid per bill
+        confidences: Membership confidence per bill
+        batch_size: Number of records per batch
+        dry_run: If True, execute SQL but rollback transaction
+    """
+    insert_stmt = """
+    INSERT INTO cluster_bills (
+        cluster_id, bill_id, distance_to_centroid, membership_confidence, added_at
+    ) SELECT t.cluster_id, t.bill_id, t.distance, t.confidence, CURRENT_TIMESTAMP
+    FROM unnest($1::uuid[], $2::integer[], $3::float[], $4::float[]) AS t(cluster_id, bill_id, distance, confidence)
+    ON CONFLICT (cluster_id, bill_id) DO NOTHING
+    """
+    counts_stmt = """
+    UPDATE legislation_clusters c SET
+        bill_count = s.bill_count,
+        state_count = s.state_count,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT cb.cluster_id, COUNT(*) AS bill_count, COUNT(DISTINCT b.state_id) AS state_count
+        FROM cluster_bills cb
+        JOIN ls_bill b ON cb.bill_id = b.bill_id
+        WHERE cb.cluster_id = ANY($1::uuid[])
+        GROUP BY cb.cluster_id
+    ) s
+    WHERE c.cluster_id = s.cluster_id
+    """
+    
+    try:
+        async with conn.transaction():
+            for i in range(0, len(bill_ids), batch_size):
+                await conn.execute(
+                    insert_stmt,
+                    cluster_ids[i:i + batch_size],
+                    bill_ids[i:i + batch_size],
+                    distances[i:i + batch_size],
+                    confidences[i:i + batch_size]
+                )
+            await conn.execute(counts_stmt, sorted(set(cluster_ids)))
+            
+            if dry_run:
+                logger.info(f"DRY RUN - Would assign {len(bill_ids)} bills to existing clusters")
+                raise asyncpg.TransactionRollbackError("Dry run - rolling back")
+            
+            logger.info(f"Assigned {len(bill_ids)} bills to existing clusters")
+    
+    except asyncpg.TransactionRollbackError as e:
+        if not dry_run:
+            logger.error(f"Transaction rolled back: {str(e)}")
+            raise
+    except Exception as e:
+        logger.error(f"Error storing assignments: {str(e)}")
+        raise
@@ -0,0 +1,183 @@
+"""
+Parallel hyperparameter sweep for the reducer and HDBSCAN settings.
+
+Embeddings are read once from the embedding store (or a .npy file). Each
+reducer setting is fitted once and its reduced array cached on disk, so
+repeated sweeps skip UMAP entirely. The reduced arrays are placed in shared
+memory and a pool of worker processes fits HDBSCAN for every grid point
+without copying them. Each result is scored with DBCV (HDBSCAN's
+relative_validity_, computed from the minimum spanning tree), noise rate and
+cluster-size distribution, and printed as a ranked table.
+
+    python -m indexing_service.clustering.sweep --embeddings embedding_store/<model key> \
+        --reducers umap-parallel cluster-space --n-neighbors 15 50 \
+        --min-cluster-size 8 12 20 --min-samples 2 4 8 --epsilon 0.0 0.2
+"""
+
+import argparse
+import csv
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import hdbscan
+import numpy as np
+
+from .clustering import REDUCER_MODES, HDBSCAN_PARAMS, fit_reducer
+from .embedding_store import load_vectors
+from .knn_graph import data_key
+
+logger = logging.getLogger(__name__)
+
+# Add default paths
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SWEEP_CACHE_DIR = PROJECT_ROOT / "sweep_cache"
+
+# Reduced arrays attached in each worker process, by reducer key
+_shared: Dict[str, Any] = {}
+
+def cached_reduction(embeddings: np.ndarray, mode: str, n_neighbors: int,
+                     cache_dir: Optional[Path] = SWEEP_CACHE_DIR) -> np.ndarray:
+    """Reduced array for one reducer setting, fitted once and cached on disk."""
+    config = replace(REDUCER_MODES[mode], n_neighbors=n_neighbors)
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = Path(cache_dir) / f"{data_key(embeddings, repr(config))}.npy"
+        if cache_file.exists():
+            logger.info(f"Using cached reduction for {mode}, n_neighbors={n_neighbors}")
+            return np.load(cache_file)
+
+    reduced, _ = fit_reducer(embeddings, mode, config=config)
+    reduced = np.ascontiguousarray(reduced, dtype=np.float32)
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        np.save(cache_file, reduced)
+    return reduced
+
+def _attach(specs: Dict[str, tuple]):
+    """Worker initializer: map the shared reduced arrays without copying."""
+    for key, (name, shape, dtype) in specs.items():
+        shm = SharedMemory(name=name)
+        _shared[key] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+def score_labels(labels: np.ndarray) -> Dict[str, Any]:
+    """Noise rate and cluster-size distribution for one labelling."""
+    sizes = np.bincount(labels[labels >= 0]) if (labels >= 0).any() else np.zeros(0, dtype=np.int64)
+    return {
+        'clusters': len(sizes),
+        'noise': float(np.mean(labels == -1)),
+        'min_size': int(sizes.min()) if len(sizes) else 0,
+        'median_size': float(np.median(sizes)) if len(sizes) else 0.0,
+        'max_size': int(sizes.max()) if len(sizes) else 0,
+        'largest_share': float(sizes.max() / len(labels)) if len(sizes) else 0.0
+    }
+
+def evaluate(task) -> Dict[str, Any]:
+    """Fit HDBSCAN for one grid point on a shared reduced array and score it."""
+    reducer_key, params = task
+    data = _shared[reducer_key][1]
+    clusterer = hdbscan.HDBSCAN(metric='euclidean', gen_min_span_tree=True, core_dist_n_jobs=1, **params)
+    labels = clusterer.fit_predict(data)
+    try:
+        dbcv = float(clusterer.relative_validity_)
+    except (ValueError, ZeroDivisionError, IndexError):
+        # Undefined with fewer than two clusters
+        dbcv = float('nan')
+    return {'reducer': reducer_key, **params, 'dbcv': dbcv, **score_labels(labels)}
+
+def rank(results: List[Dict[str, Any]], max_noise: float) -> List[Dict[str, Any]]:
+    """Best DBCV first among results within the noise limit, then the rest."""
+    def key(row):
+        dbcv = row['dbcv'] if not np.isnan(row['dbcv']) else -np.inf
+        return (row['noise'] > max_noise, -dbcv, row['noise'])
+    return sorted(results, key=key)
+
+def run_sweep(reduced: Dict[str, np.ndarray], grid: List[Dict[str, Any]], workers: int) -> List[Dict[str, Any]]:
+    """Evaluate every (reducer, HDBSCAN params) pair across worker processes."""
+    segments = {}
+    try:
+        for key, array in reduced.items():
+            shm = SharedMemory(create=True, size=array.nbytes)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            segments[key] = shm
+        specs = {key: (segments[key].name, array.shape, array.dtype) for key, array in reduced.items()}
+        tasks = [(key, params) for key in reduced for params in grid]
+        logger.info(f"Evaluating {len(tasks)} settings on {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+            return list(pool.map(evaluate, tasks))
+    finally:
+        for shm in segments.values():
+            shm.close()
+            shm.unlink()
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel clustering hyperparameter sweep')
+    parser.add_argument('--embeddings', type=str, required=True,
+                        help='.npy file or embedding store model directory')
+    parser.add_argument('--sample', type=int, default=0, help='Rows to sample (0 for all)')
+    parser.add_argument('--reducers', nargs='+', choices=list(REDUCER_MODES), default=['umap-parallel'])
+    parser.add_argument('--n-neighbors', type=int, nargs='+', default=[50])
+    parser.add_argument('--min-cluster-size', type=int, nargs='+', default=[HDBSCAN_PARAMS['min_cluster_size']])
+    parser.add_argument('--min-samples', type=int, nargs='+', default=[HDBSCAN_PARAMS['min_samples']])
+    parser.add_argument('--epsilon', type=float, nargs='+', default=[HDBSCAN_PARAMS['cluster_selection_epsilon']])
+    parser.add_argument('--selection-method', nargs='+', choices=['eom', 'leaf'],
+                        default=[HDBSCAN_PARAMS['cluster_selection_method']])
+    parser.add_argument('--max-noise', type=float, default=0.5, help='Rank settings above this noise rate last')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache-dir', type=str, default=str(SWEEP_CACHE_DIR),
+                        help='Directory of cached reduced arrays')
+    parser.add_argument('--output', type=str, help='Also write the ranked table to this CSV file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    embeddings = load_vectors(Path(args.embeddings), args.sample)
+    logger.info(f"Sweeping {len(embeddings)} embeddings of dimension {embeddings.shape[1]}")
+
+    # UMAP fits run here one at a time, each using every core
+    reduced = {
+        f"{mode}/k{n_neighbors}": cached_reduction(embeddings, mode, n_neighbors, Path(args.cache_dir))
+        for mode, n_neighbors in itertools.product(args.reducers, args.n_neighbors)
+    }
+    grid = [
+        {
+            'min_cluster_size': min_cluster_size,
+            'min_samples': min_samples,
+            'cluster_selection_epsilon': epsilon,
+            'cluster_selection_method': method
+        }
+        for min_cluster_size, min_samples, epsilon, method in itertools.product(
+            args.min_cluster_size, args.min_samples, args.epsilon, args.selection_method
+        )
+    ]
+
+    results = rank(run_sweep(reduced, grid, args.workers), args.max_noise)
+
+    columns = ['reducer', 'min_cluster_size', 'min_samples', 'cluster_selection_epsilon',
+               'cluster_selection_method', 'dbcv', 'noise', 'clusters', 'min_size', 'median_size',
+               'max_size', 'largest_share']
+    logger.info(f"\n{'reducer':<22} {'mcs':>4} {'ms':>4} {'eps':>5} {'sel':>4} {'DBCV':>7} "
+                f"{'noise':>7} {'clusters':>8} {'sizes (min/med/max)':>20} {'largest':>8}")
+    for row in results:
+        sizes = f"{row['min_size']}/{row['median_size']:.0f}/{row['max_size']}"
+        logger.info(
+            f"{row['reducer']:<22} {row['min_cluster_size']:>4} {row['min_samples']:>4} "
+            f"{row['cluster_selection_epsilon']:>5.2f} {row['cluster_selection_method']:>4} "
+            f"{row['dbcv']:>7.3f} {row['noise']:>7.1%} {row['clusters']:>8} {sizes:>20} "
+            f"{row['largest_share']:>8.1%}"
+        )
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(results)
+        logger.info(f"\nRanked table saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
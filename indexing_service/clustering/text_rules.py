@@ -0,0 +1,236 @@
+"""
+Compiled, state-dispatched text rules for bill preparation and template detection.
+
+Rules are declared once with the state they were written for (None for the
+global set) and a guard: a literal that every match of the rule contains,
+lowercase for case-insensitive rules. Patterns are compiled once at import, and
+consecutive rules of the same state are fused into one alternation that is
+used as a fast reject before any substitution runs.
+
+A bill runs its own state's rules and the global ones directly. Other states'
+rules only run when their guard literal appears in the text, which is what keeps
+the output identical to applying every pattern to every bill: a rule whose
+guard is absent cannot match.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+MAX_SEGMENT_RULES = 12
+
+@dataclass(frozen=True)
+class Rule:
+    pattern: str
+    state: Optional[str] = None  # state_abbr the rule was written for; None for global rules
+    guard: Optional[str] = None  # literal contained in every match
+    flags: int = 0
+
+def _fuse(patterns: Iterable[str], flags: int) -> re.Pattern:
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), flags)
+
+def _guard_hit(guards: Tuple[str, ...], text: str, lowered: str, ignore_case: bool) -> bool:
+    haystack = lowered if ignore_case else text
+    return any(guard in haystack for guard in guards)
+
+class _Segment:
+    """Consecutive rules sharing a state, with their fused reject pattern."""
+
+    def __init__(self, rules: List[Rule], flags: int):
+        self.state = rules[0].state
+        self.fused = _fuse((rule.pattern for rule in rules), flags)
+        self.rules = [(re.compile(rule.pattern, flags), rule.guard) for rule in rules]
+        # Only usable as a prefilter when every rule has a guard
+        self.guards = tuple(rule.guard for rule in rules) if all(rule.guard for rule in rules) else ()
+
+class RemovalRules:
+    """Ordered substitutions that delete every match, as a sequence of re.sub calls would."""
+
+    def __init__(self, rules: List[Rule], flags: int = re.IGNORECASE):
+        for rule in rules:
+            if rule.state and not rule.guard:
+                raise ValueError(f"State rule {rule.pattern!r} needs a guard literal")
+        self.ignore_case = bool(flags & re.IGNORECASE)
+        self.segments: List[_Segment] = []
+        start = 0
+        for i in range(1, len(rules) + 1):
+            if i == len(rules) or rules[i].state != rules[start].state or i - start == MAX_SEGMENT_RULES:
+                self.segments.append(_Segment(rules[start:i], flags))
+                start = i
+
+    def apply(self, text: str, state_abbr: Optional[str] = None) -> str:
+        lowered = text.lower()
+        for segment in self.segments:
+            foreign = segment.state is not None and segment.state != state_abbr
+            if (foreign or segment.guards) and not _guard_hit(segment.guards, text, lowered, self.ignore_case):
+                continue
+            if not segment.fused.search(text):
+                continue
+            for compiled, guard in segment.rules:
+                if guard and not _guard_hit((guard,), text, lowered, self.ignore_case):
+                    continue
+                result = compiled.sub('', text)
+                if result != text:
+                    text = result
+                    lowered = text.lower()
+        return text
+
+class MatchRules:
+    """Any-match rules evaluated with re.match, fused per state and flag set."""
+
+    def __init__(self, rules: List[Rule]):
+        groups = {}
+        for rule in rules:
+            if rule.state and not rule.guard:
+                raise ValueError(f"State rule {rule.pattern!r} needs a guard literal")
+            groups.setdefault((rule.state, rule.flags), []).append(rule)
+        self.groups = [
+            (state, tuple(rule.guard for rule in members), bool(flags & re.IGNORECASE),
+             _fuse((rule.pattern for rule in members), flags))
+            for (state, flags), members in groups.items()
+        ]
+
+    def matches(self, text: str, state_abbr: Optional[str] = None) -> bool:
+        lowered = None
+        for state, guards, ignore_case, fused in self.groups:
+            if state is not None and state != state_abbr:
+                if ignore_case and lowered is None:
+                    lowered = text.lower()
+                if not _guard_hit(guards, text, lowered, ignore_case):
+                    continue
+            if fused.match(text):
+                return True
+        return False
+
+# Template (shell) bill rules, all anchored with re.match
+_OK = re.IGNORECASE
+TEMPLATE_TITLE_RULES = [
+    # Oklahoma: standard format
+    Rule(r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4}; effective date\.$', 'OK', 'oklahoma', _OK),
+    # Variation without Oklahoma prefix
+    Rule(r'^[^;]+; [A-Za-z\s]+ Act of \d{4}; effective date\.$', flags=_OK),
+    # Variation with period instead of semicolon
+    Rule(r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4}\. Effective date\.$', 'OK', 'oklahoma', _OK),
+    # Variation with additional details
+    Rule(r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4};[^.]+; effective date\.$', 'OK', 'oklahoma', _OK),
+    # Variation without semicolon prefix
+    Rule(r'^[A-Za-z\s]+; Oklahoma [A-Za-z\s]+ Act of \d{4}; effective date\.$', 'OK', 'oklahoma', _OK),
+    # Variation with Emergency
+    Rule(r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4}; emergency\.$', 'OK', 'oklahoma', _OK),
+    # Variation with just Act of 2025
+    Rule(r'^[^;]+; [A-Za-z\s]+ Act of \d{4}; effective date$', flags=_OK),
+]
+
+# Case sensitive, checked against both title and description
+TEMPLATE_TEXT_RULES = [
+    # Illinois technical change patterns
+    Rule(r'^[A-Z\s-]+\-TECH$', 'IL', '-TECH'),  # "LOCAL GOVERNMENT-TECH", "EDUCATION-TECH", etc.
+    Rule(r'Makes a technical change in a Section concerning the short title\.$', 'IL', 'Makes a technical change'),
+    Rule(r'Makes a technical change in the short title Section\.$', 'IL', 'Makes a technical change'),
+    Rule(r'Contains only a short title provision\.$', 'IL', 'Contains only a short title provision'),
+    # Common Illinois template descriptions
+    Rule(r'^Amends the .+ Act\. Makes a technical change in a Section concerning .+\.$', 'IL', 'Makes a technical change'),
+    Rule(r'^Creates the .+ Act\. Contains only a short title provision\.$', 'IL', 'Contains only a short title provision'),
+
+    # North Dakota common title patterns; these match short titles from any state
+    Rule(r'^The [a-z\s]+\.$'),  # Simple titles like "The homestead tax credit."
+    Rule(r'^[A-Za-z\s]+ and to provide [a-z\s]+\.$', 'ND', ' and to provide '),  # "X and to provide a penalty."
+    # North Dakota common description patterns
+    Rule(r'^A BILL for an Act to amend and reenact section \d+-\d+(?:-\d+)?(?:\.\d+)? of the North Dakota Century Code, relating to [^;]+(?:; and to provide (?:a penalty|an effective date|an appropriation|for application))?\.$', 'ND', 'North Dakota Century Code'),
+    Rule(r'^A BILL for an Act to create and enact (?:a new section|new sections) to chapter \d+-\d+(?:\.\d+)? of the North Dakota Century Code, relating to [^;]+(?:; and to provide (?:a penalty|an effective date|an appropriation|for application))?\.$', 'ND', 'North Dakota Century Code'),
+    # Extremely short titles that are likely templates
+    Rule(r'^[A-Za-z\s]{1,25}\.$'),
+    # Common boilerplate endings
+    Rule(r'; and to provide a penalty\.$', 'ND', '; and to provide'),
+    Rule(r'; and to provide an effective date\.$', 'ND', '; and to provide'),
+    Rule(r'; and to provide an appropriation\.$', 'ND', '; and to provide'),
+    Rule(r'; and to provide for application\.$', 'ND', '; and to provide'),
+    Rule(r'; and to declare an emergency\.$', 'ND', '; and to declare'),
+]
+
+# Boilerplate removed from titles and descriptions, applied in order, case-insensitive
+REMOVAL_RULES = [
+    # North Dakota specific patterns
+    Rule(r'^A BILL for an Act to\s+', 'ND', 'a bill for an act to'),
+    Rule(r'amend and reenact\s+(?:section|subsection|subdivision|paragraph|chapter)\s+[\d\.\-]+(?:\s+of\s+the\s+North\s+Dakota\s+Century\s+Code)?,?\s*', 'ND', 'amend and reenact'),
+    Rule(r'create and enact\s+(?:a new section|new sections|a new subdivision|new subdivisions|a new subsection|new subsections|a new paragraph|new paragraphs)\s+to\s+(?:section|chapter)\s+[\d\.\-]+(?:\s+of\s+the\s+North\s+Dakota\s+Century\s+Code)?,?\s*', 'ND', 'create and enact'),
+    Rule(r'repeal\s+(?:section|subsection|subdivision|paragraph|chapter)\s+[\d\.\-]+(?:\s+of\s+the\s+North\s+Dakota\s+Century\s+Code)?,?\s*', 'ND', 'repeal'),
+    Rule(r'of the North Dakota Century Code,?\s*', 'ND', 'of the north dakota century code'),
+    Rule(r'relating to\s+', 'ND', 'relating to'),
+    Rule(r';\s*and\s+to\s+provide\s+(?:a penalty|an effective date|an appropriation|for application)\s*', 'ND', ';'),
+    Rule(r';\s*and\s+to\s+declare\s+an\s+emergency\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+a\s+legislative\s+management\s+(?:study|report)\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+application\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+a\s+continuing\s+appropriation\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+legislative\s+intent\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+retroactive\s+application\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+an\s+expiration\s+date\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+a\s+transfer\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+a\s+report\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+a\s+penalty\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+an\s+effective\s+date\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+retroactive\s+application\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+a\s+contingent\s+effective\s+date\s*', 'ND', ';'),
+    Rule(r';\s*to\s+provide\s+for\s+a\s+contingent\s+expiration\s+date\s*', 'ND', ';'),
+
+    # South Carolina specific patterns
+    Rule(r'^Amend The South Carolina Code Of Laws\s+', 'SC', 'amend the south carolina code of laws'),
+    Rule(r'By Amending Section \d+-\d+-\d+[^,\.]+', 'SC', 'by amending section '),
+    Rule(r'By Adding Section \d+-\d+-\d+[^,\.]+', 'SC', 'by adding section '),
+    Rule(r'By Adding Article \d+ To[^,\.]+', 'SC', 'by adding article '),
+    Rule(r'By Adding Chapter \d+ To[^,\.]+', 'SC', 'by adding chapter '),
+    Rule(r'By Repealing Section \d+-\d+-\d+[^,\.]+', 'SC', 'by repealing section '),
+    Rule(r'Relating To[^,\.]+,\s*', 'SC', 'relating to'),
+    Rule(r'So As To\s+', 'SC', 'so as to'),
+    Rule(r'And To\s+', 'SC', 'and to'),
+    Rule(r'To Direct[^,\.]+', 'SC', 'to direct'),
+    Rule(r'To Define[^,\.]+', 'SC', 'to define'),
+    Rule(r'To Provide[^,\.]+', 'SC', 'to provide'),
+    Rule(r'To Make[^,\.]+', 'SC', 'to make'),
+    Rule(r'To Designate[^,\.]+', 'SC', 'to designate'),
+
+    # General state code references
+    Rule(r'^AN ACT to amend [A-Za-z\s]+ Code[^.]+\.', guard='an act to amend '),
+    Rule(r'Chapter \d+[^.]+\.', guard='chapter '),
+    Rule(r'Title \d+[^.]+\.', guard='title '),
+    Rule(r'Section \d+[^.]+\.', guard='section '),
+
+    # Common prefixes
+    Rule(r'^Budget Act of \d{4}\.', guard='budget act of '),
+    Rule(r'^As introduced,\s*', guard='as introduced,'),
+    Rule(r'An act to\s+', guard='an act to'),
+    Rule(r'An act relating to\s+', guard='an act relating to'),
+    Rule(r'Relating to\s+', guard='relating to'),
+    Rule(r'Concerning\s+', guard='concerning'),
+    Rule(r'^To\s+', guard='to'),
+    Rule(r'^TO CREATE\s+', guard='to create'),
+    Rule(r'^TO AMEND\s+', guard='to amend'),
+    Rule(r'^TO ESTABLISH\s+', guard='to establish'),
+    Rule(r'^TO PROVIDE\s+', guard='to provide'),
+    Rule(r'^TO REQUIRE\s+', guard='to require'),
+    Rule(r'^TO MODIFY\s+', guard='to modify'),
+    Rule(r'^TO IMPLEMENT\s+', guard='to implement'),
+    Rule(r'^TO AUTHORIZE\s+', guard='to authorize'),
+    Rule(r'^TO MAKE\s+', guard='to make'),
+
+    # Bill numbers and identifiers
+    Rule(r'\([A-Z]+\d+\)', guard='('),
+    Rule(r'Bill No\. \d+', guard='bill no. '),
+    Rule(r'Senate Bill \d+', guard='senate bill '),
+    Rule(r'House Bill \d+', guard='house bill '),
+
+    # State-specific terms
+    Rule(r'the state of [A-Za-z\s]+', guard='the state of '),
+    Rule(r'this state[\'s]*', guard='this state'),
+    Rule(r'state legislature', guard='state legislature'),
+    Rule(r'general assembly', guard='general assembly'),
+    Rule(r'South Carolina Code', 'SC', 'south carolina code'),
+    Rule(r'South Carolina Constitution', 'SC', 'south carolina constitution'),
+    Rule(r'South Carolina State', 'SC', 'south carolina state'),
+    Rule(r'South Carolina Department of', 'SC', 'south carolina department of'),
+    Rule(r'South Carolina Division of', 'SC', 'south carolina division of'),
+]
+
+TEMPLATE_TITLE_MATCHER = MatchRules(TEMPLATE_TITLE_RULES + TEMPLATE_TEXT_RULES)
+TEMPLATE_TEXT_MATCHER = MatchRules(TEMPLATE_TEXT_RULES)
+BOILERPLATE_REMOVER = RemovalRules(REMOVAL_RULES)
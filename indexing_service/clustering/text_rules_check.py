@@ -0,0 +1,310 @@
+"""
+Golden-corpus check and throughput benchmark for the compiled text rules.
+
+Runs the pre-text_rules implementations of is_template_bill and
+prepare_bill_text next to the current ones, reports every bill whose output
+differs, and times both. The corpus is a JSON-lines file of bills (title,
+description, state_abbr) or is read from the database for a clustering week.
+
+Usage:
+    python -m indexing_service.clustering.text_rules_check --week 3 --year 2025 --save golden.jsonl
+    python -m indexing_service.clustering.text_rules_check --corpus golden.jsonl [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List
+
+from ..config import MAX_TEXT_LENGTH
+from .data import WEEK_BILLS_QUERY, is_template_bill, prepare_bill_text
+from .db import connect
+
+logger = logging.getLogger(__name__)
+
+def legacy_is_template_bill(title: str, description: str) -> bool:
+    """Template detection as it was before text_rules, kept as the golden reference."""
+    if not title or not description:
+        return False
+        
+    # Check for Oklahoma template patterns
+    ok_patterns = [
+        # Standard format
+        r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4}; effective date\.$',
+        # Variation without Oklahoma prefix
+        r'^[^;]+; [A-Za-z\s]+ Act of \d{4}; effective date\.$',
+        # Variation with period instead of semicolon
+        r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4}\. Effective date\.$',
+        # Variation with additional details
+        r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4};[^.]+; effective date\.$',
+        # Variation without semicolon prefix
+        r'^[A-Za-z\s]+; Oklahoma [A-Za-z\s]+ Act of \d{4}; effective date\.$',
+        # Variation with Emergency
+        r'^[^;]+; Oklahoma [A-Za-z\s]+ Act of \d{4}; emergency\.$',
+        # Variation with just Act of 2025
+        r'^[^;]+; [A-Za-z\s]+ Act of \d{4}; effective date$'
+    ]
+    
+    # Check for Illinois template patterns
+    il_patterns = [
+        # Technical change patterns
+        r'^[A-Z\s-]+\-TECH$',  # Matches "LOCAL GOVERNMENT-TECH", "EDUCATION-TECH", etc.
+        r'Makes a technical change in a Section concerning the short title\.$',
+        r'Makes a technical change in the short title Section\.$',
+        r'Contains only a short title provision\.$',
+        # Common Illinois template descriptions
+        r'^Amends the .+ Act\. Makes a technical change in a Section concerning .+\.$',
+        r'^Creates the .+ Act\. Contains only a short title provision\.$'
+    ]
+
+    # Check for North Dakota template patterns
+    nd_patterns = [
+        # Common title patterns
+        r'^The [a-z\s]+\.$',  # Matches simple titles like "The homestead tax credit."
+        r'^[A-Za-z\s]+ and to provide [a-z\s]+\.$',  # Matches "X and to provide a penalty."
+        
+        # Common description patterns
+        r'^A BILL for an Act to amend and reenact section \d+-\d+(?:-\d+)?(?:\.\d+)? of the North Dakota Century Code, relating to [^;]+(?:; and to provide (?:a penalty|an effective date|an appropriation|for application))?\.$',
+        r'^A BILL for an Act to create and enact (?:a new section|new sections) to chapter \d+-\d+(?:\.\d+)? of the North Dakota Century Code, relating to [^;]+(?:; and to provide (?:a penalty|an effective date|an appropriation|for application))?\.$',
+        
+        # Extremely short titles that are likely templates
+        r'^[A-Za-z\s]{1,25}\.$',  # Very short titles ending in period
+        
+        # Common boilerplate endings
+        r'; and to provide a penalty\.$',
+        r'; and to provide an effective date\.$',
+        r'; and to provide an appropriation\.$',
+        r'; and to provide for application\.$',
+        r'; and to declare an emergency\.$'
+    ]
+    
+    # Check title and description against all patterns
+    return (
+        any(bool(re.match(pattern, title, re.IGNORECASE)) for pattern in ok_patterns) or
+        any(bool(re.match(pattern, title)) for pattern in il_patterns) or  # Case sensitive for IL title patterns
+        any(bool(re.match(pattern, description)) for pattern in il_patterns) or  # Check description too
+        any(bool(re.match(pattern, title)) for pattern in nd_patterns) or  # Check ND patterns
+        any(bool(re.match(pattern, description)) for pattern in nd_patterns)  # Check ND patterns in description
+    )
+
+def legacy_prepare_bill_text(bill: Dict[str, Any]) -> str:
+    """Text preparation as it was before text_rules, kept as the golden reference."""
+    title = (bill['title'] or '').strip()
+    description = (bill['description'] or '').strip()
+    
+    # If either is missing, use the other
+    if not title:
+        return description[:MAX_TEXT_LENGTH]
+    if not description:
+        return title[:MAX_TEXT_LENGTH]
+    
+    # Remove state-specific patterns
+    patterns_to_remove = [
+        # North Dakota specific patterns
+        r'^A BILL for an Act to\s+',
+        r'amend and reenact\s+(?:section|subsection|subdivision|paragraph|chapter)\s+[\d\.\-]+(?:\s+of\s+the\s+North\s+Dakota\s+Century\s+Code)?,?\s*',
+        r'create and enact\s+(?:a new section|new sections|a new subdivision|new subdivisions|a new subsection|new subsections|a new paragraph|new paragraphs)\s+to\s+(?:section|chapter)\s+[\d\.\-]+(?:\s+of\s+the\s+North\s+Dakota\s+Century\s+Code)?,?\s*',
+        r'repeal\s+(?:section|subsection|subdivision|paragraph|chapter)\s+[\d\.\-]+(?:\s+of\s+the\s+North\s+Dakota\s+Century\s+Code)?,?\s*',
+        r'of the North Dakota Century Code,?\s*',
+        r'relating to\s+',
+        r';\s*and\s+to\s+provide\s+(?:a penalty|an effective date|an appropriation|for application)\s*',
+        r';\s*and\s+to\s+declare\s+an\s+emergency\s*',
+        r';\s*to\s+provide\s+for\s+a\s+legislative\s+management\s+(?:study|report)\s*',
+        r';\s*to\s+provide\s+for\s+application\s*',
+        r';\s*to\s+provide\s+a\s+continuing\s+appropriation\s*',
+        r';\s*to\s+provide\s+legislative\s+intent\s*',
+        r';\s*to\s+provide\s+for\s+retroactive\s+application\s*',
+        r';\s*to\s+provide\s+an\s+expiration\s+date\s*',
+        r';\s*to\s+provide\s+for\s+a\s+transfer\s*',
+        r';\s*to\s+provide\s+for\s+a\s+report\s*',
+        r';\s*to\s+provide\s+for\s+a\s+penalty\s*',
+        r';\s*to\s+provide\s+for\s+an\s+effective\s+date\s*',
+        r';\s*to\s+provide\s+for\s+retroactive\s+application\s*',
+        r';\s*to\s+provide\s+for\s+a\s+contingent\s+effective\s+date\s*',
+        r';\s*to\s+provide\s+for\s+a\s+contingent\s+expiration\s+date\s*',
+        
+        # South Carolina specific patterns
+        r'^Amend The South Carolina Code Of Laws\s+',
+        r'By Amending Section \d+-\d+-\d+[^,\.]+',
+        r'By Adding Section \d+-\d+-\d+[^,\.]+',
+        r'By Adding Article \d+ To[^,\.]+',
+        r'By Adding Chapter \d+ To[^,\.]+',
+        r'By Repealing Section \d+-\d+-\d+[^,\.]+',
+        r'Relating To[^,\.]+,\s*',
+        r'So As To\s+',
+        r'And To\s+',
+        r'To Direct[^,\.]+',
+        r'To Define[^,\.]+',
+        r'To Provide[^,\.]+',
+        r'To Make[^,\.]+',
+        r'To Designate[^,\.]+',
+        
+        # General state code references
+        r'^AN ACT to amend [A-Za-z\s]+ Code[^.]+\.',
+        r'Chapter \d+[^.]+\.',
+        r'Title \d+[^.]+\.',
+        r'Section \d+[^.]+\.',
+        
+        # Common prefixes
+        r'^Budget Act of \d{4}\.',
+        r'^As introduced,\s*',
+        r'An act to\s+',
+        r'An act relating to\s+',
+        r'Relating to\s+',
+        r'Concerning\s+',
+        r'^To\s+',
+        r'^TO CREATE\s+',
+        r'^TO AMEND\s+',
+        r'^TO ESTABLISH\s+',
+        r'^TO PROVIDE\s+',
+        r'^TO REQUIRE\s+',
+        r'^TO MODIFY\s+',
+        r'^TO IMPLEMENT\s+',
+        r'^TO AUTHORIZE\s+',
+        r'^TO MAKE\s+',
+        
+        # Bill numbers and identifiers
+        r'\([A-Z]+\d+\)',
+        r'Bill No\. \d+',
+        r'Senate Bill \d+',
+        r'House Bill \d+',
+        
+        # State-specific terms
+        r'the state of [A-Za-z\s]+',
+        r'this state[\'s]*',
+        r'state legislature',
+        r'general assembly',
+        r'South Carolina Code',
+        r'South Carolina Constitution',
+        r'South Carolina State',
+        r'South Carolina Department of',
+        r'South Carolina Division of'
+    ]
+    
+    for pattern in patterns_to_remove:
+        title = re.sub(pattern, '', title, flags=re.IGNORECASE)
+        description = re.sub(pattern, '', description, flags=re.IGNORECASE)
+    
+    # Remove all-caps titles and normalize case
+    if title.isupper():
+        title = title.title()
+    if description.isupper():
+        description = description.title()
+    
+    # Clean up whitespace and punctuation
+    def clean_text(text):
+        # Remove multiple spaces
+        text = ' '.join(text.split())
+        # Remove multiple periods
+        text = re.sub(r'\.+', '.', text)
+        # Remove leading/trailing punctuation
+        text = text.strip('.,; ')
+        return text
+    
+    title = clean_text(title)
+    description = clean_text(description)
+    
+    # If texts are too similar or empty after cleaning, use the most informative one
+    if not title or not description:
+        return (title or description)[:MAX_TEXT_LENGTH]
+    
+    if title.lower() == description.lower():
+        return title[:MAX_TEXT_LENGTH]
+    
+    # If description starts with title, use just description
+    if description.lower().startswith(title.lower()):
+        return description[:MAX_TEXT_LENGTH]
+    
+    # If either is a subset of the other, use the longer one
+    if title.lower() in description.lower():
+        return description[:MAX_TEXT_LENGTH]
+    if description.lower() in title.lower():
+        return title[:MAX_TEXT_LENGTH]
+    
+    # Combine title and description
+    return f"{title}\n\n{description}"[:MAX_TEXT_LENGTH]
+
+async def load_week_corpus(week: int, year: int) -> List[Dict[str, Any]]:
+    """Read a clustering week's bills as plain dicts."""
+    conn = await connect()
+    try:
+        rows = await conn.fetch(WEEK_BILLS_QUERY, year, week)
+    finally:
+        await conn.close()
+    return [
+        {'bill_id': row['bill_id'], 'title': row['title'], 'description': row['description'],
+         'state_abbr': row['state_abbr']}
+        for row in rows
+    ]
+
+def current_outputs(bill: Dict[str, Any]):
+    return (
+        is_template_bill(bill['title'], bill['description'], bill['state_abbr']),
+        prepare_bill_text(bill)
+    )
+
+def legacy_outputs(bill: Dict[str, Any]):
+    return legacy_is_template_bill(bill['title'], bill['description']), legacy_prepare_bill_text(bill)
+
+def compare(corpus: List[Dict[str, Any]]) -> int:
+    """Log every bill where the current rules disagree with the legacy code."""
+    mismatches = 0
+    for bill in corpus:
+        expected, actual = legacy_outputs(bill), current_outputs(bill)
+        if expected != actual:
+            mismatches += 1
+            logger.warning(f"Mismatch for bill {bill.get('bill_id')} ({bill['state_abbr']}):")
+            logger.warning(f"  legacy:  {expected!r}")
+            logger.warning(f"  current: {actual!r}")
+    return mismatches
+
+def bills_per_second(func: Callable, corpus: List[Dict[str, Any]], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for bill in corpus:
+            func(bill)
+    return len(corpus) * repeat / (time.perf_counter() - start)
+
+async def main():
+    parser = argparse.ArgumentParser(description='Compare compiled text rules with the legacy implementation')
+    parser.add_argument('--corpus', type=str, help='JSON-lines file of bills (title, description, state_abbr)')
+    parser.add_argument('-week', '--week', type=int, help='Read the corpus from this clustering week')
+    parser.add_argument('-year', '--year', type=int, help='Year of --week')
+    parser.add_argument('--save', type=str, help='Write the corpus read from the database to this file')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the corpus when timing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.corpus:
+        with open(args.corpus, 'r', encoding='utf-8') as f:
+            corpus = [json.loads(line) for line in f if line.strip()]
+    elif args.week is not None and args.year is not None:
+        corpus = await load_week_corpus(args.week, args.year)
+        if args.save:
+            with open(args.save, 'w', encoding='utf-8') as f:
+                for bill in corpus:
+                    f.write(json.dumps(bill) + '\n')
+            logger.info(f"Saved {len(corpus)} bills to {args.save}")
+    else:
+        parser.error('either --corpus or --week and --year are required')
+
+    if not corpus:
+        logger.info("Corpus is empty")
+        return
+
+    mismatches = compare(corpus)
+    logger.info(f"\n{len(corpus)} bills, {mismatches} mismatches")
+
+    legacy_rate = bills_per_second(legacy_outputs, corpus, args.repeat)
+    current_rate = bills_per_second(current_outputs, corpus, args.repeat)
+    logger.info(f"legacy:  {legacy_rate:>10.0f} bills/s")
+    logger.info(f"current: {current_rate:>10.0f} bills/s ({current_rate / legacy_rate:.1f}x)")
+    if mismatches:
+        exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -58,6 +58,14 @@ EMBEDDING_MAX_LENGTH = int(os.getenv('EMBEDDING_MAX_LENGTH', '512'))  # Server-s
 BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '100'))  # Server-side only
 EMBEDDING_DIMENSION = 384  # This is fixed for the MiniLM model
 
+# Vector storage: 'float32' keeps only the full-precision column, 'halfvec' also writes
+# embedding_half (float16, optionally truncated to VECTOR_STORAGE_DIMENSIONS). Set the same
+# values for the web app so /api/search ranks on embedding_half in halfvec mode
+VECTOR_STORAGE_MODE = os.getenv('VECTOR_STORAGE_MODE', 'float32')
+VECTOR_STORAGE_DIMENSIONS = int(os.getenv('VECTOR_STORAGE_DIMENSIONS', str(EMBEDDING_DIMENSION)))
+
+SPARSE_TOP_K = int(os.getenv('SPARSE_TOP_K', '64'))  # Lexical terms kept per text (BGE-M3 sparse head)
+
 # Processing configuration
 # TODO: Evaluate more sophisticated text processing approaches:
 # 1. Sliding window for long texts
@@ -15,13 +15,19 @@ import numpy as np
 
 from config import (
     SQLALCHEMY_DATABASE_URL, SQLALCHEMY_CONNECT_ARGS, MODEL_NAME, BATCH_SIZE, 
-    MAX_TEXT_LENGTH, STATE_MAPPING, EMBEDDING_MAX_LENGTH
+    MAX_TEXT_LENGTH, STATE_MAPPING, EMBEDDING_MAX_LENGTH, EMBEDDING_DIMENSION,
+    VECTOR_STORAGE_MODE, VECTOR_STORAGE_DIMENSIONS
 )
+from vector_storage import STORAGE_MODES, compact_vectors, to_vector_literal
+from vector_maintenance import recommended_lists
 from models import VectorIndex, Bill, Sponsor, Party, State, Body, Committee, BlogPost
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Inner-product index over embedding_half, built once halfvec mode has filled the column
+HALF_INDEX_NAME = 'idx_vector_search_half'
+
 def uuid_to_int32(uuid_str: str) -> int:
     """
     Convert a UUID to a 32-bit integer deterministically.
@@ -46,6 +52,10 @@ class VectorIndexer:
         self.model = AutoModel.from_pretrained(MODEL_NAME).to(self.device)
         self.model.eval()  # Set to evaluation mode
         
+        if VECTOR_STORAGE_MODE not in STORAGE_MODES:
+            raise ValueError(f"VECTOR_STORAGE_MODE must be one of {STORAGE_MODES}, got {VECTOR_STORAGE_MODE!r}")
+        logger.info(f"Vector storage mode: {VECTOR_STORAGE_MODE} ({VECTOR_STORAGE_DIMENSIONS} dims)")
+        
         # Database setup
         self.engine = create_async_engine(
             SQLALCHEMY_DATABASE_URL,
@@ -54,6 +64,62 @@ class VectorIndexer:
         self.Session = sessionmaker(
             self.engine, class_=AsyncSession, expire_on_commit=False
         )
+        self.has_half_column = False  # Set by prepare_vector_storage()
+
+    async def prepare_vector_storage(self):
+        """Check the halfvec column and bring its contents in line with the storage mode.
+
+        In halfvec mode, rows indexed before the switch are filled from the normalized
+        full-precision column, then the inner-product index is built over the complete column.
+        In float32 mode the column and its index are cleared so no stale half vectors remain.
+        """
+        async with self.engine.begin() as conn:
+            result = await conn.execute(sql_text("""
+                SELECT atttypmod
+                FROM pg_attribute
+                WHERE attrelid = 'vector_index'::regclass
+                AND attname = 'embedding_half'
+                AND NOT attisdropped
+            """))
+            column_dims = result.scalar_one_or_none()
+            self.has_half_column = column_dims is not None
+
+            if VECTOR_STORAGE_MODE != 'halfvec':
+                if self.has_half_column:
+                    await conn.execute(sql_text(f"DROP INDEX IF EXISTS {HALF_INDEX_NAME}"))
+                    result = await conn.execute(sql_text(
+                        "UPDATE vector_index SET embedding_half = NULL WHERE embedding_half IS NOT NULL"
+                    ))
+                    if result.rowcount:
+                        logger.info(f"Cleared {result.rowcount} half-precision vectors (float32 mode)")
+                return
+
+            if column_dims is None:
+                raise ValueError("VECTOR_STORAGE_MODE=halfvec needs vector_index.embedding_half (migration 026)")
+            # compact_vectors only truncates, so the stored width is capped by the model dimension
+            dims = min(VECTOR_STORAGE_DIMENSIONS, EMBEDDING_DIMENSION)
+            if column_dims > 0 and column_dims != dims:
+                raise ValueError(
+                    f"vector_index.embedding_half is halfvec({column_dims}) but VECTOR_STORAGE_DIMENSIONS gives "
+                    f"{dims} dimensions; ALTER the column (and its index) to halfvec({dims}) or change the setting"
+                )
+
+            # Same truncate, re-normalize and cast as compact_vectors, done server-side
+            result = await conn.execute(sql_text(f"""
+                UPDATE vector_index
+                SET embedding_half = l2_normalize(subvector(embedding, 1, {dims}))::halfvec({dims})
+                WHERE embedding_half IS NULL
+                AND embedding IS NOT NULL
+            """))
+            if result.rowcount:
+                logger.info(f"Filled {result.rowcount} half-precision vectors from the float32 column")
+
+            row_count = (await conn.execute(sql_text("SELECT COUNT(*) FROM vector_index"))).scalar_one()
+            await conn.execute(sql_text(f"""
+                CREATE INDEX IF NOT EXISTS {HALF_INDEX_NAME}
+                ON vector_index USING ivfflat (embedding_half halfvec_ip_ops)
+                WITH (lists = {recommended_lists(row_count)})
+            """))
 
     def _batch_generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for a batch of texts."""
@@ -76,6 +142,9 @@ class VectorIndexer:
             input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
             embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
             
+            # Normalize so inner product and cosine rank identically
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+            
             return embeddings.cpu().numpy()
 
     def _prepare_bill_text(self, bill: Dict[str, Any]) -> str:
@@ -130,6 +199,44 @@ class VectorIndexer:
         
         return ' '.join(filter(None, components))[:MAX_TEXT_LENGTH]
 
+    def _bill_search_weights(self, bill: Dict[str, Any]) -> Dict[str, str]:
+        """Split bill text into tsvector weight classes (A highest, D lowest)."""
+        return {
+            'A': ' '.join(filter(None, [bill['state_abbr'], bill['state_name'], bill['bill_number']])),
+            'B': bill['title'] or '',
+            'C': bill['pending_committee_name'] or '',
+            'D': bill['description'] or ''
+        }
+
+    def _sponsor_search_weights(self, sponsor: Dict[str, Any]) -> Dict[str, str]:
+        """Split sponsor text into tsvector weight classes (A highest, D lowest)."""
+        name_parts = [
+            sponsor['first_name'],
+            sponsor['middle_name'],
+            sponsor['last_name'],
+            sponsor['suffix'],
+            sponsor['nickname']
+        ]
+        return {
+            'A': ' '.join(filter(None, [sponsor['state_abbr'], STATE_MAPPING.get(sponsor['state_abbr'], '')])),
+            'B': ' '.join(filter(None, name_parts)),
+            'C': ' '.join(filter(None, [
+                sponsor['party_name'],
+                f"District {sponsor['district']}" if sponsor['district'] else ''
+            ])),
+            'D': ''
+        }
+
+    def _blog_search_weights(self, blog: Dict[str, Any]) -> Dict[str, str]:
+        """Split blog post text into tsvector weight classes (A highest, D lowest)."""
+        keywords = blog['post_metadata'].get('keywords', []) if blog['post_metadata'] else []
+        return {
+            'A': blog['title'] or '',
+            'B': ' '.join(keywords or []),
+            'C': '',
+            'D': re.sub(r'<[^>]+>', '', blog['content'] or '')
+        }
+
     async def _get_bills_to_update(self, session: AsyncSession) -> List[Dict[str, Any]]:
         """Get bills that need updating based on changed_hash."""
         query = (
@@ -243,7 +350,8 @@ class VectorIndexer:
         session: AsyncSession,
         items: List[Dict[str, Any]],
         entity_type: str,
-        prepare_text_func
+        prepare_text_func,
+        search_weights_func
     ):
         """Update vector index for a batch of items."""
         if not items:
@@ -252,14 +360,18 @@ class VectorIndexer:
         # Prepare texts and generate embeddings
         search_texts = [prepare_text_func(item) for item in items]
         embeddings = self._batch_generate_embeddings(search_texts)
+        write_half = VECTOR_STORAGE_MODE == 'halfvec'
+        half_embeddings = compact_vectors(embeddings, VECTOR_STORAGE_DIMENSIONS) if write_half else None
 
-        # Update database using raw SQL for upsert
-        for item, search_text, embedding in zip(items, search_texts, embeddings):
+        # Build all rows first so the upsert goes out as a single executemany
+        rows = []
+        for i, (item, search_text, embedding) in enumerate(zip(items, search_texts, embeddings)):
             # Convert numpy array to list and format as PostgreSQL vector literal
             vector_str = f"[{','.join(str(x) for x in embedding.tolist())}]"
+            weights = search_weights_func(item)
             
             # Prepare parameters based on entity type
-            params = {
+            row = {
                 'entity_type': entity_type,
                 'entity_id': item['post_id'] if entity_type == 'blog_post' else item[f'{entity_type}_id'],
                 'entity_uuid': item.get('uuid'),  # Only set for blog posts
@@ -267,33 +379,54 @@ class VectorIndexer:
                 'embedding': vector_str,
                 'source_hash': item['changed_hash'],
                 'state_abbr': item['state_abbr'],
-                'state_name': item['state_name'] if entity_type == 'blog_post' else STATE_MAPPING.get(item['state_abbr'], '')
+                'state_name': item['state_name'] if entity_type == 'blog_post' else STATE_MAPPING.get(item['state_abbr'], ''),
+                'weight_a': weights['A'],
+                'weight_b': weights['B'],
+                'weight_c': weights['C'],
+                'weight_d': weights['D']
             }
+            if write_half:
+                row['embedding_half'] = to_vector_literal(half_embeddings[i])
+            rows.append(row)
 
-#            for key, value in params.items():
-#                print(f"gitrParameter {key}: {value} (type: {type(value)})")
-            
-            # Execute the upsert
-            await session.execute(
-                sql_text("""
-                    INSERT INTO vector_index (
-                        entity_type, entity_id, entity_uuid, search_text, embedding, 
-                        source_hash, state_abbr, state_name
-                    ) VALUES (
-                        :entity_type, :entity_id, :entity_uuid, :search_text, :embedding,
-                        :source_hash, :state_abbr, :state_name
-                    )
-                    ON CONFLICT (entity_type, entity_id) DO UPDATE SET
-                        entity_uuid = EXCLUDED.entity_uuid,
-                        search_text = EXCLUDED.search_text,
-                        embedding = EXCLUDED.embedding,
-                        source_hash = EXCLUDED.source_hash,
-                        state_abbr = EXCLUDED.state_abbr,
-                        state_name = EXCLUDED.state_name,
-                        indexed_at = CURRENT_TIMESTAMP
-                """),
-                params
-            )
+        # float32 mode clears any half vector so the column never holds a stale copy
+        half_update = ''
+        if write_half:
+            half_update = '\n                    embedding_half = EXCLUDED.embedding_half,'
+        elif self.has_half_column:
+            half_update = '\n                    embedding_half = NULL,'
+
+        # Execute the upsert; the tsvector is computed server-side in the same statement.
+        # Identifiers (state, bill number) use the 'simple' config so they are not stemmed.
+        await session.execute(
+            sql_text("""
+                INSERT INTO vector_index (
+                    entity_type, entity_id, entity_uuid, search_text, embedding, 
+                    source_hash, state_abbr, state_name, search_vector{half_column}
+                ) VALUES (
+                    :entity_type, :entity_id, :entity_uuid, :search_text, :embedding,
+                    :source_hash, :state_abbr, :state_name,
+                    setweight(to_tsvector('simple', :weight_a), 'A') ||
+                    setweight(to_tsvector('english', :weight_b), 'B') ||
+                    setweight(to_tsvector('english', :weight_c), 'C') ||
+                    setweight(to_tsvector('english', :weight_d), 'D'){half_value}
+                )
+                ON CONFLICT (entity_type, entity_id) DO UPDATE SET
+                    entity_uuid = EXCLUDED.entity_uuid,
+                    search_text = EXCLUDED.search_text,
+                    embedding = EXCLUDED.embedding,
+                    source_hash = EXCLUDED.source_hash,
+                    state_abbr = EXCLUDED.state_abbr,
+                    state_name = EXCLUDED.state_name,
+                    search_vector = EXCLUDED.search_vector,{half_update}
+                    indexed_at = CURRENT_TIMESTAMP
+            """.format(
+                half_column=', embedding_half' if write_half else '',
+                half_value=', CAST(:embedding_half AS halfvec)' if write_half else '',
+                half_update=half_update
+            )),
+            rows
+        )
 
         await session.commit()
 
@@ -305,7 +438,8 @@ class VectorIndexer:
             if bills:
                 logger.info(f"Updating {len(bills)} bills")
                 await self._update_vector_index(
-                    session, bills, 'bill', self._prepare_bill_text
+                    session, bills, 'bill', self._prepare_bill_text,
+                    self._bill_search_weights
                 )
 
             # Update sponsors
@@ -313,7 +447,8 @@ class VectorIndexer:
             if sponsors:
                 logger.info(f"Updating {len(sponsors)} sponsors")
                 await self._update_vector_index(
-                    session, sponsors, 'sponsor', self._prepare_sponsor_text
+                    session, sponsors, 'sponsor', self._prepare_sponsor_text,
+                    self._sponsor_search_weights
                 )
 
             # Update blog posts
@@ -321,7 +456,8 @@ class VectorIndexer:
             if blog_posts:
                 logger.info(f"Updating {len(blog_posts)} blog posts")
                 await self._update_vector_index(
-                    session, blog_posts, 'blog_post', self._prepare_blog_text
+                    session, blog_posts, 'blog_post', self._prepare_blog_text,
+                    self._blog_search_weights
                 )
 
             # Verify counts
@@ -336,6 +472,7 @@ class VectorIndexer:
 async def main():
     indexer = VectorIndexer()
     try:
+        await indexer.prepare_vector_storage()
         while True:  # Run until no more items
             async with indexer.Session() as session:
                 # Check if there are any items to process
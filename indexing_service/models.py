@@ -26,17 +26,21 @@ class VectorIndex(Base):
     entity_type = Column(String(7), nullable=False)  # 'bill' or 'sponsor'
     entity_id = Column(Integer, nullable=False)
     search_text = Column(Text, nullable=False)
-    embedding = Column(ARRAY(FLOAT), nullable=False)
+    embedding = Column(ARRAY(FLOAT), nullable=False)  # L2-normalized at write time
+    embedding_half = Column(ARRAY(REAL))  # halfvec in the database, written in 'halfvec' storage mode
     source_hash = Column(String(64), nullable=False)
     state_abbr = Column(String(2), nullable=False)
     state_name = Column(String(50), nullable=False)
+    search_vector = Column(TSVECTOR)  # Weighted keyword vector maintained by the indexer
     indexed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Create indexes
     __table_args__ = (
         Index('ix_vector_index_embedding', 'embedding', postgresql_using='ivfflat', postgresql_with={'lists': 100}),
         Index('ix_vector_index_entity', 'entity_type', 'entity_id', unique=True),
-        Index('ix_vector_index_search_text', 'search_text', postgresql_using='gin'),
+        Index('ix_vector_index_search_text', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        Index('ix_vector_index_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 class State(Base):
@@ -131,6 +135,9 @@ class LegislationCluster(Base):
     bill_count = Column(Integer, nullable=False, default=0)
     state_count = Column(Integer, nullable=False, default=0)
     cluster_description = Column(Text)
+    keywords = Column(ARRAY(Text))
+    exemplar_bill_ids = Column(ARRAY(Integer))
+    exemplar_token_count = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -141,10 +148,23 @@ class ClusterBill(Base):
     bill_id = Column(Integer, ForeignKey('ls_bill.bill_id'), primary_key=True)
     distance_to_centroid = Column(Float)
     membership_confidence = Column(Float)
+    duplicate_group_id = Column(Integer, ForeignKey('ls_bill.bill_id'), nullable=True)
     added_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     cluster = relationship('LegislationCluster')
+    bill = relationship('Bill', foreign_keys=[bill_id])
+
+class BillLexicalWeights(Base):
+    __tablename__ = 'bill_lexical_weights'
+
+    bill_id = Column(Integer, ForeignKey('ls_bill.bill_id'), primary_key=True)
+    model_name = Column(String(255), nullable=False)
+    term_ids = Column(ARRAY(Integer), nullable=False)
+    term_weights = Column(ARRAY(REAL), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
     bill = relationship('Bill')
 
 class ClusterAnalysis(Base):
@@ -164,12 +184,27 @@ class ClusterAnalysis(Base):
     error_message = Column(Text)
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
+    reused_from = Column(UUID(as_uuid=True), ForeignKey('cluster_analysis.analysis_id'), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     cluster = relationship('LegislationCluster')
 
+class ClusterLineage(Base):
+    __tablename__ = 'cluster_lineage'
+
+    parent_cluster_id = Column(UUID(as_uuid=True), ForeignKey('legislation_clusters.cluster_id'), primary_key=True)
+    child_cluster_id = Column(UUID(as_uuid=True), ForeignKey('legislation_clusters.cluster_id'), primary_key=True)
+    centroid_similarity = Column(REAL, nullable=False)
+    jaccard = Column(REAL, nullable=False)
+    continuity = Column(REAL, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    parent = relationship('LegislationCluster', foreign_keys=[parent_cluster_id])
+    child = relationship('LegislationCluster', foreign_keys=[child_cluster_id])
+
 class BlogPost(Base):
     __tablename__ = 'blog_posts'
 
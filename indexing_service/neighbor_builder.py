@@ -0,0 +1,318 @@
+"""
+Precomputed k-nearest-neighbor tables for bills and blog posts.
+
+Loads bill and blog post embeddings from vector_index into one normalized
+matrix and computes top-k neighbors with blocked matrix multiplication, so
+"related bills" and "similar bills" become an index lookup on entity_neighbors
+instead of a vector scan at request time.
+
+Scopes (candidate filters):
+    any           any bill or blog post
+    same_type     same entity_type as the source
+    same_state    bills from the source's state
+    other_states  bills from any other state
+
+Runs are incremental: only sources whose embedding changed since the last run,
+whose stored neighbors changed or left the corpus, or whose top-k a changed
+entity would now enter are recomputed. Lists of entities that left the corpus
+are deleted. indexed_at is the indexer transaction's start time, so "changed"
+reaches back an overlap window before the last run to catch late commits.
+
+Usage:
+    python neighbor_builder.py [--k 20] [--scopes same_type same_state other_states] [--full]
+                               [--overlap-minutes 30]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text as sql_text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
+
+from config import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_CONNECT_ARGS
+from vector_storage import normalize_rows
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCOPES = ('any', 'same_type', 'same_state', 'other_states')
+DEFAULT_SCOPES = ['same_type', 'same_state', 'other_states']
+DEFAULT_K = 20
+DEFAULT_BLOCK_SIZE = 256
+LAST_RUN_KEY = 'entity_neighbors_last_run'
+DEFAULT_OVERLAP = timedelta(minutes=30)  # Re-check rows indexed this long before the last run
+
+class NeighborCorpus:
+    """Columnar view of the embeddings and the attributes the scopes filter on."""
+
+    def __init__(self, records):
+        self.entity_types = np.array([r.entity_type for r in records])
+        self.entity_ids = np.array([r.entity_id for r in records], dtype=np.int64)
+        self.entity_uuids = [str(r.entity_uuid) if r.entity_uuid else None for r in records]
+        self.state_abbrs = np.array([r.state_abbr for r in records])
+        self.indexed_at = [r.indexed_at for r in records]
+        self.vectors = normalize_rows(np.vstack([
+            np.fromstring(r.embedding.strip('[]'), sep=',', dtype=np.float32) for r in records
+        ]))
+        self.is_bill = self.entity_types == 'bill'
+        self.positions = {
+            (entity_type, int(entity_id)): i
+            for i, (entity_type, entity_id) in enumerate(zip(self.entity_types, self.entity_ids))
+        }
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def candidate_mask(self, scope: str, sources: np.ndarray) -> np.ndarray:
+        """Boolean [len(sources), len(corpus)] mask of allowed candidates for a scope."""
+        if scope == 'any':
+            return np.ones((len(sources), len(self)), dtype=bool)
+        if scope == 'same_type':
+            return self.entity_types[sources][:, None] == self.entity_types[None, :]
+        same_state = self.state_abbrs[sources][:, None] == self.state_abbrs[None, :]
+        if scope == 'same_state':
+            return same_state & self.is_bill[None, :]
+        if scope == 'other_states':
+            return ~same_state & self.is_bill[None, :]
+        raise ValueError(f"Unknown scope: {scope}")
+
+    def source_mask(self, scope: str, candidates: np.ndarray) -> np.ndarray:
+        """Boolean [len(candidates), len(corpus)] mask of sources whose lists may hold each candidate."""
+        if scope == 'any':
+            return np.ones((len(candidates), len(self)), dtype=bool)
+        if scope == 'same_type':
+            return self.entity_types[candidates][:, None] == self.entity_types[None, :]
+        same_state = self.state_abbrs[candidates][:, None] == self.state_abbrs[None, :]
+        if scope == 'same_state':
+            return same_state & self.is_bill[candidates][:, None]
+        if scope == 'other_states':
+            return ~same_state & self.is_bill[candidates][:, None]
+        raise ValueError(f"Unknown scope: {scope}")
+
+def top_k_neighbors(corpus: NeighborCorpus, sources: np.ndarray, scope: str, k: int,
+                    block_size: int = DEFAULT_BLOCK_SIZE):
+    """Blocked top-k over the corpus for the given source rows.
+
+    Returns (indices, similarities), each [len(sources), k]; missing slots are -1 / -inf.
+    """
+    indices = np.full((len(sources), k), -1, dtype=np.int64)
+    similarities = np.full((len(sources), k), -np.inf, dtype=np.float32)
+    k_eff = min(k, len(corpus))
+
+    for start in range(0, len(sources), block_size):
+        block = sources[start:start + block_size]
+        scores = corpus.vectors[block] @ corpus.vectors.T
+        scores[~corpus.candidate_mask(scope, block)] = -np.inf
+        scores[np.arange(len(block)), block] = -np.inf  # never your own neighbor
+
+        top = np.argpartition(-scores, k_eff - 1, axis=1)[:, :k_eff]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[start:start + len(block), :k_eff] = np.take_along_axis(top, order, axis=1)
+        similarities[start:start + len(block), :k_eff] = np.take_along_axis(top_scores, order, axis=1)
+
+    indices[~np.isfinite(similarities)] = -1
+    return indices, similarities
+
+async def load_corpus(conn: AsyncConnection) -> Optional[NeighborCorpus]:
+    """Load bill and blog post embeddings, with the same bill filter as the site."""
+    result = await conn.execute(sql_text("""
+        SELECT
+            vi.entity_type,
+            vi.entity_id,
+            vi.entity_uuid,
+            vi.state_abbr,
+            vi.embedding::text AS embedding,
+            vi.indexed_at
+        FROM vector_index vi
+        LEFT JOIN lsv_bill bill ON vi.entity_type = 'bill' AND vi.entity_id = bill.bill_id
+        WHERE vi.embedding IS NOT NULL
+        AND vi.entity_type IN ('bill', 'blog_post')
+        AND (vi.entity_type != 'bill' OR bill.bill_type_id = 1)
+        ORDER BY vi.id
+    """))
+    records = result.fetchall()
+    return NeighborCorpus(records) if records else None
+
+async def get_last_run(conn: AsyncConnection) -> Optional[datetime]:
+    """Read the start time of the last completed run."""
+    result = await conn.execute(
+        sql_text("SELECT value FROM app_metadata WHERE key = :key"), {"key": LAST_RUN_KEY}
+    )
+    value = result.scalar_one_or_none()
+    return datetime.fromisoformat(value) if value else None
+
+async def set_last_run(conn: AsyncConnection, run_at: datetime):
+    """Record the start time of this run for the next incremental pass."""
+    await conn.execute(
+        sql_text("""
+            INSERT INTO app_metadata (key, value, updated_at)
+            VALUES (:key, :value, NOW())
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+        """),
+        {"key": LAST_RUN_KEY, "value": run_at.isoformat()}
+    )
+
+async def load_stored_neighbors(conn: AsyncConnection, scope: str) -> Dict[tuple, Dict]:
+    """Current neighbor ids and k-th similarity per source, for incremental invalidation."""
+    result = await conn.execute(
+        sql_text("""
+            SELECT entity_type, entity_id,
+                   array_agg(neighbor_type || ':' || neighbor_id) AS neighbors,
+                   MIN(similarity) AS kth_similarity,
+                   COUNT(*) AS neighbor_count
+            FROM entity_neighbors
+            WHERE scope = :scope
+            GROUP BY entity_type, entity_id
+        """),
+        {"scope": scope}
+    )
+    return {
+        (row.entity_type, row.entity_id): {
+            'neighbors': set(row.neighbors),
+            'kth_similarity': row.kth_similarity,
+            'neighbor_count': row.neighbor_count
+        }
+        for row in result.fetchall()
+    }
+
+async def sources_to_refresh(conn: AsyncConnection, corpus: NeighborCorpus, scope: str, k: int,
+                             since: Optional[datetime], block_size: int,
+                             overlap: timedelta = DEFAULT_OVERLAP) -> Tuple[np.ndarray, List[tuple]]:
+    """Rows whose neighbor list for this scope may have changed since the last run.
+
+    Returns (rows to recompute, (entity_type, entity_id) of stored sources no longer in the corpus).
+    """
+    stored = await load_stored_neighbors(conn, scope)
+    removed = [key for key in stored if key not in corpus.positions]
+    if since is None:
+        return np.arange(len(corpus)), removed
+
+    changed = np.array(
+        [i for i, ts in enumerate(corpus.indexed_at) if ts and ts > since - overlap], dtype=np.int64
+    )
+    refresh = np.zeros(len(corpus), dtype=bool)
+    refresh[changed] = True
+
+    # Neighbors that moved or left the corpus invalidate the lists holding them
+    changed_keys = {f"{corpus.entity_types[i]}:{corpus.entity_ids[i]}" for i in changed}
+    for entry in stored.values():
+        for neighbor in entry['neighbors']:
+            entity_type, entity_id = neighbor.split(':', 1)
+            if (entity_type, int(entity_id)) not in corpus.positions:
+                changed_keys.add(neighbor)
+    kth = np.full(len(corpus), -np.inf, dtype=np.float32)
+    for i in range(len(corpus)):
+        entry = stored.get((corpus.entity_types[i], int(corpus.entity_ids[i])))
+        if entry is None:
+            refresh[i] = True  # never computed
+            continue
+        if entry['neighbors'] & changed_keys:
+            refresh[i] = True  # a stored neighbor moved or was removed
+        if entry['neighbor_count'] >= k:
+            kth[i] = entry['kth_similarity']
+
+    # A changed vector can enter any list whose k-th similarity it now beats.
+    # Scores are symmetric, so scan changed rows against the corpus in blocks.
+    for start in range(0, len(changed), block_size):
+        block = changed[start:start + block_size]
+        scores = corpus.vectors[block] @ corpus.vectors.T
+        allowed = corpus.source_mask(scope, block)
+        refresh |= ((scores > kth[None, :]) & allowed).any(axis=0)
+
+    return np.flatnonzero(refresh), removed
+
+async def delete_neighbors(conn: AsyncConnection, scope: str, source_types: List[str], source_ids: List[int]):
+    """Delete the stored neighbor rows of the given sources."""
+    await conn.execute(
+        sql_text("""
+            DELETE FROM entity_neighbors n
+            USING unnest(CAST(:types AS text[]), CAST(:ids AS integer[])) AS s(entity_type, entity_id)
+            WHERE n.scope = :scope AND n.entity_type = s.entity_type AND n.entity_id = s.entity_id
+        """),
+        {"types": source_types, "ids": source_ids, "scope": scope}
+    )
+
+async def write_neighbors(conn: AsyncConnection, corpus: NeighborCorpus, sources: np.ndarray,
+                          scope: str, indices: np.ndarray, similarities: np.ndarray):
+    """Replace stored neighbor rows for the refreshed sources."""
+    await delete_neighbors(conn, scope, corpus.entity_types[sources].tolist(), corpus.entity_ids[sources].tolist())
+
+    rows, cols = np.nonzero(indices >= 0)
+    neighbors = indices[rows, cols]
+    await conn.execute(
+        sql_text("""
+            INSERT INTO entity_neighbors (
+                entity_type, entity_id, scope, rank,
+                neighbor_type, neighbor_id, neighbor_uuid, similarity
+            ) SELECT * FROM unnest(
+                CAST(:entity_types AS text[]), CAST(:entity_ids AS integer[]),
+                CAST(:scopes AS text[]), CAST(:ranks AS smallint[]),
+                CAST(:neighbor_types AS text[]), CAST(:neighbor_ids AS integer[]),
+                CAST(:neighbor_uuids AS uuid[]), CAST(:similarities AS real[])
+            )
+        """),
+        {
+            "entity_types": corpus.entity_types[sources[rows]].tolist(),
+            "entity_ids": corpus.entity_ids[sources[rows]].tolist(),
+            "scopes": [scope] * len(rows),
+            "ranks": (cols + 1).tolist(),
+            "neighbor_types": corpus.entity_types[neighbors].tolist(),
+            "neighbor_ids": corpus.entity_ids[neighbors].tolist(),
+            "neighbor_uuids": [corpus.entity_uuids[n] for n in neighbors],
+            "similarities": similarities[rows, cols].tolist()
+        }
+    )
+
+async def build_neighbors(k: int = DEFAULT_K, scopes: List[str] = DEFAULT_SCOPES,
+                          full: bool = False, block_size: int = DEFAULT_BLOCK_SIZE,
+                          overlap: timedelta = DEFAULT_OVERLAP):
+    """Compute and store neighbor lists for every requested scope."""
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args=SQLALCHEMY_CONNECT_ARGS)
+    try:
+        async with engine.begin() as conn:
+            # Take the timestamp before reading so rows indexed mid-run are picked up next time
+            run_at = (await conn.execute(sql_text("SELECT NOW()"))).scalar_one()
+            corpus = await load_corpus(conn)
+            if corpus is None:
+                logger.info("No bill or blog post embeddings to process")
+                return
+            since = None if full else await get_last_run(conn)
+            logger.info(f"Loaded {len(corpus)} vectors; {'full' if since is None else f'incremental since {since}'} run")
+
+            for scope in scopes:
+                sources, removed = await sources_to_refresh(conn, corpus, scope, k, since, block_size, overlap)
+                logger.info(f"Scope {scope}: recomputing {len(sources)} of {len(corpus)} entities, "
+                            f"deleting {len(removed)} lists of removed entities")
+                if removed:
+                    await delete_neighbors(conn, scope, [t for t, _ in removed], [int(i) for _, i in removed])
+                if len(sources) == 0:
+                    continue
+                indices, similarities = top_k_neighbors(corpus, sources, scope, k, block_size)
+                await write_neighbors(conn, corpus, sources, scope, indices, similarities)
+
+            await set_last_run(conn, run_at)
+            logger.info("Neighbor tables updated")
+    finally:
+        await engine.dispose()
+
+async def main():
+    parser = argparse.ArgumentParser(description='Precompute k-nearest neighbors for bills and blog posts')
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help='Neighbors per entity and scope')
+    parser.add_argument('--scopes', nargs='+', choices=SCOPES, default=DEFAULT_SCOPES)
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help='Source rows per matrix multiplication block')
+    parser.add_argument('--full', action='store_true', help='Recompute every entity')
+    parser.add_argument('--overlap-minutes', type=float, default=DEFAULT_OVERLAP.total_seconds() / 60,
+                        help='Minutes before the last run whose indexed rows are treated as changed')
+    args = parser.parse_args()
+
+    await build_neighbors(args.k, args.scopes, args.full, args.block_size,
+                          timedelta(minutes=args.overlap_minutes))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+"""
+In-process similarity service for multi-vector recommendation queries.
+
+Loads vector_index embeddings for each entity_type into a contiguous,
+L2-normalized float32 matrix and answers multi-query top-k requests with one
+matrix product per entity type, instead of a CROSS JOIN of every input
+embedding against vector_index inside Postgres. The matrices are refreshed
+incrementally from indexed_at in a background thread.
+
+Usage:
+    python similarity_service.py [--port 8090] [--refresh-seconds 300]
+
+Request (POST /recommendations), same shape as /api/search/recommendations:
+    {"embeddings": [[...], ...], "entity_type": "bill", "limit": 4, "offset": 0,
+     "exclude": [{"entity_type": "bill", "entity_id": 123}]}
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text as sql_text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_CONNECT_ARGS, EMBEDDING_DIMENSION
+from vector_storage import normalize_rows
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8090
+DEFAULT_REFRESH_SECONDS = 300
+FULL_RELOAD_SECONDS = 24 * 60 * 60  # Picks up deletions, which indexed_at cannot signal
+# indexed_at is the indexer transaction's start time, so rows can commit after a refresh
+# with an older timestamp; each refresh re-reads this much before the watermark
+DEFAULT_REFRESH_OVERLAP = timedelta(minutes=30)
+MIN_SIMILARITY = 0.3  # Matches the SQL recommendations route
+INITIAL_CAPACITY = 1024
+
+class EntityMatrix:
+    """Normalized embeddings and row metadata for one entity_type."""
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.vectors = np.empty((INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self.size = 0
+        self.rows: List[Dict[str, Any]] = []
+        self.positions: Dict[Any, int] = {}
+
+    def upsert(self, keys: List[Any], vectors: np.ndarray, rows: List[Dict[str, Any]]):
+        """Overwrite rows that already exist and append the rest, growing capacity by doubling."""
+        vectors = normalize_rows(vectors.astype(np.float32))
+        new_count = sum(1 for key in keys if key not in self.positions)
+        required = self.size + new_count
+        if required > len(self.vectors):
+            capacity = max(required, 2 * len(self.vectors))
+            grown = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+
+        for key, vector, row in zip(keys, vectors, rows):
+            position = self.positions.get(key)
+            if position is None:
+                position = self.size
+                self.size += 1
+                self.positions[key] = position
+                self.rows.append(row)
+            else:
+                self.rows[position] = row
+            self.vectors[position] = vector
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Max cosine similarity over all query vectors for every row."""
+        if self.size == 0:
+            return np.empty(0, dtype=np.float32)
+        return (self.vectors[:self.size] @ queries.T).max(axis=1)
+
+class SimilarityIndex:
+    """Per-entity_type matrices with incremental refresh from vector_index."""
+
+    def __init__(self, overlap: timedelta = DEFAULT_REFRESH_OVERLAP):
+        self.overlap = overlap
+        self.matrices: Dict[str, EntityMatrix] = {}
+        self.last_indexed_at: Optional[datetime] = None
+        self.last_full_load = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def entity_key(entity_type: str, entity_id: Any, entity_uuid: Any = None) -> Any:
+        """Blog posts are identified by UUID, everything else by integer id."""
+        if entity_type == 'blog_post':
+            return str(entity_uuid if entity_uuid is not None else entity_id)
+        return int(entity_id)
+
+    async def refresh(self, full: bool = False):
+        """Load rows indexed since the last refresh (or everything) and merge them in."""
+        full = full or self.last_indexed_at is None or time.time() - self.last_full_load > FULL_RELOAD_SECONDS
+        since = None if full else self.last_indexed_at - self.overlap
+
+        engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args=SQLALCHEMY_CONNECT_ARGS)
+        try:
+            async with engine.connect() as conn:
+                # Same candidate filter as the SQL route: only bill_type_id = 1 bills
+                result = await conn.execute(
+                    sql_text("""
+                        SELECT
+                            vi.entity_type,
+                            vi.entity_id,
+                            vi.entity_uuid,
+                            vi.state_abbr,
+                            vi.state_name,
+                            vi.embedding::text AS embedding,
+                            vi.indexed_at
+                        FROM vector_index vi
+                        LEFT JOIN lsv_bill bill ON vi.entity_type = 'bill' AND vi.entity_id = bill.bill_id
+                        WHERE vi.embedding IS NOT NULL
+                        AND (vi.entity_type != 'bill' OR bill.bill_type_id = 1)
+                        AND (CAST(:since AS timestamptz) IS NULL OR vi.indexed_at > :since)
+                    """),
+                    {"since": since}
+                )
+                records = result.fetchall()
+        finally:
+            await engine.dispose()
+
+        grouped: Dict[str, Dict[str, list]] = {}
+        latest = self.last_indexed_at if not full else None
+        seen = set()
+        for record in records:
+            key = self.entity_key(record.entity_type, record.entity_id, record.entity_uuid)
+            if (record.entity_type, key) in seen:
+                continue
+            seen.add((record.entity_type, key))
+            group = grouped.setdefault(record.entity_type, {'keys': [], 'vectors': [], 'rows': []})
+            group['keys'].append(key)
+            group['vectors'].append(np.fromstring(record.embedding.strip('[]'), sep=',', dtype=np.float32))
+            group['rows'].append({
+                'entity_type': record.entity_type,
+                'entity_id': record.entity_id,
+                'entity_uuid': str(record.entity_uuid) if record.entity_uuid else None,
+                'state_abbr': record.state_abbr,
+                'state_name': record.state_name
+            })
+            if record.indexed_at and (latest is None or record.indexed_at > latest):
+                latest = record.indexed_at
+
+        # Build new matrices off to the side on a full load so queries never see a partial state
+        matrices = {} if full else self.matrices
+        with self.lock:
+            for entity_type, group in grouped.items():
+                matrix = matrices.setdefault(entity_type, EntityMatrix())
+                matrix.upsert(group['keys'], np.vstack(group['vectors']), group['rows'])
+            self.matrices = matrices
+            self.last_indexed_at = latest
+            if full:
+                self.last_full_load = time.time()
+
+        counts = {entity_type: m.size for entity_type, m in self.matrices.items()}
+        logger.info(f"{'Loaded' if full else 'Refreshed'} {len(records)} vectors; totals: {counts}")
+
+    def query(self, embeddings: List[List[float]], entity_type: Optional[str] = None,
+              limit: int = 4, offset: int = 0,
+              exclude: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Top-k entities by max similarity to any of the query embeddings."""
+        queries = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        excluded = {
+            (ex['entity_type'], self.entity_key(ex['entity_type'], ex['entity_id'], ex['entity_id']))
+            for ex in exclude or []
+        }
+        wanted = offset + limit
+
+        candidates = []
+        with self.lock:
+            types = [entity_type] if entity_type else list(self.matrices)
+            for current_type in types:
+                matrix = self.matrices.get(current_type)
+                if matrix is None or matrix.size == 0:
+                    continue
+                scores = matrix.scores(queries)
+                for ex_type, key in excluded:
+                    position = matrix.positions.get(key) if ex_type == current_type else None
+                    if position is not None:
+                        scores[position] = -np.inf
+
+                k = min(wanted, matrix.size)
+                top = np.argpartition(-scores, k - 1)[:k]
+                for position in top:
+                    if scores[position] > MIN_SIMILARITY:
+                        candidates.append((float(scores[position]), matrix.rows[position]))
+
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return [
+            {**row, 'similarity': similarity}
+            for similarity, row in candidates[offset:wanted]
+        ]
+
+def make_handler(index: SimilarityIndex):
+    """Build a request handler bound to the shared index."""
+
+    class RecommendationHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/recommendations':
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                results = index.query(
+                    body['embeddings'],
+                    entity_type=body.get('entity_type'),
+                    limit=int(body.get('limit', 4)),
+                    offset=int(body.get('offset', 0)),
+                    exclude=body.get('exclude')
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, {'results': results})
+
+        def do_GET(self):
+            if self.path != '/health':
+                self.send_error(404)
+                return
+            self._send_json(200, {
+                'entities': {entity_type: m.size for entity_type, m in index.matrices.items()},
+                'last_indexed_at': index.last_indexed_at.isoformat() if index.last_indexed_at else None
+            })
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return RecommendationHandler
+
+def run_refresh_loop(index: SimilarityIndex, refresh_seconds: int, stop: threading.Event):
+    """Refresh the index periodically on a private event loop."""
+    while not stop.wait(refresh_seconds):
+        try:
+            asyncio.run(index.refresh())
+        except Exception as e:
+            logger.error(f"Refresh failed: {str(e)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process similarity service for recommendations')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--refresh-seconds', type=int, default=DEFAULT_REFRESH_SECONDS,
+                        help='Interval between incremental refreshes from indexed_at')
+    parser.add_argument('--refresh-overlap-minutes', type=float,
+                        default=DEFAULT_REFRESH_OVERLAP.total_seconds() / 60,
+                        help='Minutes before the last indexed_at re-read on each refresh, for late-committing rows')
+    args = parser.parse_args()
+
+    index = SimilarityIndex(timedelta(minutes=args.refresh_overlap_minutes))
+    asyncio.run(index.refresh(full=True))
+
+    stop = threading.Event()
+    refresher = threading.Thread(
+        target=run_refresh_loop, args=(index, args.refresh_seconds, stop), daemon=True
+    )
+    refresher.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+    logger.info(f"Similarity service listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Received interrupt signal. Shutting down gracefully...")
+    finally:
+        stop.set()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Maintenance tool for the ivfflat index on vector_index.
+
+Sizes `lists` from the current row count, rebuilds the index when the table has
+outgrown it, optionally creates per-entity_type partial indexes, and evaluates
+recall@k / latency of ANN search against exact search for a range of
+`ivfflat.probes` settings.
+
+Usage:
+    python vector_maintenance.py status
+    python vector_maintenance.py rebuild [--growth-threshold 2.0] [--force]
+    python vector_maintenance.py partial --entity-types bill sponsor blog_post
+    python vector_maintenance.py evaluate [--samples 50] [--k 10] [--probes 1 5 10 20 40]
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import re
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text as sql_text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
+
+from config import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_CONNECT_ARGS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Name used by migrations/002_add_vector_search.sql
+VECTOR_INDEX_NAME = 'idx_vector_search'
+VECTOR_OPCLASS = 'vector_cosine_ops'
+DISTANCE_OPERATOR = '<=>'
+MIN_LISTS = 10
+DEFAULT_GROWTH_THRESHOLD = 2.0
+DEFAULT_PROBES = [1, 5, 10, 20, 40]
+
+def recommended_lists(row_count: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    if row_count <= 1_000_000:
+        lists = row_count // 1000
+    else:
+        lists = int(math.sqrt(row_count))
+    return max(MIN_LISTS, lists)
+
+def partial_index_name(entity_type: str) -> str:
+    """Name of the per-entity_type partial index."""
+    return f"{VECTOR_INDEX_NAME}_{entity_type}"
+
+async def count_rows(conn: AsyncConnection, entity_type: Optional[str] = None) -> int:
+    """Count indexed vectors, optionally for a single entity type."""
+    if entity_type:
+        result = await conn.execute(
+            sql_text("SELECT COUNT(*) FROM vector_index WHERE entity_type = :entity_type"),
+            {"entity_type": entity_type}
+        )
+    else:
+        result = await conn.execute(sql_text("SELECT COUNT(*) FROM vector_index"))
+    return result.scalar_one()
+
+async def get_index_lists(conn: AsyncConnection, index_name: str) -> Optional[int]:
+    """Read the `lists` storage parameter of an existing ivfflat index."""
+    result = await conn.execute(
+        sql_text("SELECT reloptions FROM pg_class WHERE relname = :name AND relkind = 'i'"),
+        {"name": index_name}
+    )
+    row = result.first()
+    if row is None:
+        return None
+    for option in row.reloptions or []:
+        key, _, value = option.partition('=')
+        if key == 'lists':
+            return int(value)
+    return None
+
+async def get_entity_types(conn: AsyncConnection) -> List[str]:
+    """List the entity types present in vector_index."""
+    result = await conn.execute(sql_text("SELECT DISTINCT entity_type FROM vector_index ORDER BY 1"))
+    return [row[0] for row in result.fetchall()]
+
+async def create_ivfflat_index(conn: AsyncConnection, index_name: str, lists: int,
+                               entity_type: Optional[str] = None):
+    """Build an ivfflat index concurrently (requires an autocommit connection)."""
+    if not re.fullmatch(r'[a-z_]+', index_name):
+        raise ValueError(f"Invalid index name: {index_name}")
+    where = ''
+    if entity_type:
+        if not re.fullmatch(r'[a-z_]+', entity_type):
+            raise ValueError(f"Invalid entity type: {entity_type}")
+        where = f"WHERE entity_type = '{entity_type}'"
+    logger.info(f"Building {index_name} with lists={lists} {where}".rstrip())
+    await conn.execute(sql_text(f"""
+        CREATE INDEX CONCURRENTLY {index_name}
+        ON vector_index USING ivfflat (embedding {VECTOR_OPCLASS})
+        WITH (lists = {int(lists)})
+        {where}
+    """))
+
+async def replace_index(conn: AsyncConnection, index_name: str, lists: int,
+                        entity_type: Optional[str] = None):
+    """Build a new index next to the old one, then swap names so search never loses its index."""
+    staging_name = f"{index_name}_new"
+    await conn.execute(sql_text(f"DROP INDEX CONCURRENTLY IF EXISTS {staging_name}"))
+    await create_ivfflat_index(conn, staging_name, lists, entity_type)
+    await conn.execute(sql_text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+    await conn.execute(sql_text(f"ALTER INDEX {staging_name} RENAME TO {index_name}"))
+
+async def status(conn: AsyncConnection):
+    """Log row counts and current vs recommended lists for every ivfflat index."""
+    row_count = await count_rows(conn)
+    current = await get_index_lists(conn, VECTOR_INDEX_NAME)
+    logger.info(f"vector_index rows: {row_count}")
+    logger.info(f"{VECTOR_INDEX_NAME}: lists={current}, recommended={recommended_lists(row_count)}")
+
+    for entity_type in await get_entity_types(conn):
+        entity_count = await count_rows(conn, entity_type)
+        entity_lists = await get_index_lists(conn, partial_index_name(entity_type))
+        logger.info(
+            f"  {entity_type}: rows={entity_count}, partial index lists={entity_lists}, "
+            f"recommended={recommended_lists(entity_count)}"
+        )
+
+async def rebuild(conn: AsyncConnection, growth_threshold: float = DEFAULT_GROWTH_THRESHOLD,
+                  force: bool = False) -> bool:
+    """Rebuild the main index when the recommended lists has outgrown the current one."""
+    row_count = await count_rows(conn)
+    target = recommended_lists(row_count)
+    current = await get_index_lists(conn, VECTOR_INDEX_NAME)
+
+    if not force and current is not None and target < current * growth_threshold:
+        logger.info(
+            f"No rebuild needed: lists={current}, recommended={target} "
+            f"(threshold {growth_threshold}x)"
+        )
+        return False
+
+    logger.info(f"Rebuilding {VECTOR_INDEX_NAME}: lists {current} -> {target} for {row_count} rows")
+    await replace_index(conn, VECTOR_INDEX_NAME, target)
+    await conn.execute(sql_text("ANALYZE vector_index"))
+    return True
+
+async def create_partial_indexes(conn: AsyncConnection, entity_types: List[str],
+                                 growth_threshold: float = DEFAULT_GROWTH_THRESHOLD):
+    """Create or resize one partial ivfflat index per entity type."""
+    for entity_type in entity_types:
+        index_name = partial_index_name(entity_type)
+        target = recommended_lists(await count_rows(conn, entity_type))
+        current = await get_index_lists(conn, index_name)
+        if current is not None and target < current * growth_threshold:
+            logger.info(f"{index_name} is current (lists={current})")
+            continue
+        await replace_index(conn, index_name, target, entity_type)
+    await conn.execute(sql_text("ANALYZE vector_index"))
+
+async def _sample_queries(conn: AsyncConnection, samples: int, entity_type: Optional[str]) -> List[str]:
+    """Sample stored embeddings to use as query vectors."""
+    result = await conn.execute(
+        sql_text("""
+            SELECT embedding::text
+            FROM vector_index
+            WHERE (CAST(:entity_type AS text) IS NULL OR entity_type = :entity_type)
+            ORDER BY random()
+            LIMIT :samples
+        """),
+        {"entity_type": entity_type, "samples": samples}
+    )
+    return [row[0] for row in result.fetchall()]
+
+async def _top_k(conn: AsyncConnection, query_vector: str, k: int, entity_type: Optional[str]) -> List[int]:
+    """Run one top-k query with whatever planner settings are active on the connection."""
+    result = await conn.execute(
+        sql_text(f"""
+            SELECT id
+            FROM vector_index
+            WHERE (CAST(:entity_type AS text) IS NULL OR entity_type = :entity_type)
+            ORDER BY embedding {DISTANCE_OPERATOR} CAST(:query AS vector)
+            LIMIT :k
+        """),
+        {"query": query_vector, "k": k, "entity_type": entity_type}
+    )
+    return [row[0] for row in result.fetchall()]
+
+async def evaluate(conn: AsyncConnection, samples: int = 50, k: int = 10,
+                   probes_list: List[int] = DEFAULT_PROBES,
+                   entity_type: Optional[str] = None) -> List[Dict[str, float]]:
+    """Compare ANN top-k to exact top-k for sampled queries at each probes setting."""
+    queries = await _sample_queries(conn, samples, entity_type)
+    if not queries:
+        logger.warning("No vectors to evaluate")
+        return []
+
+    # Exact neighbors: disable index scans so the planner does a full sort
+    await conn.execute(sql_text("SET enable_indexscan = off"))
+    exact = []
+    exact_latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        exact.append(set(await _top_k(conn, query, k, entity_type)))
+        exact_latencies.append(time.perf_counter() - start)
+    await conn.execute(sql_text("RESET enable_indexscan"))
+
+    results = [{
+        'probes': 0,
+        'recall': 1.0,
+        'p50_ms': float(np.percentile(exact_latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(exact_latencies, 95) * 1000)
+    }]
+
+    for probes in probes_list:
+        await conn.execute(sql_text(f"SET ivfflat.probes = {int(probes)}"))
+        recalls = []
+        latencies = []
+        for query, truth in zip(queries, exact):
+            start = time.perf_counter()
+            found = await _top_k(conn, query, k, entity_type)
+            latencies.append(time.perf_counter() - start)
+            recalls.append(len(truth.intersection(found)) / max(len(truth), 1))
+        results.append({
+            'probes': probes,
+            'recall': float(np.mean(recalls)),
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p95_ms': float(np.percentile(latencies, 95) * 1000)
+        })
+    await conn.execute(sql_text("RESET ivfflat.probes"))
+
+    scope = entity_type or 'all entities'
+    logger.info(f"\nRecall@{k} over {len(queries)} sampled queries ({scope}):")
+    logger.info(f"{'probes':>8} {'recall':>8} {'p50 ms':>10} {'p95 ms':>10}")
+    for row in results:
+        label = 'exact' if row['probes'] == 0 else str(row['probes'])
+        logger.info(f"{label:>8} {row['recall']:>8.3f} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f}")
+    return results
+
+async def main():
+    parser = argparse.ArgumentParser(description='ivfflat index maintenance for vector_index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('status', help='Show row counts and index sizing')
+
+    rebuild_parser = subparsers.add_parser('rebuild', help='Resize the main ivfflat index if needed')
+    rebuild_parser.add_argument('--growth-threshold', type=float, default=DEFAULT_GROWTH_THRESHOLD,
+                                help='Rebuild when recommended lists exceeds current lists by this factor')
+    rebuild_parser.add_argument('--force', action='store_true', help='Rebuild regardless of threshold')
+
+    partial_parser = subparsers.add_parser('partial', help='Create per-entity_type partial indexes')
+    partial_parser.add_argument('--entity-types', nargs='+', help='Entity types (default: all present)')
+    partial_parser.add_argument('--growth-threshold', type=float, default=DEFAULT_GROWTH_THRESHOLD)
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='Measure recall@k and latency per probes')
+    evaluate_parser.add_argument('--samples', type=int, default=50, help='Number of sampled query vectors')
+    evaluate_parser.add_argument('--k', type=int, default=10, help='Neighbors per query')
+    evaluate_parser.add_argument('--probes', type=int, nargs='+', default=DEFAULT_PROBES)
+    evaluate_parser.add_argument('--entity-type', type=str, help='Restrict queries and candidates to one type')
+
+    args = parser.parse_args()
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args=SQLALCHEMY_CONNECT_ARGS,
+        isolation_level='AUTOCOMMIT'
+    )
+    try:
+        async with engine.connect() as conn:
+            if args.command == 'status':
+                await status(conn)
+            elif args.command == 'rebuild':
+                await rebuild(conn, args.growth_threshold, args.force)
+            elif args.command == 'partial':
+                entity_types = args.entity_types or await get_entity_types(conn)
+                await create_partial_indexes(conn, entity_types, args.growth_threshold)
+            elif args.command == 'evaluate':
+                await evaluate(conn, args.samples, args.k, args.probes, args.entity_type)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Compact vector storage helpers and recall report.
+
+Vectors are L2-normalized at write time so search can rank with the inner
+product operator (<#>) instead of cosine distance. In 'halfvec' mode they are
+also written as float16, optionally truncated to fewer dimensions and
+re-normalized.
+
+Running this module compares each halfvec option against the full-precision
+float32 vectors (cosine, the stored vectors being normalized) on a held-out
+query set sampled from vector_index:
+
+    python vector_storage.py [--corpus 20000] [--queries 200] [--k 10] [--dims 384 256 192 128]
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text as sql_text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import (
+    SQLALCHEMY_DATABASE_URL, SQLALCHEMY_CONNECT_ARGS, EMBEDDING_DIMENSION
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STORAGE_MODES = ('float32', 'halfvec')
+DEFAULT_REPORT_DIMS = [384, 256, 192, 128]
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def compact_vectors(vectors: np.ndarray, dimensions: Optional[int] = None,
+                    dtype=np.float16) -> np.ndarray:
+    """Truncate to the leading `dimensions`, re-normalize and cast for storage."""
+    if dimensions is not None and dimensions < vectors.shape[1]:
+        vectors = vectors[:, :dimensions]
+    return normalize_rows(vectors.astype(np.float32)).astype(dtype)
+
+def to_vector_literal(vector: np.ndarray) -> str:
+    """Format a vector as a pgvector/halfvec text literal."""
+    return f"[{','.join(str(float(x)) for x in vector)}]"
+
+def recall_at_k(baseline: np.ndarray, candidate: np.ndarray) -> float:
+    """Mean fraction of baseline neighbors recovered per query."""
+    k = baseline.shape[1]
+    hits = [len(np.intersect1d(b, c, assume_unique=True)) for b, c in zip(baseline, candidate)]
+    return float(np.mean(hits) / k)
+
+def top_k_inner_product(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k indices by inner product, ordered best first."""
+    scores = queries.astype(np.float32) @ corpus.astype(np.float32).T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+def storage_recall_report(corpus: np.ndarray, queries: np.ndarray, k: int = 10,
+                          dims_list: List[int] = DEFAULT_REPORT_DIMS) -> List[Dict[str, float]]:
+    """Compare halfvec storage options against float32 cosine over the full vectors."""
+    # Baseline: exact cosine at full precision and dimension. Cosine ignores vector length, so
+    # normalizing at write time cannot change it, and no float32 row is reported against it
+    baseline = top_k_inner_product(normalize_rows(queries), normalize_rows(corpus), k)
+
+    rows = []
+    options = [(f'halfvec {dims}d', dims, np.float16) for dims in dims_list]
+    for name, dims, dtype in options:
+        stored = compact_vectors(corpus, dims, dtype)
+        query = compact_vectors(queries, dims, dtype)
+        found = top_k_inner_product(query, stored, k)
+        rows.append({
+            'option': name,
+            'dimensions': stored.shape[1],
+            'bytes_per_vector': stored.shape[1] * np.dtype(dtype).itemsize,
+            'recall': recall_at_k(baseline, found)
+        })
+
+    full_bytes = corpus.shape[1] * 4
+    logger.info(f"\nRecall@{k} vs float32 cosine baseline ({len(queries)} held-out queries, {len(corpus)} vectors):")
+    logger.info(f"{'option':<22} {'dims':>6} {'bytes':>7} {'size':>7} {'recall':>8}")
+    for row in rows:
+        logger.info(
+            f"{row['option']:<22} {row['dimensions']:>6} {row['bytes_per_vector']:>7} "
+            f"{row['bytes_per_vector'] / full_bytes:>7.0%} {row['recall']:>8.3f}"
+        )
+    return rows
+
+async def load_embeddings(limit: int, entity_type: Optional[str] = None) -> np.ndarray:
+    """Load a random sample of full-precision embeddings from vector_index."""
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, connect_args=SQLALCHEMY_CONNECT_ARGS)
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                sql_text("""
+                    SELECT embedding::text
+                    FROM vector_index
+                    WHERE (CAST(:entity_type AS text) IS NULL OR entity_type = :entity_type)
+                    ORDER BY random()
+                    LIMIT :limit
+                """),
+                {"entity_type": entity_type, "limit": limit}
+            )
+            rows = result.fetchall()
+    finally:
+        await engine.dispose()
+
+    vectors = np.empty((len(rows), EMBEDDING_DIMENSION), dtype=np.float32)
+    for i, (literal,) in enumerate(rows):
+        vectors[i] = np.fromstring(literal.strip('[]'), sep=',', dtype=np.float32)
+    return vectors
+
+async def main():
+    parser = argparse.ArgumentParser(description='Recall report for compact vector storage options')
+    parser.add_argument('--corpus', type=int, default=20000, help='Number of vectors to sample')
+    parser.add_argument('--queries', type=int, default=200, help='Held-out query vectors')
+    parser.add_argument('--k', type=int, default=10, help='Neighbors per query')
+    parser.add_argument('--dims', type=int, nargs='+', default=DEFAULT_REPORT_DIMS,
+                        help='Truncation dimensions to evaluate in halfvec mode')
+    parser.add_argument('--entity-type', type=str, help='Restrict the sample to one entity type')
+    args = parser.parse_args()
+
+    vectors = await load_embeddings(args.corpus + args.queries, args.entity_type)
+    if len(vectors) <= args.queries:
+        logger.warning("Not enough vectors for a held-out query set")
+        return
+
+    # Held-out queries are excluded from the corpus so no query finds itself
+    queries, corpus = vectors[:args.queries], vectors[args.queries:]
+    storage_recall_report(corpus, queries, args.k, args.dims)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+BEGIN;
+
+-- Migration: 024_add_bill_lexical_weights
+-- Description: Stores BGE-M3 learned sparse (lexical) term weights per bill as parallel top-k arrays
+
+CREATE TABLE IF NOT EXISTS bill_lexical_weights (
+    bill_id INTEGER PRIMARY KEY REFERENCES ls_bill(bill_id),
+    model_name VARCHAR(255) NOT NULL,
+    term_ids INTEGER[] NOT NULL,
+    term_weights REAL[] NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT bill_lexical_weights_length CHECK (
+        cardinality(term_ids) = cardinality(term_weights)
+    )
+);
+
+COMMENT ON TABLE bill_lexical_weights IS 'Top-k learned sparse term weights produced alongside dense embeddings by the clustering pipeline';
+COMMENT ON COLUMN bill_lexical_weights.model_name IS 'Model (and tokenizer) the term ids belong to';
+COMMENT ON COLUMN bill_lexical_weights.term_ids IS 'Tokenizer vocabulary ids, ordered by descending weight';
+COMMENT ON COLUMN bill_lexical_weights.term_weights IS 'Non-negative weights aligned with term_ids';
+
+COMMIT;
@@ -0,0 +1,23 @@
+BEGIN;
+
+-- Migration: 025_add_vector_index_search_vector
+-- Description: Adds a weighted tsvector to vector_index, maintained by the indexer in the same
+-- upsert as the embedding, so keyword and vector candidates can be read from one table
+
+ALTER TABLE vector_index
+ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+-- Backfill existing rows from search_text until the indexer rewrites them with full weights
+UPDATE vector_index
+SET search_vector =
+    setweight(to_tsvector('simple', coalesce(state_abbr, '') || ' ' || coalesce(state_name, '')), 'A') ||
+    setweight(to_tsvector('english', search_text), 'D')
+WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_vector_index_search_vector
+ON vector_index USING gin(search_vector);
+
+COMMENT ON COLUMN vector_index.search_vector IS
+'Weighted keyword vector: state and bill number (A), title/name (B), committee/party (C), description/content (D)';
+
+COMMIT;
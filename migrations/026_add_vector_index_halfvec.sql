@@ -0,0 +1,20 @@
+BEGIN;
+
+-- Migration: 026_add_vector_index_halfvec
+-- Description: Adds a compact float16 copy of each embedding (pgvector >= 0.7) for
+-- VECTOR_STORAGE_MODE=halfvec. Vectors are L2-normalized at write time, so search can rank with
+-- <#> instead of <=>. The column starts empty: in halfvec mode the indexer fills it and then builds
+-- idx_vector_search_half (halfvec_ip_ops); in float32 mode it keeps the column NULL.
+-- If VECTOR_STORAGE_DIMENSIONS is set below 384, change halfvec(384) to match before indexing.
+
+ALTER TABLE vector_index
+ADD COLUMN IF NOT EXISTS embedding_half halfvec(384);
+
+-- Existing full-precision vectors were stored un-normalized; normalize them in place
+UPDATE vector_index
+SET embedding = l2_normalize(embedding);
+
+COMMENT ON COLUMN vector_index.embedding_half IS
+'L2-normalized float16 embedding (optionally truncated), written only in halfvec storage mode; search with <#> (negative inner product)';
+
+COMMIT;
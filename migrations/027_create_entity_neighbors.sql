@@ -0,0 +1,30 @@
+BEGIN;
+
+-- Migration: 027_create_entity_neighbors
+-- Description: Precomputed top-k neighbors for bills and blog posts, written by
+-- indexing_service/neighbor_builder.py so pages do an index lookup instead of a vector scan
+
+CREATE TABLE IF NOT EXISTS entity_neighbors (
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    scope VARCHAR(20) NOT NULL CHECK (scope IN ('any', 'same_type', 'same_state', 'other_states')),
+    rank SMALLINT NOT NULL,
+    neighbor_type VARCHAR(20) NOT NULL,
+    neighbor_id INTEGER NOT NULL,
+    neighbor_uuid UUID NULL,
+    similarity REAL NOT NULL,
+    computed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (entity_type, entity_id, scope, rank)
+);
+
+COMMENT ON TABLE entity_neighbors IS 'Top-k cosine neighbors per bill/blog post and scope, refreshed incrementally from vector_index.indexed_at';
+COMMENT ON COLUMN entity_neighbors.entity_id IS 'Same id as vector_index.entity_id (int32 derived from the UUID for blog posts)';
+COMMENT ON COLUMN entity_neighbors.scope IS 'Candidate filter: any, same_type, same_state (bills), other_states (bills)';
+COMMENT ON COLUMN entity_neighbors.neighbor_uuid IS 'Neighbor blog post UUID; NULL for bills';
+
+INSERT INTO app_metadata (key, value)
+VALUES ('entity_neighbors_last_run', NULL)
+ON CONFLICT (key) DO NOTHING;
+
+COMMIT;
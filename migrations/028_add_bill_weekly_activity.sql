@@ -0,0 +1,136 @@
+BEGIN;
+
+-- Migration: 028_add_bill_weekly_activity
+-- Description: Incrementally maintained (year, week, bill) activity table so clustering reads one
+-- week's slice by primary key instead of a DISTINCT ON over a range join of ls_bill_history, plus
+-- cached history counters for the clustering overview log.
+-- Weeks match get_week_dates in indexing_service/clustering/data.py: week 1 starts on the first
+-- Monday of the year; days before it belong to the last week of the previous year.
+
+CREATE OR REPLACE FUNCTION cluster_week_start(p_year integer)
+RETURNS date AS $$
+    SELECT make_date(p_year, 1, 1) + ((8 - EXTRACT(ISODOW FROM make_date(p_year, 1, 1))::integer) % 7);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION cluster_week_of(
+    p_date date,
+    OUT activity_year integer,
+    OUT activity_week integer
+) AS $$
+DECLARE
+    v_start date;
+BEGIN
+    activity_year := EXTRACT(YEAR FROM p_date)::integer;
+    v_start := cluster_week_start(activity_year);
+    IF p_date < v_start THEN
+        activity_year := activity_year - 1;
+        v_start := cluster_week_start(activity_year);
+    END IF;
+    activity_week := (p_date - v_start) / 7 + 1;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Latest action per bill per clustering week
+CREATE TABLE IF NOT EXISTS bill_weekly_activity (
+    activity_year INTEGER NOT NULL,
+    activity_week INTEGER NOT NULL CHECK (activity_week BETWEEN 1 AND 53),
+    bill_id INTEGER NOT NULL,
+    history_step SMALLINT NOT NULL,
+    history_date DATE NOT NULL,
+    history_action TEXT NOT NULL,
+    PRIMARY KEY (activity_year, activity_week, bill_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bill_weekly_activity_bill ON bill_weekly_activity (bill_id);
+
+-- Single-row cache of the ls_bill_history overview
+CREATE TABLE IF NOT EXISTS bill_history_overview (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    total BIGINT NOT NULL DEFAULT 0,
+    states INTEGER NOT NULL DEFAULT 0,
+    earliest DATE,
+    latest DATE,
+    refreshed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Full rebuild, used for the initial backfill and to repair after bulk history rewrites
+CREATE OR REPLACE FUNCTION rebuild_bill_weekly_activity()
+RETURNS void AS $$
+BEGIN
+    TRUNCATE bill_weekly_activity;
+
+    INSERT INTO bill_weekly_activity (
+        activity_year, activity_week, bill_id, history_step, history_date, history_action
+    )
+    SELECT DISTINCT ON (w.activity_year, w.activity_week, bh.bill_id)
+        w.activity_year, w.activity_week, bh.bill_id, bh.history_step, bh.history_date, bh.history_action
+    FROM ls_bill_history bh
+    CROSS JOIN LATERAL cluster_week_of(bh.history_date) w
+    WHERE bh.history_date IS NOT NULL
+    ORDER BY w.activity_year, w.activity_week, bh.bill_id, bh.history_date DESC, bh.history_step DESC;
+
+    INSERT INTO bill_history_overview (id, total, states, earliest, latest, refreshed_at)
+    SELECT TRUE, COUNT(*), COUNT(DISTINCT b.state_id), MIN(bh.history_date), MAX(bh.history_date), NOW()
+    FROM ls_bill_history bh
+    JOIN ls_bill b ON bh.bill_id = b.bill_id
+    ON CONFLICT (id) DO UPDATE SET
+        total = EXCLUDED.total,
+        states = EXCLUDED.states,
+        earliest = EXCLUDED.earliest,
+        latest = EXCLUDED.latest,
+        refreshed_at = EXCLUDED.refreshed_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level sync: one upsert per INSERT/UPDATE statement on ls_bill_history
+CREATE OR REPLACE FUNCTION sync_bill_weekly_activity()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO bill_weekly_activity (
+        activity_year, activity_week, bill_id, history_step, history_date, history_action
+    )
+    SELECT DISTINCT ON (w.activity_year, w.activity_week, n.bill_id)
+        w.activity_year, w.activity_week, n.bill_id, n.history_step, n.history_date, n.history_action
+    FROM new_rows n
+    CROSS JOIN LATERAL cluster_week_of(n.history_date) w
+    WHERE n.history_date IS NOT NULL
+    ORDER BY w.activity_year, w.activity_week, n.bill_id, n.history_date DESC, n.history_step DESC
+    ON CONFLICT (activity_year, activity_week, bill_id) DO UPDATE SET
+        history_step = EXCLUDED.history_step,
+        history_date = EXCLUDED.history_date,
+        history_action = EXCLUDED.history_action
+    WHERE (EXCLUDED.history_date, EXCLUDED.history_step)
+        >= (bill_weekly_activity.history_date, bill_weekly_activity.history_step);
+
+    UPDATE bill_history_overview o SET
+        total = o.total + CASE WHEN TG_OP = 'INSERT' THEN n.row_count ELSE 0 END,
+        earliest = LEAST(o.earliest, n.earliest),
+        latest = GREATEST(o.latest, n.latest)
+    FROM (
+        SELECT COUNT(*) AS row_count, MIN(history_date) AS earliest, MAX(history_date) AS latest
+        FROM new_rows
+    ) n;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bill_weekly_activity_insert_trigger
+    AFTER INSERT ON ls_bill_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_bill_weekly_activity();
+
+CREATE TRIGGER bill_weekly_activity_update_trigger
+    AFTER UPDATE ON ls_bill_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_bill_weekly_activity();
+
+SELECT rebuild_bill_weekly_activity();
+
+COMMENT ON TABLE bill_weekly_activity IS 'Latest ls_bill_history action per bill per clustering week, maintained by triggers on ls_bill_history';
+COMMENT ON TABLE bill_history_overview IS 'Cached ls_bill_history totals; states is exact as of refreshed_at (rebuild_bill_weekly_activity)';
+COMMENT ON FUNCTION cluster_week_of(date) IS 'Clustering (year, week) for a date, matching get_week_dates in the clustering service';
+
+COMMIT;
@@ -0,0 +1,31 @@
+BEGIN;
+
+-- Migration: 029_add_cluster_lineage
+-- Description: Cross-week cluster lineage. Clusters keep their BGE-M3 centroid again (dropped with
+-- the MiniLM-sized columns in 004) so the next week's clusters can be matched to them, links
+-- between matched clusters are recorded, and an analysis copied from a stable parent cluster
+-- points back at the analysis it reused.
+
+ALTER TABLE legislation_clusters
+    ADD COLUMN IF NOT EXISTS centroid_vector VECTOR(1024);
+
+CREATE TABLE IF NOT EXISTS cluster_lineage (
+    parent_cluster_id UUID NOT NULL REFERENCES legislation_clusters(cluster_id) ON DELETE CASCADE,
+    child_cluster_id UUID NOT NULL REFERENCES legislation_clusters(cluster_id) ON DELETE CASCADE,
+    centroid_similarity REAL NOT NULL,
+    jaccard REAL NOT NULL,
+    continuity REAL NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (parent_cluster_id, child_cluster_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cluster_lineage_child ON cluster_lineage(child_cluster_id);
+
+ALTER TABLE cluster_analysis
+    ADD COLUMN IF NOT EXISTS reused_from UUID REFERENCES cluster_analysis(analysis_id) ON DELETE SET NULL;
+
+COMMENT ON COLUMN legislation_clusters.centroid_vector IS 'Mean BGE-M3 embedding of the cluster''s bills, used for lineage matching';
+COMMENT ON TABLE cluster_lineage IS 'Links a cluster to clusters from earlier weeks it continues (centroid similarity and bill Jaccard overlap)';
+COMMENT ON COLUMN cluster_analysis.reused_from IS 'Analysis copied from a parent cluster instead of running a new LLM analysis';
+
+COMMIT;
@@ -0,0 +1,16 @@
+BEGIN;
+
+-- Migration: 030_add_cluster_bill_duplicate_groups
+-- Description: Near-duplicate bills (model legislation, companion bills) are clustered through one
+-- representative. Every member's membership row records the representative's bill id as its
+-- duplicate group; bills without near-duplicates keep NULL.
+
+ALTER TABLE cluster_bills
+    ADD COLUMN IF NOT EXISTS duplicate_group_id INTEGER REFERENCES ls_bill(bill_id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_cluster_bills_duplicate_group
+    ON cluster_bills(duplicate_group_id) WHERE duplicate_group_id IS NOT NULL;
+
+COMMENT ON COLUMN cluster_bills.duplicate_group_id IS 'Representative bill of the near-duplicate group this bill was clustered through';
+
+COMMIT;
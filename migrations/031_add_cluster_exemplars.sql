@@ -0,0 +1,15 @@
+BEGIN;
+
+-- Migration: 031_add_cluster_exemplars
+-- Description: Each cluster stores the exemplar bills chosen for its LLM analysis (medoid,
+-- nearest-to-centroid and cross-state MMR picks within a token budget). The analysis service
+-- reads only these bills when the list is present.
+
+ALTER TABLE legislation_clusters
+    ADD COLUMN IF NOT EXISTS exemplar_bill_ids INTEGER[],
+    ADD COLUMN IF NOT EXISTS exemplar_token_count INTEGER;
+
+COMMENT ON COLUMN legislation_clusters.exemplar_bill_ids IS 'Exemplar bills for LLM analysis, in selection order';
+COMMENT ON COLUMN legislation_clusters.exemplar_token_count IS 'Estimated prompt tokens of the exemplar bills';
+
+COMMIT;
@@ -0,0 +1,12 @@
+BEGIN;
+
+-- Migration: 032_add_cluster_keywords
+-- Description: Clusters are named from their top class-based TF-IDF terms when they are stored,
+-- and keep the full keyword list for triage before the LLM analysis runs.
+
+ALTER TABLE legislation_clusters
+    ADD COLUMN IF NOT EXISTS keywords TEXT[];
+
+COMMENT ON COLUMN legislation_clusters.keywords IS 'Top c-TF-IDF terms and phrases of the cluster''s bill texts, best first';
+
+COMMIT;
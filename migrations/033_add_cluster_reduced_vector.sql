@@ -0,0 +1,13 @@
+BEGIN;
+
+-- Migration: 033_add_cluster_reduced_vector
+-- Description: Clusters store their centroid in the reduced space of the run that produced them.
+-- Its dimension depends on the reducer mode (256 for UMAP, 10 for cluster-space), so it is a
+-- plain REAL[] rather than a fixed-size vector column.
+
+ALTER TABLE legislation_clusters
+    ADD COLUMN IF NOT EXISTS reduced_vector REAL[];
+
+COMMENT ON COLUMN legislation_clusters.reduced_vector IS 'Centroid in the run''s reduced (UMAP) space; dimension depends on the reducer mode';
+
+COMMIT;
@@ -0,0 +1,112 @@
+BEGIN;
+
+-- Migration: 034_sync_bill_weekly_activity_deletes
+-- Description: Keep bill_weekly_activity correct when ls_bill_history rows are deleted, or updated
+-- so that they move to another week or stop being a bill's latest action in their week. The
+-- affected (year, week, bill) entries are recomputed from ls_bill_history; inserts keep the
+-- cheaper upsert from 028.
+
+-- Recompute the given (year, week, bill) entries from the bills' current history
+CREATE OR REPLACE FUNCTION refresh_bill_weekly_activity(
+    p_years integer[],
+    p_weeks integer[],
+    p_bills integer[]
+)
+RETURNS void AS $$
+BEGIN
+    DELETE FROM bill_weekly_activity a
+    USING unnest(p_years, p_weeks, p_bills) AS k(activity_year, activity_week, bill_id)
+    WHERE a.activity_year = k.activity_year
+    AND a.activity_week = k.activity_week
+    AND a.bill_id = k.bill_id;
+
+    INSERT INTO bill_weekly_activity (
+        activity_year, activity_week, bill_id, history_step, history_date, history_action
+    )
+    SELECT DISTINCT ON (w.activity_year, w.activity_week, bh.bill_id)
+        w.activity_year, w.activity_week, bh.bill_id, bh.history_step, bh.history_date, bh.history_action
+    FROM ls_bill_history bh
+    CROSS JOIN LATERAL cluster_week_of(bh.history_date) w
+    JOIN unnest(p_years, p_weeks, p_bills) AS k(activity_year, activity_week, bill_id)
+        ON k.bill_id = bh.bill_id
+        AND k.activity_year = w.activity_year
+        AND k.activity_week = w.activity_week
+    WHERE bh.bill_id = ANY(p_bills)
+    AND bh.history_date IS NOT NULL
+    ORDER BY w.activity_year, w.activity_week, bh.bill_id, bh.history_date DESC, bh.history_step DESC;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level sync for DELETE: recompute every week a deleted row belonged to
+CREATE OR REPLACE FUNCTION sync_bill_weekly_activity_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_bill_weekly_activity(
+        array_agg(w.activity_year), array_agg(w.activity_week), array_agg(o.bill_id)
+    )
+    FROM old_rows o
+    CROSS JOIN LATERAL cluster_week_of(o.history_date) w
+    WHERE o.history_date IS NOT NULL;
+
+    -- earliest/latest stay as cached bounds until rebuild_bill_weekly_activity()
+    UPDATE bill_history_overview o SET
+        total = o.total - d.row_count
+    FROM (SELECT COUNT(*) AS row_count FROM old_rows) d;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level sync for UPDATE: recompute the weeks of both the old and the new row versions
+CREATE OR REPLACE FUNCTION sync_bill_weekly_activity_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_bill_weekly_activity(
+        array_agg(k.activity_year), array_agg(k.activity_week), array_agg(k.bill_id)
+    )
+    FROM (
+        SELECT w.activity_year, w.activity_week, o.bill_id
+        FROM old_rows o
+        CROSS JOIN LATERAL cluster_week_of(o.history_date) w
+        WHERE o.history_date IS NOT NULL
+        UNION
+        SELECT w.activity_year, w.activity_week, n.bill_id
+        FROM new_rows n
+        CROSS JOIN LATERAL cluster_week_of(n.history_date) w
+        WHERE n.history_date IS NOT NULL
+    ) k;
+
+    UPDATE bill_history_overview o SET
+        earliest = LEAST(o.earliest, n.earliest),
+        latest = GREATEST(o.latest, n.latest)
+    FROM (
+        SELECT MIN(history_date) AS earliest, MAX(history_date) AS latest
+        FROM new_rows
+    ) n;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bill_weekly_activity_update_trigger ON ls_bill_history;
+
+CREATE TRIGGER bill_weekly_activity_update_trigger
+    AFTER UPDATE ON ls_bill_history
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_bill_weekly_activity_update();
+
+DROP TRIGGER IF EXISTS bill_weekly_activity_delete_trigger ON ls_bill_history;
+
+CREATE TRIGGER bill_weekly_activity_delete_trigger
+    AFTER DELETE ON ls_bill_history
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sync_bill_weekly_activity_delete();
+
+-- Repair entries left behind by deletes and week-moving updates before this migration
+SELECT rebuild_bill_weekly_activity();
+
+COMMENT ON FUNCTION refresh_bill_weekly_activity(integer[], integer[], integer[]) IS 'Recompute bill_weekly_activity entries for (year, week, bill) keys from ls_bill_history';
+
+COMMIT;